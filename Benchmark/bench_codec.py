@@ -0,0 +1,154 @@
+"""
+Micro-benchmark codec paket serial: ns per frame untuk decode, decode + baris
+database, dan encode balasan override 0xBB.
+
+"legacy" adalah salinan fungsi lama dari main.py (parse_flags, calculate_checksum,
+process_packet, build_row, flags_to_bytes, data_plc) tanpa cetak / bersihkan layar,
+"codec" adalah codec.py. Hasil kedua jalur dicek sama sebelum diukur.
+
+    python3 bench_codec.py
+    python3 bench_codec.py --frames 100000 --output hasil.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+HANDLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler')
+sys.path.insert(0, HANDLER_DIR)
+from codec import (
+    START_BYTE, PACKET_LENGTH, FLAGS_INPUT, FLAGS_OUTPUT, FLAGS_OUTPUT_2,
+    decode, encode, encode_override
+)
+
+FRAMES = 10000          # jumlah frame acak per putaran
+REPEAT = 5              # putaran, diambil yang tercepat
+SEED = 1
+
+
+#========================== LEGACY (main.py lama) ==========================
+def legacy_parse_flags(flag_byte):
+    return [(flag_byte >> i) & 1 for i in range(8)]
+
+def legacy_flags_to_bytes(flags):
+    if len(flags) == 16:
+        byte1 = sum((bit << i) for i, bit in enumerate(flags[:8]))
+        byte2 = sum((bit << i) for i, bit in enumerate(flags[8:]))
+        return byte1, byte2
+    else:
+        return False
+
+def legacy_calculate_checksum(packet):
+    checksum = 0
+    for byte in packet[:-1]:
+        checksum ^= byte
+    return checksum
+
+def legacy_process_packet(packet):
+    if len(packet) != PACKET_LENGTH or packet[0] != START_BYTE:
+        return None
+    if legacy_calculate_checksum(packet) != packet[-1]:
+        return None
+    return {
+        'level_1': packet[1],
+        'level_2': packet[2],
+        'tds_1': packet[3],
+        'flow_1': packet[4],
+        'pressure_1': packet[5],
+        'input_flags': legacy_parse_flags(packet[6]),
+        'output_flags': legacy_parse_flags(packet[7]),
+        'output_flags2': (legacy_parse_flags(packet[8]))[:6]
+    }
+
+def legacy_build_row(data):
+    for i, flag in enumerate(FLAGS_INPUT):
+        data[flag] = data['input_flags'][i]
+    for i, flag in enumerate(FLAGS_OUTPUT):
+        data[flag] = data['output_flags'][i]
+    for i, flag in enumerate(FLAGS_OUTPUT_2):
+        data[flag] = data['output_flags2'][i]
+    return data
+
+def legacy_data_plc(coils):
+    flag_one, flag_two = legacy_flags_to_bytes(coils + [False] * 2)
+    packet = bytearray()
+    packet.append(0xBB)
+    packet.append(flag_one)
+    packet.append(flag_two)
+    return packet
+
+
+#========================== DATA ==========================
+def make_packets(count, seed=SEED):
+    rng = random.Random(seed)
+    return [encode(*(rng.randrange(256) for _ in range(8))) for _ in range(count)]
+
+def make_coils(count, seed=SEED):
+    rng = random.Random(seed)
+    return [[bool(rng.getrandbits(1)) for _ in range(14)] for _ in range(count)]
+
+def check(packets, coils):
+    #kedua jalur harus menghasilkan data yang sama
+    for packet in packets:
+        legacy = legacy_build_row(legacy_process_packet(packet))
+        row = decode(packet).as_row()
+        for key, value in row.items():
+            if isinstance(value, tuple):
+                value = list(value)
+            if legacy[key] != value:
+                raise AssertionError(f"{key} berbeda untuk paket {packet.hex()}")
+    for bits in coils:
+        if bytes(legacy_data_plc(bits)) != encode_override(bits):
+            raise AssertionError(f"encode_override berbeda untuk {bits}")
+    corrupt = bytearray(packets[0])
+    corrupt[3] ^= 0x10
+    if legacy_process_packet(bytes(corrupt)) is not None or decode(bytes(corrupt)) is not None:
+        raise AssertionError("paket rusak tidak ditolak")
+
+
+#========================== BENCHMARK ==========================
+def measure(fn, items, repeat=REPEAT):
+    #ns per item, putaran tercepat
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for item in items:
+            fn(item)
+        elapsed = (time.perf_counter_ns() - start) / len(items)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def run(frames=FRAMES, repeat=REPEAT):
+    packets = make_packets(frames)
+    coils = make_coils(frames)
+    check(packets, coils)
+    cases = {
+        "decode": (legacy_process_packet, decode),
+        "decode_row": (lambda p: legacy_build_row(legacy_process_packet(p)), lambda p: decode(p).as_row()),
+        "encode_override": (legacy_data_plc, encode_override),
+    }
+    result = {"frames": frames, "python": sys.version.split()[0]}
+    for name, (legacy, new) in cases.items():
+        items = coils if name == "encode_override" else packets
+        result[name] = {"legacy_ns": round(measure(legacy, items, repeat), 1), "codec_ns": round(measure(new, items, repeat), 1)}
+        result[name]["speedup"] = round(result[name]["legacy_ns"] / result[name]["codec_ns"], 2)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark codec paket serial")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", help="simpan hasil JSON ke file ini")
+    args = parser.parse_args()
+
+    result = run(args.frames, args.repeat)
+    for name in ("decode", "decode_row", "encode_override"):
+        case = result[name]
+        print(f"{name.ljust(16)} legacy {case['legacy_ns']:8.1f} ns   codec {case['codec_ns']:8.1f} ns   {case['speedup']:.2f}x")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,335 @@
+"""
+Benchmark end-to-end Data_Handler tanpa Arduino dan PLC.
+
+    - Arduino diganti pty: frame 10 byte dibentuk seperti packing() di
+      Arduino_Mega/packing_data.ino (level_1 naik 0-100, nilai lain dari data_awal())
+      dan dikirim dengan RATE frame/detik. Dengan --batch N dikirim frame batch berisi
+      N sampel dan balasannya ACK kumulatif 0xFE + seq.
+    - PLC diganti plc_emulator.py (server Modbus TCP lokal, slave 1 dan slave 2).
+      Setiap read/write yang sampai ke server dihitung sebagai satu transaksi dan
+      bisa diberi latensi --plc-latency / --plc-jitter (ms).
+    - Handler dijalankan sebagai proses terpisah, diarahkan lewat environment
+      MINIPLANT_SERIAL_PORT, MINIPLANT_PLC_IP/PORT, MINIPLANT_DB_FILE, dst.
+
+Hasil (JSON) berisi frame/detik, latensi frame -> ACK (p50/p99), transaksi PLC per
+frame dan baris database per detik:
+    python3 bench_handler.py --handler main --rate 100 --db direct --output hasil.json
+    python3 bench_handler.py --rate 0 --compare hasil.json     -> bandingkan dengan hasil lama
+    python3 bench_handler.py --rate 0 --sweep 1,5,10,25,50     -> frame/detik vs latensi PLC (ms)
+    python3 bench_handler.py --rate 0 --batch 16 --plc-latency 10   -> sampel/detik dengan frame batch
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import platform
+import pty
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tty
+from plc_emulator import PlcEmulator
+
+HANDLER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler')
+sys.path.insert(0, HANDLER_DIR)
+from codec import encode, encode_batch, BATCH_ACK_BYTE
+
+HANDLERS = {
+    "main": ["main.py"],
+    "async": ["main.py", "--async"],
+    "simul": ["main_simul.py"],
+}
+MODBUS_HOST = '127.0.0.1'
+MODBUS_PORT = 5020
+PUBLISH_PORT = 5810         # bukan 5800 supaya tidak bentrok dengan Data_Handler yang sedang jalan
+RATE = 50                   # frame/detik, 0 = secepat mungkin (kirim frame berikut setelah ACK)
+DURATION = 10               # detik pengukuran
+WARMUP_TIMEOUT = 20         # batas tunggu handler siap (ACK pertama)
+ACK_TIMEOUT = 2             # sisa waktu menunggu ACK setelah pengiriman selesai
+SWEEP = [1, 5, 10, 25, 50]  # ms, latensi PLC untuk --sweep
+BATCH = 1                   # sampel per frame, > 1 = frame batch bersekuens (codec.py)
+SAMPLE_INTERVAL = 1         # ms antar sampel dalam frame batch (hanya untuk timestamp baris)
+
+
+#========================== FAKE ARDUINO ==========================
+def make_sample(i, override=False):
+    level_1 = i % 101
+    input_flags = 0b00000101 | (override << 6)    # level_switch, mode_standby
+    output_flags = 0b01100011                     # solenoid_1, solenoid_2, solenoid_6, pompa_1
+    output_flags2 = 0b00110001                    # pompa_3, drain_lamp, stepper
+    return (level_1, 85, 33, 200, 60, input_flags, output_flags, output_flags2)
+
+def make_frame(i, override=False, batch=BATCH):
+    if batch > 1:
+        return encode_batch(i, [make_sample(i + k, override) for k in range(batch)], SAMPLE_INTERVAL)
+    return encode(*make_sample(i, override))
+
+class FakeDevice:
+    #sisi "Arduino" dari pty: kirim frame, cocokkan balasan (0xFF, 0xBB + 2 byte, 0xFE + seq [+ 0xBB + 2 byte]) urut FIFO
+    def __init__(self, override=False, batch=BATCH):
+        self.master, slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self.slave = slave
+        self.override = override
+        self.batch = batch
+        self.pending = collections.deque()
+        self.latencies = []
+        self.replies = 0
+        self.counter = 0
+        self.ack_event = threading.Event()
+        self.lock = threading.Lock()
+        self.running = True
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def send(self):
+        frame = make_frame(self.counter, self.override, self.batch)
+        self.counter += self.batch
+        with self.lock:
+            self.pending.append(time.perf_counter())
+        os.write(self.master, frame)
+
+    def reset(self):
+        with self.lock:
+            self.pending.clear()
+            self.latencies = []
+            self.replies = 0
+
+    def _reader(self):
+        buffer = b""
+        while self.running:
+            try:
+                buffer += os.read(self.master, 4096)
+            except OSError:
+                return
+            now = time.perf_counter()
+            while buffer:
+                if buffer[0] == 0xFF:
+                    size = 1
+                elif buffer[0] == 0xBB:
+                    if len(buffer) < 3:
+                        break
+                    size = 3
+                elif buffer[0] == BATCH_ACK_BYTE:
+                    size = 6 if self.override else 3
+                    if len(buffer) < size:
+                        break
+                else:
+                    size = 1 # byte asing, lewati
+                    buffer = buffer[size:]
+                    continue
+                buffer = buffer[size:]
+                with self.lock:
+                    if self.pending:
+                        self.latencies.append(now - self.pending.popleft())
+                        self.replies += 1
+                self.ack_event.set()
+
+    def close(self):
+        self.running = False
+        os.close(self.master)
+        os.close(self.slave)
+
+
+#========================== RUN ==========================
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HANDLER_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def stop(process, timeout=10):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def run_benchmark(handler="main", rate=RATE, duration=DURATION, db_mode="off", override=False,
+                  publish=True, workdir=None, modbus_port=MODBUS_PORT, plc_latency=0.0, plc_jitter=0.0, batch=BATCH):
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_miniplant_")
+    db_file = os.path.join(workdir, "data_wtp.db")
+    plc = PlcEmulator(MODBUS_HOST, modbus_port, plc_latency / 1000, plc_jitter / 1000, override).start()
+    device = FakeDevice(override, batch)
+    env = dict(os.environ,
+               MINIPLANT_SERIAL_PORT=device.port,
+               MINIPLANT_PLC_IP=MODBUS_HOST,
+               MINIPLANT_PLC_PORT=str(modbus_port),
+               MINIPLANT_PUBLISH='1' if publish or db_mode == "subscriber" else '0',
+               MINIPLANT_PUBLISH_PORT=str(PUBLISH_PORT),
+               MINIPLANT_SAVE_DATABASE='1' if db_mode == "direct" else '0',
+               MINIPLANT_DB_FILE=db_file)
+    log = open(os.path.join(workdir, "handler.log"), "w")
+    processes = [subprocess.Popen([sys.executable] + HANDLERS[handler], cwd=HANDLER_DIR, env=env,
+                                  stdin=subprocess.PIPE, stdout=log, stderr=subprocess.STDOUT, text=True)]
+    processes[0].stdin.write("tidak\n") # jawaban prompt "Debug?" -> tanpa debug
+    processes[0].stdin.flush()
+    if db_mode == "subscriber":
+        # db_subscriber.py dijalankan dari workdir supaya data_wtp.db tertulis di sana
+        processes.append(subprocess.Popen([sys.executable, os.path.join(HANDLER_DIR, "db_subscriber.py")],
+                                          cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT))
+
+    try:
+        # tunggu handler siap: kirim frame sampai ada ACK pertama
+        deadline = time.monotonic() + WARMUP_TIMEOUT
+        while not device.ack_event.is_set():
+            if time.monotonic() > deadline or processes[0].poll() is not None:
+                raise RuntimeError(f"Handler tidak membalas, lihat {log.name}")
+            device.send()
+            device.ack_event.wait(0.5)
+        # sisa frame pemanasan dibalas dulu, db_subscriber.py sempat terhubung (reconnect tiap 2 detik)
+        time.sleep(3 if db_mode == "subscriber" else 1)
+        device.reset()
+        plc.reset_counters()
+
+        start_ms = int(time.time() * 1000)
+        start = time.perf_counter()
+        end = start + duration
+        sent = 0
+        while time.perf_counter() < end:
+            if rate:
+                target = start + sent / rate
+                delay = target - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                device.send()
+            else:
+                device.ack_event.clear()
+                device.send()
+                if not device.ack_event.wait(ACK_TIMEOUT):
+                    break
+            sent += 1
+        elapsed = time.perf_counter() - start
+        deadline = time.monotonic() + ACK_TIMEOUT
+        while device.replies < sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        transactions = plc.transactions()
+    finally:
+        # handler dulu, subscriber terakhir supaya sisa data sempat disimpan
+        for process in processes:
+            stop(process)
+        device.close()
+        plc.stop()
+        log.close()
+
+    db_rows = None
+    if db_mode != "off" and os.path.exists(db_file):
+        conn = sqlite3.connect(db_file)
+        db_rows = conn.execute("SELECT COUNT(*) FROM monitor_wtp WHERE ts >= ?", (start_ms,)).fetchone()[0]
+        conn.close()
+
+    latencies_ms = [value * 1000 for value in device.latencies]
+    acked = device.replies
+    return {
+        "handler": handler,
+        "rate": rate,
+        "override": override,
+        "db_mode": db_mode,
+        "plc_latency_ms": plc_latency,
+        "plc_jitter_ms": plc_jitter,
+        "batch": batch,
+        "duration_s": round(elapsed, 3),
+        "frames_sent": sent,
+        "frames_acked": acked,
+        "frames_lost": sent - acked,
+        "frames_per_s": round(acked / elapsed, 2),
+        "samples_per_s": round(acked * batch / elapsed, 2),
+        "ack_latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 3) if latencies_ms else None,
+            "p99": round(percentile(latencies_ms, 99), 3) if latencies_ms else None,
+            "max": round(max(latencies_ms), 3) if latencies_ms else None,
+            "mean": round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else None,
+        },
+        "plc_transactions": transactions,
+        "plc_transactions_per_frame": round(sum(transactions.values()) / acked, 3) if acked else None,
+        "db_rows": db_rows,
+        "db_rows_per_s": round(db_rows / elapsed, 2) if db_rows is not None else None,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "workdir": workdir,
+    }
+
+COMPARE_KEYS = [
+    ("frames_per_s", lambda r: r["frames_per_s"], True),
+    ("samples_per_s", lambda r: r.get("samples_per_s"), True),
+    ("ack_p50_ms", lambda r: r["ack_latency_ms"]["p50"], False),
+    ("ack_p99_ms", lambda r: r["ack_latency_ms"]["p99"], False),
+    ("plc_transactions_per_frame", lambda r: r["plc_transactions_per_frame"], False),
+    ("db_rows_per_s", lambda r: r["db_rows_per_s"], True),
+]
+
+def compare(old, new):
+    #cetak perubahan metrik terhadap hasil lama (naik lebih baik untuk throughput, turun untuk latensi)
+    for name, get, higher_better in COMPARE_KEYS:
+        a, b = get(old), get(new)
+        if a is None or b is None:
+            continue
+        change = (b - a) / a * 100 if a else 0.0
+        better = change >= 0 if higher_better else change <= 0
+        print(f"{name.ljust(28)} {a:>10} -> {b:>10}  ({change:+.1f}%{'' if better else '  LEBIH BURUK'})",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end Data_Handler")
+    parser.add_argument("--handler", choices=sorted(HANDLERS), default="main")
+    parser.add_argument("--rate", type=float, default=RATE, help="frame/detik, 0 = secepat mungkin")
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--db", choices=["off", "direct", "subscriber"], default="off",
+                        help="direct = SAVE_DATABASE di handler, subscriber = lewat db_subscriber.py")
+    parser.add_argument("--override", action="store_true", help="coil override (slave 2 coil 6) aktif")
+    parser.add_argument("--no-publish", action="store_true")
+    parser.add_argument("--modbus-port", type=int, default=MODBUS_PORT)
+    parser.add_argument("--plc-latency", type=float, default=0.0, help="ms per transaksi Modbus")
+    parser.add_argument("--plc-jitter", type=float, default=0.0, help="ms, latensi acak +- jitter")
+    parser.add_argument("--batch", type=int, default=BATCH, help="sampel per frame (frame batch jika > 1)")
+    parser.add_argument("--sweep", type=lambda text: [float(v) for v in text.split(",")], nargs="?", const=SWEEP,
+                        help="daftar latensi PLC (ms), satu run per nilai, default 1,5,10,25,50")
+    parser.add_argument("--output", help="simpan hasil JSON ke file")
+    parser.add_argument("--compare", help="file JSON hasil sebelumnya")
+    args = parser.parse_args()
+
+    if args.sweep:
+        results = []
+        for latency in args.sweep:
+            result = run_benchmark(args.handler, args.rate, args.duration, args.db, args.override,
+                                   not args.no_publish, modbus_port=args.modbus_port,
+                                   plc_latency=latency, plc_jitter=args.plc_jitter, batch=args.batch)
+            results.append(result)
+            print(f"latensi PLC {latency:5g} ms  {result['frames_per_s']:9.2f} frame/s  {result['samples_per_s']:9.2f} sampel/s  "
+                  f"ACK p50 {result['ack_latency_ms']['p50']} ms  p99 {result['ack_latency_ms']['p99']} ms  "
+                  f"{result['plc_transactions_per_frame']} transaksi/frame", file=sys.stderr)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(json.dumps(results, indent=2) + "\n")
+        sys.exit(0)
+
+    result = run_benchmark(args.handler, args.rate, args.duration, args.db, args.override,
+                           not args.no_publish, modbus_port=args.modbus_port,
+                           plc_latency=args.plc_latency, plc_jitter=args.plc_jitter, batch=args.batch)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
@@ -0,0 +1,184 @@
+"""
+Emulator PLC Modbus TCP untuk uji tanpa PLC / ModbusPoll.
+
+Slave 1 dan 2 masing-masing hanya punya holding register 0-4 dan coil 0-21, sama
+seperti yang dipakai main.py, main_simul.py dan main_async.py (coil 6 slave 2 =
+perintah override). Alamat di luar itu dijawab exception Modbus, jadi akses yang
+salah langsung terlihat. Setiap transaksi dihitung per slave dan bisa diberi
+latensi (+ jitter) untuk melihat pengaruh PLC yang lambat ke handler.
+
+    python3 plc_emulator.py --latency 10 --jitter 2
+    python3 plc_emulator.py --override-period 30                  -> override nyala/mati tiap 30 detik
+    python3 plc_emulator.py --override-script 0:0,10:1,25:0       -> detik:nilai coil override
+
+Handler diarahkan ke emulator lewat environment:
+    MINIPLANT_PLC_IP=127.0.0.1 MINIPLANT_PLC_PORT=5020 python3 main.py
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+import time
+from pymodbus.server import ModbusTcpServer
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext, ModbusServerContext
+
+HOST = '127.0.0.1'
+PORT = 5020
+REGISTERS = 5           # holding register 0-4: level_1, level_2, tds_1, flow_1, pressure_1
+COILS = 22              # coil 0-21: input (0-7), output (8-15), output2 (16-21)
+OVERRIDE_SLAVE = 2
+OVERRIDE_COIL = 6       # perintah override dari HMI
+LATENCY = 0.0           # detik per transaksi Modbus
+JITTER = 0.0            # detik, latensi acak +- JITTER
+STATUS_INTERVAL = 5     # detik antar baris status (CLI)
+
+
+class EmulatedSlave(ModbusSlaveContext):
+    #slave dengan peta register MiniPlant, menghitung transaksi dan menahan jawaban selama latensi
+    def __init__(self, latency=LATENCY, jitter=JITTER, rng=None):
+        super().__init__(co=ModbusSequentialDataBlock(0, [0] * COILS),
+                         hr=ModbusSequentialDataBlock(0, [0] * REGISTERS),
+                         zero_mode=True)
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.transactions = 0
+
+    def delay(self):
+        if self.jitter:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        return self.latency
+
+    def getValues(self, fc_as_hex, address, count=1):
+        self.transactions += 1
+        return super().getValues(fc_as_hex, address, count)
+
+    def setValues(self, fc_as_hex, address, values):
+        self.transactions += 1
+        return super().setValues(fc_as_hex, address, values)
+
+    async def async_getValues(self, fc_as_hex, address, count=1):
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self.getValues(fc_as_hex, address, count)
+
+    async def async_setValues(self, fc_as_hex, address, values):
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self.setValues(fc_as_hex, address, values)
+
+def parse_script(text):
+    #"0:0,10:1,25:0" -> [(0.0, 0), (10.0, 1), (25.0, 0)] (detik sejak start, nilai coil override)
+    steps = []
+    for item in text.split(","):
+        at, value = item.split(":")
+        steps.append((float(at), int(value)))
+    return sorted(steps)
+
+
+class PlcEmulator:
+    def __init__(self, host=HOST, port=PORT, latency=LATENCY, jitter=JITTER, override=False,
+                 override_script=None, override_period=None, seed=None):
+        self.host = host
+        self.port = port
+        rng = random.Random(seed)
+        self.slaves = {unit: EmulatedSlave(latency, jitter, rng) for unit in (1, 2)}
+        self.set_override(override)
+        self.override_script = override_script or []
+        self.override_period = override_period
+        self.override_changes = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    @property
+    def override(self):
+        return bool(self.slaves[OVERRIDE_SLAVE].store['c'].getValues(OVERRIDE_COIL, 1)[0])
+
+    def set_override(self, value):
+        self.slaves[OVERRIDE_SLAVE].store['c'].setValues(OVERRIDE_COIL, [1 if value else 0])
+
+    def reset_counters(self):
+        for slave in self.slaves.values():
+            slave.transactions = 0
+
+    def transactions(self):
+        return {str(unit): slave.transactions for unit, slave in self.slaves.items()}
+
+    async def _script(self):
+        #ubah coil override sesuai jadwal (--override-script) atau bergantian tiap periode
+        started = time.monotonic()
+        for at, value in self.override_script:
+            await asyncio.sleep(max(0.0, started + at - time.monotonic()))
+            self.set_override(value)
+            self.override_changes += 1
+        while self.override_period:
+            await asyncio.sleep(self.override_period)
+            self.set_override(not self.override)
+            self.override_changes += 1
+
+    async def _serve(self):
+        context = ModbusServerContext(slaves=self.slaves, single=False)
+        self.server = ModbusTcpServer(context=context, address=(self.host, self.port))
+        script = asyncio.create_task(self._script())
+        try:
+            await self.server.listen()
+            self.ready.set()
+            await self.server.serving
+        finally:
+            script.cancel()
+            self.ready.set()
+
+    def start(self, timeout=5):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self._serve(),),
+                                       name="plc-emulator", daemon=True)
+        self.thread.start()
+        if not self.ready.wait(timeout) or not self.thread.is_alive():
+            raise RuntimeError(f"Emulator PLC gagal dibuka di {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.server.shutdown(), self.loop).result(5)
+        self.thread.join(5)
+        self.loop.close()
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulator PLC Modbus TCP MiniPlant")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--latency", type=float, default=LATENCY * 1000, help="ms per transaksi")
+    parser.add_argument("--jitter", type=float, default=JITTER * 1000, help="ms, latensi acak +- jitter")
+    parser.add_argument("--override", action="store_true", help="coil override aktif sejak awal")
+    parser.add_argument("--override-script", type=parse_script, help="detik:nilai,... contoh 0:0,10:1,25:0")
+    parser.add_argument("--override-period", type=float, help="detik, override nyala/mati bergantian")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    emulator = PlcEmulator(args.host, args.port, args.latency / 1000, args.jitter / 1000, args.override,
+                           args.override_script, args.override_period, args.seed)
+    emulator.start()
+    print(f"Emulator PLC di {args.host}:{args.port} (latensi {args.latency:g} ms +- {args.jitter:g} ms)")
+    try:
+        while True:
+            time.sleep(STATUS_INTERVAL)
+            registers = emulator.slaves[1].store['h'].getValues(0, REGISTERS)
+            print(f"transaksi {emulator.transactions()}  override {int(emulator.override)}  register {registers}")
+    except KeyboardInterrupt:
+        print("Emulator dihentikan")
+    finally:
+        emulator.stop()
@@ -1,64 +1,338 @@
-from flask import Flask, render_template, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template, request, Response, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
 import sqlite3
+import socket
+import base64
+import json
+import struct
+import time
+import os
+import sys
+from threading import Lock
+from history import parse_fields, history_query, stream_json, merge_steps, RowCursor, VALUE_FIELDS
+from trend import trend_step, downsample, POINTS, MAX_POINTS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler'))
+import partition
+from codec import FLAGS_INPUT, FLAGS_OUTPUT, FLAGS_OUTPUT_2
 
 app = Flask(__name__)
 socketio = SocketIO(app)
 
-def ambil_data():
-    conn = sqlite3.connect('data_wtp.db')
-    conn.row_factory = sqlite3.Row
+DB_FILE = 'data_wtp.db'
+PARTITION_DIR = None        # folder partisi harian dari Data_Handler/partition.py, None = satu file DB_FILE
+POLL_INTERVAL = 0.5
+TELEMETRY_SOURCE = 'push'   # 'push' = langsung dari Data_Handler (socket), 'database' = polling SQLite
+HANDLER_HOST = '127.0.0.1'
+HANDLER_PORT = 5800
+PUSH_INTERVAL = 0.002       # jeda cek socket Data_Handler saat tidak ada data
+RECONNECT_INTERVAL = 5      # selama Data_Handler tidak tersedia, polling database dulu
+
+# Satu broadcaster untuk semua client: hanya satu sumber data dan satu emit
+# per baris baru, berapa pun jumlah layar operator yang terbuka.
+broadcaster = None
+broadcaster_lock = Lock()
+data_terakhir = {}   # plant_id -> snapshot terakhir, langsung dikirim ke client yang baru subscribe
+data_seq = {}        # plant_id -> nomor urut update, dipakai client mode delta untuk cek update yang hilang
+data_biner = {}      # plant_id -> payload biner terakhir untuk client encoding 'binary'
+alarm_aktif = {}     # plant_id -> {rule: event alarm aktif}, dikirim ke client yang baru subscribe
+
+# Client mode 'full' menerima data_monitor lengkap setiap update (default).
+# Client mode 'delta' menerima snapshot sekali lalu hanya field yang berubah.
+# Client encoding 'binary' menerima event EVENT_BINARY: payload BINARY 17 byte tanpa nama
+# field (seq, level1, level2, tdsValue, flowRate, pressureValue, 3 byte flag berurutan
+# seperti paket serial), dibaca dengan DataView di main.js. Payload dikirim base64 dalam
+# frame teks biasa: attachment biner Socket.IO menambah paket placeholder ~50 byte per
+# emit, lebih besar dari payload-nya sendiri.
+# Event alarm dari Data_Handler/alarms.py dikirim sebagai "alarm" ke semua room skid itu,
+# saat subscribe client menerima "alarm_aktif" (plant_id + daftar alarm yang sedang aktif).
+# Room dipisah per skid (Data_Handler/main_multi.py), contoh 'delta:skid2'. Data tanpa
+# plant_id (main.py satu skid / polling DB_FILE) dianggap milik DEFAULT_PLANT.
+ROOM_FULL = 'full'
+ROOM_DELTA = 'delta'
+ROOM_BINARY = 'binary'
+BINARY = struct.Struct("<I5H3B")   # seq (uint32), 5 sensor (uint16), flag input / output / output2 (bit 0 dulu)
+EVENT_BINARY = 'b'                 # nama event sependek mungkin, ikut terkirim setiap update
+DEFAULT_PLANT = 'wtp'
+last_db_id = None
+db_path = None               # file database yang terakhir dipolling (partisi berganti -> last_db_id direset)
+
+def ambil_data(conn):
     c = conn.cursor()
     c.execute("SELECT * FROM monitor_wtp ORDER BY id DESC LIMIT 1")
-    row = c.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    rows = c.fetchall()
+    c.close()
+    return dict(rows[0]) if rows else None
+
+def format_data(Last):
+    Last["level_1"] = round((Last["level_1"]/100) * 100) #Asumsi tinggi tangki 100cm
+    Last["level_2"] = round((Last["level_2"]/80) * 100) # Asumsi tinggi tanki 80cm
+    return {
+        "id" : Last["id"],
+        "timestamp" : Last["timestamp"],
+        "level1" : Last["level_1"],
+        "level2" : Last["level_2"],
+        "tdsValue" : Last["tds_1"],
+        "flowRate" : Last["flow_1"],
+        "pressureValue" : Last["pressure_1"],
+        "levelSwitch" : Last["level_switch"],
+        "mode_standby" : Last["mode_standby"],
+        "mode_filtering" : Last["mode_filtering"],
+        "mode_backwash" : Last["mode_backwash"],
+        "mode_drain" : Last["mode_drain"],
+        "mode_override" : Last["mode_override"],
+        "emergency_stop" : Last["emergency_stop"],
+        "solenoid1" : Last["solenoid_1"],
+        "solenoid2" : Last["solenoid_2"],
+        "solenoid3" : Last["solenoid_3"],
+        "solenoid4" : Last["solenoid_4"],
+        "solenoid5" : Last["solenoid_5"],
+        "solenoid6" : Last["solenoid_6"],
+        "pump1" : Last["pompa_1"],
+        "pump2" : Last["pompa_2"],
+        "pump3" : Last["pompa_3"]
+    }
+
+def pack_flags(row, names):
+    byte = 0
+    for i, name in enumerate(names):
+        if row.get(name):
+            byte |= 1 << i
+    return byte
+
+def format_binary(Last, data, seq):
+    #data_monitor versi biner (base64), flag diambil dari kolom mentah monitor_wtp
+    sensors = [min(max(round(data[key] or 0), 0), 0xFFFF) for key in ("level1", "level2", "tdsValue", "flowRate", "pressureValue")]
+    payload = BINARY.pack(seq & 0xFFFFFFFF, *sensors,
+                          pack_flags(Last, FLAGS_INPUT), pack_flags(Last, FLAGS_OUTPUT), pack_flags(Last, FLAGS_OUTPUT_2))
+    return base64.b64encode(payload).decode()
+
+def room(mode, plant):
+    return f"{mode}:{plant}"
+
+def kirim_data(Last):
+    plant = Last.get("plant_id") or DEFAULT_PLANT
+    data = format_data(Last)
+    data["plant_id"] = plant
+    previous = data_terakhir.get(plant)
+    if previous is None:
+        changes = data
+    else:
+        changes = {key: value for key, value in data.items() if previous.get(key) != value}
+    data_terakhir[plant] = data
+    data_seq[plant] = data_seq.get(plant, 0) + 1
+    socketio.emit("data_monitor", data, to=room(ROOM_FULL, plant))
+    socketio.emit("data_monitor_delta", {"plant_id": plant, "seq": data_seq[plant], "changes": changes},
+                  to=room(ROOM_DELTA, plant))
+    data_biner[plant] = format_binary(Last, data, data_seq[plant])
+    socketio.emit(EVENT_BINARY, data_biner[plant], to=room(ROOM_BINARY, plant))
+
+def kirim_alarm(event):
+    #event alarm dari Data_Handler (alarms.py) ke semua client skid itu, apa pun mode / encoding-nya
+    plant = event.get("plant_id") or DEFAULT_PLANT
+    event["plant_id"] = plant
+    aktif = alarm_aktif.setdefault(plant, {})
+    if event.get("state") == "active":
+        aktif[event["rule"]] = event
+    else:
+        aktif.pop(event["rule"], None)
+    socketio.emit("alarm", event, to=[room(mode, plant) for mode in (ROOM_FULL, ROOM_DELTA, ROOM_BINARY)])
+
+def kirim_alarm_aktif(plant):
+    #daftar alarm aktif skid yang baru di-subscribe, client mengganti seluruh banner dengan ini
+    emit("alarm_aktif", {"plant_id": plant, "alarms": list(alarm_aktif.get(plant, {}).values())})
 
-def poll_data():
-    Last_id = None
+def kirim_snapshot(plant):
+    if plant in data_terakhir:
+        emit("data_monitor_snapshot", {"plant_id": plant, "seq": data_seq[plant], "data": data_terakhir[plant]})
+
+def poll_data(duration=None):
+    #polling database, berhenti setelah duration detik (None = terus)
+    global last_db_id, db_path
+    conn = None
+    deadline = None if duration is None else time.monotonic() + duration
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            # pada penyimpanan terpartisi, pindah ke file partisi terbaru saat berganti hari
+            latest = partition.latest_partition(PARTITION_DIR) if PARTITION_DIR else DB_FILE
+            if conn is None or latest != db_path:
+                if conn is not None:
+                    conn.close()
+                conn = sqlite3.connect(latest) if latest else None
+                if conn is not None:
+                    conn.row_factory = sqlite3.Row
+                if latest != db_path:
+                    # id hanya unik per file: baris terakhir file baru selalu dikirim
+                    db_path = latest
+                    last_db_id = None
+            try:
+                Last = ambil_data(conn) if conn is not None else None
+            except sqlite3.Error as e:
+                print(f"Gagal membaca database: {e}")
+                Last = None
+            if Last and last_db_id != Last["id"]:
+                last_db_id = Last['id']
+                kirim_data(Last)
+                print("Berhasil Poll")
+            socketio.sleep(POLL_INTERVAL)
+    finally:
+        if conn is not None:
+            conn.close()
+
+def listen_handler():
+    #terima data langsung dari Data_Handler (publisher.py), kembali saat koneksi putus
+    try:
+        sock = socket.create_connection((HANDLER_HOST, HANDLER_PORT), timeout=1)
+    except OSError:
+        return False
+    print("Terhubung ke Data_Handler")
+    sock.setblocking(False)
+    buffer = b""
+    try:
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                socketio.sleep(PUSH_INTERVAL)
+                continue
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                message = json.loads(line)
+                if message.get("type") == "data":
+                    kirim_data(message)
+                elif message.get("type") == "alarm":
+                    kirim_alarm(message)
+    except (OSError, ValueError) as e:
+        print(f"Gagal membaca data dari Data_Handler: {e}")
+    finally:
+        sock.close()
+    print("Koneksi ke Data_Handler terputus")
+    return True
+
+def broadcast_data():
     while True:
-        Last = ambil_data()
-        if Last_id != Last["id"]:
-            Last_id = Last['id']
-            Last["level_1"] = round((Last["level_1"]/100) * 100) #Asumsi tinggi tangki 100cm
-            Last["level_2"] = round((Last["level_2"]/80) * 100) # Asumsi tinggi tanki 80cm
-            Data = {
-                "id" : Last["id"],
-                "timestamp" : Last["timestamp"],
-                "level1" : Last["level_1"],
-                "level2" : Last["level_2"],
-                "tdsValue" : Last["tds_1"],
-                "flowRate" : Last["flow_1"],
-                "pressureValue" : Last["pressure_1"],
-                "levelSwitch" : Last["level_switch"],
-                "mode_standby" : Last["mode_standby"],
-                "mode_filtering" : Last["mode_filtering"],
-                "mode_backwash" : Last["mode_backwash"],
-                "mode_drain" : Last["mode_drain"],
-                "mode_override" : Last["mode_override"],
-                "emergency_stop" : Last["emergency_stop"],
-                "solenoid1" : Last["solenoid_1"],
-                "solenoid2" : Last["solenoid_2"],
-                "solenoid3" : Last["solenoid_3"],
-                "solenoid4" : Last["solenoid_4"],
-                "solenoid5" : Last["solenoid_5"],
-                "solenoid6" : Last["solenoid_6"],
-                "pump1" : Last["pompa_1"],
-                "pump2" : Last["pompa_2"],
-                "pump3" : Last["pompa_3"]
-            }
-            socketio.emit("data_monitor", Data)
-            print("Berhasil Poll")
-        socketio.sleep(0.5)
+        if TELEMETRY_SOURCE == 'push':
+            listen_handler()
+            poll_data(RECONNECT_INTERVAL)
+        else:
+            poll_data()
 
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/api/history')
+def api_history():
+    # /api/history?from=<ms>&to=<ms>&fields=level_1,tds_1&step=<ms>
+    try:
+        end = int(request.args.get('to') or time.time() * 1000)
+        start = int(request.args.get('from') or end - 3600 * 1000)
+        fields = parse_fields(request.args.get('fields'))
+        step = int(request.args['step']) if request.args.get('step') else None
+        if step is not None and step <= 0:
+            raise ValueError("step harus lebih dari 0")
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    if PARTITION_DIR:
+        # query paralel ke setiap partisi di rentang from..to, hasil urut digabung
+        paths = partition.partitions_between(start, end, PARTITION_DIR)
+        query = lambda conn: history_query(conn, start, end, fields, step, with_count=step is not None)
+        try:
+            rows = partition.fan_out(paths, query)
+        except sqlite3.Error as e:
+            return jsonify(error=f"Gagal membaca riwayat: {e}"), 500
+        if step is not None:
+            rows = merge_steps(rows)
+        return Response(stream_json(RowCursor(rows), fields, step), mimetype='application/json')
+
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    try:
+        cursor = history_query(conn, start, end, fields, step)
+    except sqlite3.Error as e:
+        conn.close()
+        return jsonify(error=f"Gagal membaca riwayat (sudah jalankan database.py?): {e}"), 500
+
+    def generate():
+        try:
+            yield from stream_json(cursor, fields, step)
+        finally:
+            conn.close()
+    return Response(generate(), mimetype='application/json')
+
+def fetch_rows(start, end, fields, step):
+    #semua baris riwayat start..end sekaligus (diolah di memori), dari partisi atau DB_FILE
+    if PARTITION_DIR:
+        paths = partition.partitions_between(start, end, PARTITION_DIR)
+        rows = partition.fan_out(paths, lambda conn: history_query(conn, start, end, fields, step, with_count=step is not None))
+        return list(merge_steps(rows)) if step is not None else list(rows)
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        return history_query(conn, start, end, fields, step).fetchall()
+    finally:
+        conn.close()
+
+@app.route('/api/trend')
+def api_trend():
+    # /api/trend?from=<ms>&to=<ms>&fields=level_1,tds_1&points=<titik per seri, mis. lebar chart dalam pixel>
+    try:
+        end = int(request.args.get('to') or time.time() * 1000)
+        start = int(request.args.get('from') or end - 3600 * 1000)
+        fields = parse_fields(request.args.get('fields'))
+        points = int(request.args.get('points') or POINTS)
+        if any(field not in VALUE_FIELDS for field in fields):
+            raise ValueError("Tren hanya untuk field sensor: " + ",".join(VALUE_FIELDS))
+        if not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"points harus 3-{MAX_POINTS}")
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    step = trend_step(start, end, points)
+    try:
+        rows = fetch_rows(start, end, fields, step)
+    except sqlite3.Error as e:
+        return jsonify(error=f"Gagal membaca riwayat: {e}"), 500
+    return jsonify({"from": start, "to": end, "step": step, "rows": len(rows),
+                    "series": downsample(rows, fields, points)})
+
 @socketio.on('connect')
 def handle_monitor():
-    socketio.start_background_task(poll_data)
+    global broadcaster
+    with broadcaster_lock:
+        if broadcaster is None:
+            broadcaster = socketio.start_background_task(broadcast_data)
+    # belum masuk room apa pun: skid dan mode dipilih client lewat 'subscribe'
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    # {'mode': 'delta', 'plant': 'skid2'} -> snapshot sekali lalu hanya perubahan, selain itu data lengkap
+    # {'encoding': 'binary'} -> data lengkap dalam payload biner (mode diabaikan)
+    data = data or {}   # emit('subscribe') tanpa argumen = data lengkap skid default
+    plant = data.get('plant') or DEFAULT_PLANT
+    for name in rooms():
+        if name != request.sid:
+            leave_room(name)
+    if data.get('encoding') == 'binary':
+        join_room(room(ROOM_BINARY, plant))
+        if plant in data_biner:
+            emit(EVENT_BINARY, data_biner[plant])
+    elif data.get('mode') == 'delta':
+        join_room(room(ROOM_DELTA, plant))
+        kirim_snapshot(plant)
+    else:
+        join_room(room(ROOM_FULL, plant))
+        if plant in data_terakhir:
+            emit("data_monitor", data_terakhir[plant])
+    kirim_alarm_aktif(plant)
+
+@socketio.on('snapshot_request')
+def handle_snapshot_request(data=None):
+    # client mode delta mendeteksi seq yang loncat, kirim ulang snapshot penuh
+    kirim_snapshot((data or {}).get('plant') or DEFAULT_PLANT)
 
 @socketio.on('emergency')
 def monitor_WTP(data):
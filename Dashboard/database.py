@@ -1,8 +1,16 @@
 import sqlite3
 
 # Buat Database
+# Untuk database lama, jalankan ulang script ini: kolom ts (epoch milidetik UTC)
+# dan index-nya akan ditambahkan lalu diisi dari kolom timestamp.
 conn = sqlite3.connect("data_wtp.db")
 c = conn.cursor()
+jenis = c.execute("SELECT type FROM sqlite_master WHERE name = 'monitor_wtp'").fetchone()
+if jenis and jenis[0] == "view":
+    # mode penyimpanan ringkas (Data_Handler/compact.py), skema sudah lengkap
+    print("monitor_wtp memakai mode ringkas, tidak perlu migrasi")
+    conn.close()
+    raise SystemExit(0)
 c.execute("""
 CREATE TABLE IF NOT EXISTS monitor_wtp (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -28,8 +36,29 @@ CREATE TABLE IF NOT EXISTS monitor_wtp (
         pompa_1 INTEGER,
         pompa_2 INTEGER,
         pompa_3 INTEGER,
-        stepper INTEGER
+        stepper INTEGER,
+        ts INTEGER
 );
 """)
+
+# Migrasi kolom ts
+kolom = [row[1] for row in c.execute("PRAGMA table_info(monitor_wtp)")]
+if "ts" not in kolom:
+    c.execute("ALTER TABLE monitor_wtp ADD COLUMN ts INTEGER")
+c.execute("""
+UPDATE monitor_wtp SET ts = CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000
+WHERE ts IS NULL AND timestamp IS NOT NULL
+""")
+c.execute("CREATE INDEX IF NOT EXISTS idx_monitor_wtp_ts ON monitor_wtp (ts)")
+
+# Isi ts otomatis untuk penulis yang hanya mengisi timestamp
+c.execute("""
+CREATE TRIGGER IF NOT EXISTS monitor_wtp_fill_ts AFTER INSERT ON monitor_wtp
+WHEN NEW.ts IS NULL AND NEW.timestamp IS NOT NULL
+BEGIN
+    UPDATE monitor_wtp SET ts = CAST(strftime('%s', NEW.timestamp, 'utc') AS INTEGER) * 1000
+    WHERE id = NEW.id;
+END
+""")
 conn.commit()
-conn.close()
\ No newline at end of file
+conn.close()
@@ -0,0 +1,117 @@
+"""
+Query riwayat monitor_wtp berdasarkan kolom ts (epoch milidetik, ber-index).
+
+    history_query(conn, start, end, fields, step)
+        step None  -> baris mentah di antara start..end
+        step (ms)  -> rata-rata per step; jika step kelipatan bucket rollup
+                      (1s/1m/1h) yang tersedia, dibaca dari tabel rollup sehingga
+                      biayanya tidak tergantung jumlah data mentah.
+    stream_json(cursor, fields, step)
+        menghasilkan JSON sedikit demi sedikit (fetchmany) supaya hasil besar tidak
+        perlu ditampung seluruhnya di memori.
+    merge_steps(rows)
+        pada penyimpanan terpartisi (Data_Handler/partition.py) bucket yang terbelah
+        di batas partisi digabung kembali.
+"""
+
+import json
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler'))
+# kolom yang sama dengan tabel rollup, supaya field yang bisa di-query selalu ikut rollup.py
+from rollup import VALUE_FIELDS, FLAG_FIELDS
+
+# tabel rollup dari Data_Handler/rollup.py, panjang bucket dalam milidetik
+ROLLUPS = [("rollup_1h", 3600000), ("rollup_1m", 60000), ("rollup_1s", 1000)]
+FETCH_SIZE = 1000
+
+
+def parse_fields(fields):
+    if not fields:
+        return list(VALUE_FIELDS)
+    fields = [f.strip() for f in fields.split(",") if f.strip()]
+    for field in fields:
+        if field not in VALUE_FIELDS and field not in FLAG_FIELDS:
+            raise ValueError(f"Field tidak dikenal: {field}")
+    return fields
+
+def available_rollup(conn, step):
+    #rollup terbesar yang bucket-nya pas membagi step
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'rollup_%'")}
+    for name, size in ROLLUPS:
+        if name in names and step >= size and step % size == 0:
+            return name, size
+    return None
+
+def history_query(conn, start, end, fields, step=None, with_count=False):
+    #with_count: query ber-step menyertakan jumlah sampel per bucket di kolom kedua (untuk merge_steps)
+    if step is None:
+        columns = ", ".join(fields)
+        return conn.execute(
+            f"SELECT ts, {columns} FROM monitor_wtp WHERE ts BETWEEN ? AND ? ORDER BY ts",
+            (start, end))
+
+    rollup = available_rollup(conn, step)
+    if rollup:
+        # gabungkan bucket rollup menjadi bucket step (rata-rata berbobot jumlah sampel)
+        table, size = rollup
+        columns = ", ".join(
+            f"SUM({f}_avg * n) / SUM(n)" if f in VALUE_FIELDS else f"SUM({f}_on * n) / SUM(n)"
+            for f in fields)
+        count = "SUM(n), " if with_count else ""
+        return conn.execute(
+            f"SELECT bucket * 1000 / ? * ? AS t, {count}{columns} FROM {table} "
+            f"WHERE bucket BETWEEN ? AND ? GROUP BY t ORDER BY t",
+            (step, step, start // size * size // 1000, end // 1000))
+
+    columns = ", ".join(f"AVG({f})" for f in fields)
+    count = "COUNT(*), " if with_count else ""
+    return conn.execute(
+        f"SELECT ts / ? * ? AS t, {count}{columns} FROM monitor_wtp "
+        f"WHERE ts BETWEEN ? AND ? GROUP BY t ORDER BY t",
+        (step, step, start, end))
+
+def merge_steps(rows):
+    #gabungkan bucket dengan t yang sama dari beberapa partisi (rata-rata berbobot jumlah sampel),
+    #input baris (t, n, nilai...) urut t, hasil (t, nilai...) seperti history_query biasa
+    current = None
+    for row in rows:
+        if current is not None and current[0] == row[0]:
+            n = current[1] + row[1]
+            values = [a if b is None else b if a is None else (a * current[1] + b * row[1]) / n
+                      for a, b in zip(current[2:], row[2:])]
+            current = [row[0], n] + values
+            continue
+        if current is not None:
+            yield (current[0],) + tuple(current[2:])
+        current = list(row)
+    if current is not None:
+        yield (current[0],) + tuple(current[2:])
+
+class RowCursor:
+    #bungkus iterator baris supaya bisa dibaca stream_json seperti cursor sqlite3
+    def __init__(self, rows):
+        self.rows = iter(rows)
+
+    def fetchmany(self, size):
+        return list(itertools.islice(self.rows, size))
+
+    def close(self):
+        pass
+
+def stream_json(cursor, fields, step=None):
+    yield '{"fields":' + json.dumps(["ts"] + fields) + ',"step":' + json.dumps(step) + ',"rows":['
+    first = True
+    try:
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            chunk = ",".join(json.dumps(row) for row in rows)
+            yield chunk if first else "," + chunk
+            first = False
+    finally:
+        cursor.close()
+    yield "]}"
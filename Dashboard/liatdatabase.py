@@ -1,8 +1,169 @@
+"""
+Ekspor monitor_wtp secara streaming dan inkremental.
+
+Hanya baris dengan id lebih besar dari id terakhir yang sudah diekspor yang dibaca,
+per CHUNK_SIZE baris lewat cursor, jadi memori tetap konstan berapa pun panjang
+riwayatnya. Baris csv ditambah dengan urutan kolom header file yang sudah ada,
+walaupun tabel sudah punya kolom tambahan (mis. ts).
+    python liatdatabase.py                   -> tambah baris baru ke monitor_wtp.csv
+    python liatdatabase.py --format parquet  -> file part_<id awal>_<id akhir>.parquet
+                                                baru di folder monitor_wtp_parquet/
+    python liatdatabase.py --format arrow    -> sama, format Arrow IPC (.arrow)
+Format parquet/arrow membutuhkan pyarrow.
+"""
+
 import sqlite3
-import pandas as pd
-conn = sqlite3.connect('data_wtp.db')
-query = f"SELECT * FROM monitor_wtp"
-df = pd.read_sql_query(query, conn)
-df.to_csv("monitor_wtp.csv", index=False)
-conn.close()
-print(df.tail())
\ No newline at end of file
+import argparse
+import csv
+import os
+import glob
+import sys
+
+DB_FILE = 'data_wtp.db'
+CHUNK_SIZE = 5000
+VALUE_FIELDS = ["level_1", "level_2", "tds_1", "flow_1", "pressure_1"]
+
+
+def last_id_csv(path):
+    #baca id di baris terakhir file csv tanpa membaca seluruh file
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return 0
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        line = b""
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            line = f.read(step) + line
+            if line.rstrip(b"\r\n").count(b"\n") >= 1:
+                break
+        last = line.rstrip(b"\r\n").split(b"\n")[-1]
+    try:
+        return int(last.split(b",")[0])
+    except ValueError:
+        return 0 # hanya header
+
+def header_csv(path):
+    #kolom di baris header file csv yang sudah ada, None jika file baru
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, newline='') as f:
+        return next(csv.reader(f), None)
+
+def last_id_parts(folder, ext):
+    last = 0
+    for path in glob.glob(os.path.join(folder, f"part_*_*.{ext}")):
+        last = max(last, int(os.path.basename(path).split(".")[0].split("_")[2]))
+    return last
+
+def table_columns(conn):
+    return [row[1] for row in conn.execute("PRAGMA table_info(monitor_wtp)")]
+
+def read_chunks(conn, after_id, columns=None, chunk_size=CHUNK_SIZE):
+    #columns: daftar kolom yang dibaca berurutan (mis. header csv lama), None = semua kolom tabel
+    columns = columns or table_columns(conn)
+    c = conn.execute(f"SELECT {', '.join(columns)} FROM monitor_wtp WHERE id > ? ORDER BY id", (after_id,))
+    def chunks():
+        try:
+            while True:
+                rows = c.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            c.close()
+    return columns, chunks()
+
+def export_csv(conn, path):
+    #baris baru ditambah dengan kolom yang sama persis dengan header file yang sudah ada
+    header = header_csv(path)
+    if header:
+        missing = [column for column in header if column not in table_columns(conn)]
+        if missing or header[0] != "id":
+            raise ValueError(f"Header {path} tidak cocok dengan tabel monitor_wtp ({', '.join(missing) or 'id'}), "
+                             f"ekspor ke file baru dengan --output")
+    after_id = last_id_csv(path)
+    columns, chunks = read_chunks(conn, after_id, header)
+    new_file = header is None
+    total = 0
+    last_row = None
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f, lineterminator="\n")
+        if new_file:
+            writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            total += len(rows)
+            last_row = rows[-1]
+    return total, last_row
+
+def arrow_schema(pa, columns):
+    types = []
+    for column in columns:
+        if column == "timestamp":
+            types.append(pa.string())
+        elif column in VALUE_FIELDS:
+            types.append(pa.float64())
+        else:
+            types.append(pa.int64())
+    return pa.schema(list(zip(columns, types)))
+
+def export_arrow(conn, folder, fmt):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Format parquet/arrow membutuhkan pyarrow (pip install pyarrow)")
+        return 0, None
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    os.makedirs(folder, exist_ok=True)
+    after_id = last_id_parts(folder, ext)
+    columns, chunks = read_chunks(conn, after_id)
+    schema = arrow_schema(pa, columns)
+    tmp_path = os.path.join(folder, f".part_tmp.{ext}")
+    writer = None
+    total = 0
+    last_row = None
+    try:
+        for rows in chunks:
+            if writer is None:
+                first_id = rows[0][0]
+                writer = pq.ParquetWriter(tmp_path, schema) if ext == "parquet" else pa.ipc.new_file(tmp_path, schema)
+            batch = pa.record_batch([pa.array(col, type=t) for col, t in zip(zip(*rows), schema.types)], schema=schema)
+            writer.write_batch(batch)
+            total += len(rows)
+            last_row = rows[-1]
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is not None:
+        # rename setelah selesai, file part yang setengah jadi tidak pernah terhitung
+        os.replace(tmp_path, os.path.join(folder, f"part_{first_id}_{last_row[0]}.{ext}"))
+    return total, last_row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor data monitor_wtp")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--format", choices=["csv", "parquet", "arrow"], default="csv")
+    parser.add_argument("--output", help="file csv atau folder parquet/arrow")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.format == "csv":
+        output = args.output or "monitor_wtp.csv"
+        try:
+            total, last_row = export_csv(conn, output)
+        except ValueError as e:
+            conn.close()
+            print(e)
+            sys.exit(1)
+    else:
+        output = args.output or f"monitor_wtp_{args.format}"
+        total, last_row = export_arrow(conn, output, args.format)
+    conn.close()
+    print(f"{total} baris baru diekspor ke {output}")
+    if last_row:
+        print(last_row)
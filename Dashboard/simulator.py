@@ -1,14 +1,93 @@
+"""
+Simulator data MiniPlant.
+
+    python3 simulator.py                          -> 1 baris acak setiap 0.5 detik (seperti dulu)
+    python3 simulator.py --rate 2000              -> load generator: 2000 baris/detik ke DB_FILE
+    python3 simulator.py --rate 5000 --backfill 86400 --db ukuran.db
+                                                  -> isi 1 hari data secepat mungkin (ukur kapasitas)
+    python3 simulator.py --pty --rate 200         -> frame 10 byte mentah ke pty untuk Data_Handler
+                                                     (MINIPLANT_SERIAL_PORT=<path pty> python3 main.py)
+
+Load generator memakai PlantModel: level tangki berubah bertahap dan mode berputar
+standby -> filtering (isi, dosing, aduk, endapan, filtering) -> backwash -> drain,
+dengan aktuator per tahap seperti main_code_WTP.ino. Tekanan naik dan flow turun
+seiring filter tersumbat, lalu pulih setelah backwash. --speed mempercepat waktu
+proses (satu siklus normalnya beberapa menit). Baris ditulis lewat DatabaseWriter
+(atau PartitionedWriter jika PARTITION_DIR diisi) dengan BATCH_SIZE baris per commit.
+"""
+
 import time
 import sqlite3
 from datetime import datetime
 import random
+import os
+import sys
+import argparse
+import select
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler'))
+from codec import FLAGS_INPUT, FLAGS_OUTPUT, FLAGS_OUTPUT_2, BYTE, ACK_BYTE, OVERRIDE_BYTE, encode
 
 DB_FILE = "data_wtp.db"
+PARTITION_DIR = None # samakan dengan PARTITION_DIR di app.py untuk menulis ke partisi harian
+
+COLUMNS = [
+    "timestamp", "level_1", "level_2", "tds_1", "flow_1", "pressure_1",
+    "level_switch", "mode_standby", "mode_filtering", "mode_backwash", "mode_drain",
+    "mode_override", "emergency_stop", "solenoid_1", "solenoid_2", "solenoid_3",
+    "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2", "pompa_3", "stepper"
+]
+
+# load generator (--rate)
+RATE = 1000             # baris (atau frame) per detik
+BATCH_SIZE = 1000       # baris per transaksi database
+TICK = 0.01             # detik, baris yang sudah jatuh tempo dikirim sekaligus per tick
+REPORT_INTERVAL = 1.0   # detik antar baris laporan
+
+# model proses (level dalam cm seperti sensor: tangki agitator 100 cm, storage 80 cm)
+SETPOINT_ATAS = 70      # SETPOINT_ATAS_TANGKI_AGITATOR di main_code_WTP.ino
+SETPOINT_BAWAH = 20     # SETPOINT_BAWAH_TANGKI_AGITATOR
+STORAGE_KOSONG = 4      # LEVEL_TANGKI_STORAGE_KOSONG (5% dari 80 cm)
+STORAGE_PENUH = 72
+FILL_RATE = 1.2         # cm/detik, pompa_1 mengisi tangki agitator
+FILTER_RATE = 0.4       # cm/detik, tangki agitator turun saat filtering
+TRANSFER_RATIO = 0.8    # kenaikan storage per cm turunnya agitator
+BACKWASH_RATE = 0.9     # cm/detik
+DRAIN_RATE = 0.6        # cm/detik, storage dikosongkan
+CLOG_RATE = 0.004       # kenaikan sumbatan filter per detik filtering (0-1)
+# (nama tahap, mode, durasi detik atau None = sampai syarat level terpenuhi)
+PHASES = [
+    ("standby", "mode_standby", 20),
+    ("isi", "mode_filtering", None),
+    ("dosing", "mode_filtering", 5),
+    ("aduk", "mode_filtering", 5),
+    ("endapan", "mode_filtering", 5),
+    ("filtering", "mode_filtering", None),
+    ("isi_backwash", "mode_backwash", None),
+    ("backwash", "mode_backwash", None),
+    ("drain", "mode_drain", None),
+]
+# aktuator yang menyala per tahap (sama seperti mode_filtering(), mode_backwash(), mode_drain() di Arduino)
+OUTPUTS = {
+    "standby": ("standby_lamp",),
+    "isi": ("pompa_1", "filtering_lamp"),
+    "dosing": ("pompa_3", "filtering_lamp"),
+    "aduk": ("stepper", "filtering_lamp"),
+    "endapan": (),
+    "filtering": ("solenoid_1", "solenoid_2", "solenoid_3", "pompa_2", "filtering_lamp"),
+    "isi_backwash": ("pompa_1", "backwash_lamp"),
+    "backwash": ("solenoid_1", "solenoid_5", "solenoid_6", "pompa_2", "backwash_lamp"),
+    "drain": ("solenoid_1", "solenoid_2", "solenoid_3", "solenoid_4", "solenoid_5", "solenoid_6", "drain_lamp"),
+}
+
 
 def simulator():
     """Simulasikan penambahan data baru ke DB setiap detik"""
     conn = sqlite3.connect(DB_FILE)
     c = conn.cursor()
+    writer = None
+    if PARTITION_DIR:
+        from partition import PartitionedWriter
+        writer = PartitionedWriter(PARTITION_DIR, batch_size=1)
     while True:
         status = random.choice([True, False])
         status2 = random.choice([True, False])
@@ -16,32 +95,7 @@ def simulator():
         status4 = random.choice([True, False])
         value1 = random.uniform(0,100)
         value2 = random.uniform(0,80)
-        c.execute("""INSERT INTO monitor_wtp (
-            timestamp,
-            level_1,
-            level_2,
-            tds_1,
-            flow_1,
-            pressure_1,
-            level_switch,
-            mode_standby,
-            mode_filtering,
-            mode_backwash,
-            mode_drain,
-            mode_override,
-            emergency_stop,
-            solenoid_1,
-            solenoid_2,
-            solenoid_3,
-            solenoid_4,
-            solenoid_5,
-            solenoid_6,
-            pompa_1,
-            pompa_2,
-            pompa_3,
-            stepper
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-        (
+        values = (
         datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
         value1, 
         value2, 
@@ -64,10 +118,250 @@ def simulator():
         status2, 
         status3, 
         status4,
-        status4))
-        conn.commit()
+        status4)
+        if writer is not None:
+            writer.add(dict(zip(COLUMNS, values)))
+        else:
+            c.execute("""INSERT INTO monitor_wtp (
+                timestamp,
+                level_1,
+                level_2,
+                tds_1,
+                flow_1,
+                pressure_1,
+                level_switch,
+                mode_standby,
+                mode_filtering,
+                mode_backwash,
+                mode_drain,
+                mode_override,
+                emergency_stop,
+                solenoid_1,
+                solenoid_2,
+                solenoid_3,
+                solenoid_4,
+                solenoid_5,
+                solenoid_6,
+                pompa_1,
+                pompa_2,
+                pompa_3,
+                stepper
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            values)
+            conn.commit()
         print(f"[Simulator] Data baru: {value1} {value2} , Bool: {status}")
         time.sleep(0.5)
 
+
+#========================== MODEL PROSES ==========================
+class PlantModel:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.level_1 = 35.0
+        self.level_2 = 30.0
+        self.clog = 0.05
+        self.index = 0
+        self.elapsed = 0.0
+        self.cycles = 0
+
+    @property
+    def phase(self):
+        return PHASES[self.index][0]
+
+    def _done(self):
+        name, mode, duration = PHASES[self.index]
+        if duration is not None:
+            return self.elapsed >= duration
+        if name in ("isi", "isi_backwash"):
+            return self.level_1 >= SETPOINT_ATAS
+        if name in ("filtering", "backwash"):
+            # storage penuh juga menghentikan filtering supaya tidak meluap
+            return self.level_1 <= SETPOINT_BAWAH or (name == "filtering" and self.level_2 >= STORAGE_PENUH)
+        return self.level_2 <= STORAGE_KOSONG
+
+    def step(self, dt):
+        #maju dt detik waktu proses
+        name = self.phase
+        if name in ("isi", "isi_backwash"):
+            self.level_1 += FILL_RATE * dt
+        elif name == "filtering":
+            moved = FILTER_RATE * (1 - 0.5 * self.clog) * dt
+            self.level_1 -= moved
+            self.level_2 += moved * TRANSFER_RATIO
+            self.clog = min(1.0, self.clog + CLOG_RATE * dt)
+        elif name == "backwash":
+            self.level_1 -= BACKWASH_RATE * dt
+            self.clog = max(0.05, self.clog - 0.02 * dt)
+        elif name == "drain":
+            self.level_2 -= DRAIN_RATE * dt
+        self.level_1 = min(max(self.level_1, 0.0), 100.0)
+        self.level_2 = min(max(self.level_2, 0.0), 80.0)
+        self.elapsed += dt
+        if self._done():
+            self.index = (self.index + 1) % len(PHASES)
+            self.elapsed = 0.0
+            if self.index == 0:
+                self.cycles += 1
+
+    def _sensor(self, value, noise):
+        return min(max(int(round(value + self.rng.gauss(0, noise))), 0), 255)
+
+    def row(self):
+        #dict kolom monitor_wtp (nilai sensor 0-255 seperti frame serial)
+        name, mode, _ = PHASES[self.index]
+        outputs = OUTPUTS[name]
+        pumping = "pompa_2" in outputs
+        row = {flag: 0 for flag in FLAGS_INPUT + FLAGS_OUTPUT + FLAGS_OUTPUT_2}
+        row["level_switch"] = 1
+        row[mode] = 1
+        # tombol start ditekan sebentar di awal setiap mode selain standby
+        row["pb_start"] = int(mode != "mode_standby" and self.elapsed < 1.0 and name in ("isi", "isi_backwash", "drain"))
+        for flag in outputs:
+            row[flag] = 1
+        if name == "endapan":
+            row["filtering_lamp"] = int(self.elapsed % 1.0 < 0.5) # berkedip
+        row["level_1"] = self._sensor(self.level_1, 0.3)
+        row["level_2"] = self._sensor(self.level_2, 0.3)
+        row["flow_1"] = self._sensor((40 * (1 - 0.5 * self.clog)) if pumping else 0, 1.0)
+        row["pressure_1"] = self._sensor((45 + 120 * self.clog) if pumping else 3, 1.5)
+        row["tds_1"] = self._sensor(60 + 50 * self.clog if name == "filtering" else 180, 2.0)
+        return row
+
+def frame_bytes(row):
+    #row -> paket 10 byte dengan checksum (codec.py)
+    input_byte = BYTE[tuple(row[flag] for flag in FLAGS_INPUT)]
+    output_byte = BYTE[tuple(row[flag] for flag in FLAGS_OUTPUT)]
+    output_byte2 = BYTE[tuple(row[flag] for flag in FLAGS_OUTPUT_2) + (0, 0)]
+    return encode(row["level_1"], row["level_2"], row["tds_1"], row["flow_1"], row["pressure_1"],
+                  input_byte, output_byte, output_byte2)
+
+
+#========================== LOAD GENERATOR ==========================
+def open_db_writer(path, batch_size):
+    if PARTITION_DIR:
+        from partition import PartitionedWriter
+        return PartitionedWriter(PARTITION_DIR, batch_size=batch_size)
+    from db_writer import DatabaseWriter
+    return DatabaseWriter(path, batch_size=batch_size)
+
+class PtyOutput:
+    #sisi "Arduino" dari pty: frame ditulis ke master, balasan handler (0xFF / 0xBB + 2 byte) dibaca dan dihitung
+    def __init__(self):
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.master)
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.pending = b""
+        self.acks = 0
+        self.overrides = 0
+
+    def write(self, packet):
+        os.write(self.master, packet)
+
+    def poll(self):
+        while select.select([self.master], [], [], 0)[0]:
+            self.pending += os.read(self.master, 4096)
+        i = 0
+        while i < len(self.pending):
+            if self.pending[i] == ACK_BYTE:
+                self.acks += 1
+                i += 1
+            elif self.pending[i] == OVERRIDE_BYTE:
+                if len(self.pending) - i < 3:
+                    break
+                self.overrides += 1
+                i += 3
+            else:
+                i += 1
+        self.pending = self.pending[i:]
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+def load_generator(rate=RATE, duration=0, batch_size=BATCH_SIZE, db=DB_FILE, pty_output=False, backfill=0,
+                   speed=1.0, seed=None):
+    model = PlantModel(seed)
+    dt = speed / rate               # detik waktu proses per baris
+    step_ms = 1000.0 / rate
+    output = writer = None
+    unit = "frame" if pty_output else "baris"
+    if pty_output:
+        output = PtyOutput()
+        print(f"[Simulator] Frame dikirim ke {output.port} ({rate} frame/detik)")
+        print(f"[Simulator] Jalankan handler dengan MINIPLANT_SERIAL_PORT={output.port}")
+    else:
+        writer = open_db_writer(db, batch_size)
+        print(f"[Simulator] {rate} baris/detik ke {PARTITION_DIR or db}, {batch_size} baris per commit")
+
+    if backfill:
+        # data lama secepat mungkin: timestamp berjarak 1/rate detik, berakhir di waktu sekarang
+        total = int(backfill * rate)
+        first_ms = time.time() * 1000 - total * step_ms
+    else:
+        total = int(duration * rate) if duration else None
+        first_ms = time.time() * 1000
+    sent = 0
+    started = time.monotonic()
+    last_report, last_sent = started, 0
+    try:
+        while total is None or sent < total:
+            now = time.monotonic()
+            due = total if backfill else int((now - started) * rate) + 1
+            if total is not None:
+                due = min(due, total)
+            if backfill:
+                due = min(due, sent + batch_size)
+            while sent < due:
+                model.step(dt)
+                row = model.row()
+                if output:
+                    output.write(frame_bytes(row))
+                else:
+                    writer.add(row, ts=int(first_ms + sent * step_ms))
+                sent += 1
+            if output:
+                output.poll()
+            elif not backfill:
+                writer.poll()
+            if now - last_report >= REPORT_INTERVAL:
+                report = f"[Simulator] {(sent - last_sent) / (now - last_report):.0f} {unit}/detik, total {sent}, " \
+                         f"tahap {model.phase}, level {model.level_1:.0f}/{model.level_2:.0f} cm, siklus {model.cycles}"
+                if output:
+                    report += f", ACK {output.acks}, override {output.overrides}"
+                print(report)
+                last_report, last_sent = now, sent
+            if not backfill:
+                time.sleep(max(0.0, min(TICK, started + sent / rate - time.monotonic())))
+    except KeyboardInterrupt:
+        print("[Simulator] Dihentikan")
+    finally:
+        if writer:
+            writer.close()
+        if output:
+            output.close()
+    elapsed = time.monotonic() - started
+    print(f"[Simulator] {sent} {unit} dalam {elapsed:.1f} detik ({sent / max(elapsed, 1e-9):.0f} {unit}/detik)")
+    return sent
+
+
 if __name__ == "__main__":
-    simulator()
+    parser = argparse.ArgumentParser(description="Simulator data MiniPlant")
+    parser.add_argument("--rate", type=float, help="load generator: baris/frame per detik (tanpa opsi ini: simulator acak lama)")
+    parser.add_argument("--duration", type=float, default=0, help="detik, 0 = sampai Ctrl+C")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="baris per commit database")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--pty", action="store_true", help="kirim frame serial mentah ke pty, bukan ke database")
+    parser.add_argument("--backfill", type=float, default=0, help="isi data lama sepanjang N detik secepat mungkin")
+    parser.add_argument("--speed", type=float, default=1.0, help="pengali waktu proses (10 = siklus 10x lebih cepat)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.rate is None and not (args.pty or args.backfill or args.duration):
+        simulator()
+    else:
+        if args.pty and args.backfill:
+            parser.error("--backfill hanya untuk database")
+        load_generator(args.rate or RATE, args.duration, args.batch, args.db, args.pty, args.backfill, args.speed, args.seed)
@@ -20,8 +20,87 @@ const backwash = document.getElementById("indikator-backwash");
 const drain = document.getElementById("indikator-drain");
 const override = document.getElementById("indikator-override");
 
+// Mode update: 'delta' = snapshot sekali lalu hanya field yang berubah, 'full' = data lengkap tiap update
+const UPDATE_MODE = "delta";
+// Skid yang ditampilkan, pilih lewat URL (contoh /?plant=skid2), kosong = skid default Dashboard
+const PLANT = new URLSearchParams(location.search).get("plant");
+// Encoding 'binary' (URL /?encoding=binary, untuk tablet panel jarak jauh) = payload 17 byte per update
+const ENCODING = new URLSearchParams(location.search).get("encoding") || "json";
+let state = null;
+let seq = null;
+let menungguSnapshot = false;
+
+socket.on("connect", () => {
+  state = null;
+  menungguSnapshot = false;
+  alarm = {};
+  alarmPlant = null;
+  tampilkanAlarm();
+  socket.emit("subscribe", {mode: UPDATE_MODE, plant: PLANT, encoding: ENCODING});
+});
+
+socket.on("data_monitor", render);
+
+// Payload biner (app.py BINARY, base64): seq uint32, 5 sensor uint16, 3 byte flag (bit 0 dulu), little endian
+socket.on("b", (payload) => {
+  const view = new DataView(Uint8Array.from(atob(payload), (c) => c.charCodeAt(0)).buffer);
+  const input = view.getUint8(14);
+  const output = view.getUint8(15);
+  const output2 = view.getUint8(16);
+  const bit = (byte, i) => (byte >> i) & 1;
+  seq = view.getUint32(0, true);
+  render({
+    level1: view.getUint16(4, true),
+    level2: view.getUint16(6, true),
+    tdsValue: view.getUint16(8, true),
+    flowRate: view.getUint16(10, true),
+    pressureValue: view.getUint16(12, true),
+    levelSwitch: bit(input, 0),
+    mode_standby: bit(input, 2),
+    mode_filtering: bit(input, 3),
+    mode_backwash: bit(input, 4),
+    mode_drain: bit(input, 5),
+    mode_override: bit(input, 6),
+    emergency_stop: bit(input, 7),
+    solenoid1: bit(output, 0),
+    solenoid2: bit(output, 1),
+    solenoid3: bit(output, 2),
+    solenoid4: bit(output, 3),
+    solenoid5: bit(output, 4),
+    solenoid6: bit(output, 5),
+    pump1: bit(output, 6),
+    pump2: bit(output, 7),
+    pump3: bit(output2, 0),
+  });
+});
+
+socket.on("data_monitor_snapshot", (msg) => {
+  menungguSnapshot = false;
+  state = msg.data;
+  seq = msg.seq;
+  render(state);
+});
+
+socket.on("data_monitor_delta", (msg) => {
+  // Ada update yang terlewat, minta snapshot baru
+  if (state === null || msg.seq !== seq + 1) {
+    state = null;
+    if (!menungguSnapshot) {
+      menungguSnapshot = true;
+      socket.emit("snapshot_request", {plant: PLANT});
+    }
+    return;
+  }
+  Object.assign(state, msg.changes);
+  seq = msg.seq;
+  render(state);
+});
+
 // Handle Perubahan Visual
-socket.on("data_monitor", (data) => {
+function render(data) {
+
+// Tren ikut diperbarui saat ada data baru
+perbaruiTren();
 
 // Bar Level Air
 lvagitator.style.height = data.level1 + '%';
@@ -112,11 +191,180 @@ if (data.solenoid6 === 1) {
 } else {
   sv6.className = "false";
 }
-})
+}
+
+
+
 
 
+// Banner alarm (Data_Handler/alarms.py): event "active" ditampilkan sampai datang "clear".
+// "alarm_aktif" (balasan subscribe) menentukan skid banner, event skid lain diabaikan
+const alarmBanner = document.getElementById("alarm-banner");
+let alarm = {};
+let alarmPlant = null;
+
+socket.on("alarm_aktif", (msg) => {
+  alarmPlant = msg.plant_id;
+  alarm = {};
+  for (const event of msg.alarms) {
+    alarm[event.rule] = event;
+  }
+  tampilkanAlarm();
+});
+
+socket.on("alarm", (event) => {
+  if (event.plant_id !== alarmPlant) {
+    return;
+  }
+  if (event.state === "active") {
+    alarm[event.rule] = event;
+  } else {
+    delete alarm[event.rule];
+  }
+  tampilkanAlarm();
+});
+
+function tampilkanAlarm() {
+  const aktif = Object.values(alarm);
+  alarmBanner.replaceChildren(...aktif.map((event) => {
+    const baris = document.createElement("div");
+    baris.textContent = `\u26A0 ${event.message} (${event.field} = ${event.value}, batas ${event.limit}) sejak ${event.timestamp || new Date(event.ts).toLocaleTimeString()}`;
+    return baris;
+  }));
+  alarmBanner.className = "alarm-banner"
+    + (aktif.length ? " aktif" : "")
+    + (aktif.some((event) => event.severity === "critical") ? " critical" : "");
+}
+
+// Chart tren: /api/trend mengirim titik hasil LTTB sebanyak lebar canvas (pixel),
+// lalu setiap TREND_REFRESH hanya potongan sejak titik terakhir yang diminta dan disambung.
+// Potongan dimulai TREND_OVERLAP sebelum titik terakhir dan menggantikan ekor yang lama,
+// supaya baris yang di-commit terlambat (group commit, kiriman ulang frame batch) tetap masuk
+const trendCanvas = document.getElementById("trend-chart");
+const trendField = document.getElementById("trend-field");
+const trendWindow = document.getElementById("trend-window");
+const TREND_REFRESH = 5000;
+const TREND_OVERLAP = 5000;
+let tren = {field: null, points: [], to: null};
+let trenDiambil = 0;
+let trenBerjalan = false;
+
+function lebarTren() {
+  return Math.max(3, Math.round(trendCanvas.clientWidth));
+}
 
+async function ambilTren(params) {
+  params.set("fields", trendField.value);
+  const response = await fetch("/api/trend?" + params);
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.error);
+  }
+  return result;
+}
+
+async function trenPenuh() {
+  const field = trendField.value;
+  const rentang = Number(trendWindow.value);
+  trenDiambil = Date.now();
+  const result = await ambilTren(new URLSearchParams({from: Date.now() - rentang, points: lebarTren()}));
+  tren = {field: field, points: result.series[field], to: result.to};
+  gambarTren();
+}
+
+async function trenBaru() {
+  const field = tren.field;
+  const rentang = Number(trendWindow.value);
+  const terakhir = tren.points.length ? tren.points[tren.points.length - 1][0] : tren.to - rentang;
+  const dari = terakhir - TREND_OVERLAP;
+  // jumlah titik sebanding dengan panjang potongan baru terhadap lebar chart
+  const points = Math.max(3, Math.ceil(lebarTren() * (Date.now() - dari) / rentang));
+  const result = await ambilTren(new URLSearchParams({from: dari, points: points}));
+  if (field !== trendField.value) {
+    return;
+  }
+  while (tren.points.length && tren.points[tren.points.length - 1][0] >= dari) {
+    tren.points.pop();
+  }
+  tren.points.push(...result.series[field]);
+  tren.to = result.to;
+  const batas = tren.to - rentang;
+  let buang = 0;
+  while (buang < tren.points.length && tren.points[buang][0] < batas) {
+    buang++;
+  }
+  tren.points.splice(0, buang);
+  // potongan kecil menumpuk, ambil ulang penuh supaya kembali sebanyak lebar chart
+  if (tren.points.length > 2 * lebarTren()) {
+    return trenPenuh();
+  }
+  gambarTren();
+}
+
+function perbaruiTren() {
+  if (trenBerjalan || Date.now() - trenDiambil < TREND_REFRESH) {
+    return;
+  }
+  trenBerjalan = true;
+  trenDiambil = Date.now();
+  (tren.to === null || tren.field !== trendField.value ? trenPenuh() : trenBaru())
+    .catch((e) => console.log("Gagal memuat tren: " + e.message))
+    .finally(() => { trenBerjalan = false; });
+}
+
+function gambarTren() {
+  const skala = window.devicePixelRatio || 1;
+  const w = trendCanvas.clientWidth;
+  const h = trendCanvas.clientHeight;
+  trendCanvas.width = w * skala;
+  trendCanvas.height = h * skala;
+  const ctx = trendCanvas.getContext("2d");
+  ctx.setTransform(skala, 0, 0, skala, 0, 0);
+  ctx.clearRect(0, 0, w, h);
+  ctx.font = "14px Helvetica";
+  ctx.fillStyle = "#333333";
+
+  const titik = tren.points;
+  if (titik.length < 2) {
+    ctx.fillText("Belum ada data", w / 2 - 50, h / 2);
+    return;
+  }
+  const t1 = tren.to;
+  const t0 = t1 - Number(trendWindow.value);
+  let min = Infinity;
+  let max = -Infinity;
+  for (const [, nilai] of titik) {
+    min = Math.min(min, nilai);
+    max = Math.max(max, nilai);
+  }
+  if (min === max) {
+    min -= 1;
+    max += 1;
+  }
+  const kiri = 60;
+  const bawah = h - 24;
+  const x = (t) => kiri + (t - t0) / (t1 - t0) * (w - kiri - 10);
+  const y = (nilai) => 10 + (max - nilai) / (max - min) * (bawah - 10);
+
+  ctx.fillText(max.toFixed(1), 4, 20);
+  ctx.fillText(min.toFixed(1), 4, bawah);
+  ctx.fillText(new Date(t0).toLocaleString(), kiri, h - 4);
+  const akhir = new Date(t1).toLocaleString();
+  ctx.fillText(akhir, w - 10 - ctx.measureText(akhir).width, h - 4);
+
+  ctx.strokeStyle = "#cccccc";
+  ctx.strokeRect(kiri, 10, w - kiri - 10, bawah - 10);
+  ctx.strokeStyle = "#056716";
+  ctx.lineWidth = 1.5;
+  ctx.beginPath();
+  ctx.moveTo(x(titik[0][0]), y(titik[0][1]));
+  for (const [t, nilai] of titik) {
+    ctx.lineTo(x(t), y(nilai));
+  }
+  ctx.stroke();
+}
 
+trenPenuh().catch((e) => console.log("Gagal memuat tren: " + e.message));
 
 // Jika tombol emergency
 function emergency() {
@@ -0,0 +1,84 @@
+"""
+Downsampling riwayat untuk chart tren dengan LTTB (Largest-Triangle-Three-Buckets).
+
+LTTB memilih `points` titik dari n baris sehingga bentuk grafik (puncak, lembah,
+lonjakan) tetap terlihat: titik pertama dan terakhir selalu diambil, sisanya dibagi
+menjadi points - 2 bucket dan dari setiap bucket diambil titik yang membentuk
+segitiga terbesar dengan titik terpilih sebelumnya dan rata-rata bucket berikutnya.
+
+    trend_step(start, end, points) -> None (baris mentah) atau step ms untuk history_query
+    to_arrays(rows)                -> ts dan nilai per kolom (numpy float64, NULL = nan)
+    lttb(x, y, points)             -> indeks titik terpilih
+    downsample(rows, fields, points) -> {field: [[ts, nilai], ...]}
+
+Rata-rata per bucket dihitung sekaligus dengan numpy (reduceat), pemilihan titik
+berjalan per bucket tetapi luas segitiga setiap bucket dihitung vektor.
+"""
+
+import numpy as np
+from history import ROLLUPS
+
+POINTS = 800            # titik per seri jika client tidak menyebut (kira-kira lebar chart dalam pixel)
+MAX_POINTS = 5000
+RAW_SPAN = 24 * 3600 * 1000     # ms, rentang sampai 24 jam dibaca dari baris mentah (2 Hz = 172.800 baris)
+OVERSAMPLE = 4          # rentang lebih panjang dibaca per bucket rollup, minimal OVERSAMPLE x points bucket
+
+
+def trend_step(start, end, points):
+    #rentang panjang dibaca dari rata-rata per bucket (tabel rollup jika ada) dulu
+    span = end - start
+    if span <= RAW_SPAN:
+        return None
+    for _, size in ROLLUPS:
+        if span // size >= points * OVERSAMPLE:
+            return size
+    return None
+
+def to_arrays(rows):
+    #baris (ts, nilai...) -> (ts, matriks nilai), None dari database menjadi nan
+    data = np.array(rows, dtype=np.float64)
+    if data.size == 0:
+        return np.zeros(0), np.zeros((0, 0))
+    return data[:, 0], data[:, 1:]
+
+def lttb(x, y, points):
+    n = len(x)
+    if n <= points:
+        return np.arange(n)
+    if points < 3:
+        return np.array([0, n - 1][:points], dtype=np.intp)
+
+    # points - 2 bucket di antara titik pertama dan terakhir, setiap bucket minimal 1 titik
+    edges = 1 + np.arange(points - 1, dtype=np.intp) * (n - 2) // (points - 2)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    mean_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # titik ketiga segitiga: rata-rata bucket berikutnya, untuk bucket terakhir titik terakhir
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(points, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+def downsample(rows, fields, points=POINTS):
+    ts, values = to_arrays(rows)
+    series = {}
+    for i, field in enumerate(fields):
+        if not len(ts):
+            series[field] = []
+            continue
+        y = values[:, i]
+        valid = ~np.isnan(y)
+        x, y = ts[valid], y[valid]
+        index = lttb(x, y, points)
+        series[field] = [list(pair) for pair in zip(x[index].astype(np.int64).tolist(), y[index].tolist())]
+    return series
@@ -0,0 +1,216 @@
+"""
+Alarm dan batas (threshold) yang dievaluasi langsung di loop akuisisi, per frame.
+
+Aturan dibaca dari ALARMS_FILE (lihat alarms.example.json), default DEFAULT_RULES:
+
+    kind "high"  aktif jika nilai >= limit, normal lagi jika nilai <= limit - deadband
+    kind "low"   aktif jika nilai <= limit, normal lagi jika nilai > limit + deadband
+    kind "rate"  laju perubahan (satuan/detik, dihaluskan dengan konstanta waktu
+                 window detik) >= limit, normal lagi jika < limit - deadband.
+                 direction "rise" (default), "fall" atau "both"
+    kind "flag"  aktif jika kolom flag bernilai 1 (emergency_stop, dst)
+
+delay / clear_delay (detik) = kondisi harus bertahan selama itu sebelum alarm aktif /
+normal lagi, supaya nilai yang berkedip di sekitar batas tidak membanjiri event.
+
+Setiap aturan hanya menyimpan state terakhir (aktif, sejak kapan, nilai dan laju
+sebelumnya), jadi biaya evaluasi per frame tetap berapa pun panjang riwayatnya.
+Perubahan status menghasilkan event alarm (state "active" / "clear") yang dipublish
+dengan type "alarm" (Dashboard, db_subscriber.py) dan disimpan di tabel alarm_wtp.
+"""
+
+import datetime
+import json
+import math
+import os
+import sqlite3
+
+ALARMS_FILE = os.environ.get('MINIPLANT_ALARMS_FILE', 'alarms.json')
+KINDS = ("high", "low", "rate", "flag")
+SEVERITIES = ("info", "warning", "critical")
+
+# dipakai jika ALARMS_FILE tidak ada (format sama dengan alarms.example.json)
+DEFAULT_RULES = [
+    {"name": "tds_tinggi", "field": "tds_1", "kind": "high", "limit": 200, "deadband": 10, "delay": 2,
+     "severity": "warning", "message": "TDS tinggi"},
+    {"name": "level_1_rendah", "field": "level_1", "kind": "low", "limit": 10, "deadband": 5, "delay": 1,
+     "severity": "warning", "message": "Level tangki agitator rendah"},
+    {"name": "tekanan_lebih", "field": "pressure_1", "kind": "high", "limit": 220, "deadband": 15,
+     "severity": "critical", "message": "Tekanan berlebih"},
+    {"name": "tekanan_naik_cepat", "field": "pressure_1", "kind": "rate", "limit": 40, "deadband": 10, "window": 1,
+     "severity": "warning", "message": "Tekanan naik cepat"},
+    {"name": "emergency_stop", "field": "emergency_stop", "kind": "flag",
+     "severity": "critical", "message": "Emergency stop ditekan"},
+]
+
+CREATE_ALARM_TABLE = """
+CREATE TABLE IF NOT EXISTS alarm_wtp (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER,
+    timestamp TEXT,
+    plant_id TEXT,
+    rule TEXT,
+    field TEXT,
+    state TEXT,
+    severity TEXT,
+    value REAL,
+    limit_value REAL,
+    message TEXT
+)
+"""
+CREATE_ALARM_INDEX = "CREATE INDEX IF NOT EXISTS idx_alarm_wtp_ts ON alarm_wtp (ts)"
+INSERT_ALARM = """
+INSERT INTO alarm_wtp (ts, timestamp, plant_id, rule, field, state, severity, value, limit_value, message)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class AlarmRule:
+    __slots__ = ("name", "field", "kind", "limit", "deadband", "delay", "clear_delay", "window", "direction",
+                 "severity", "message", "active", "since", "newest", "last_value", "last_ts", "rate")
+
+    def __init__(self, name, field, kind, limit=1, deadband=0, delay=0, clear_delay=0, window=1,
+                 direction="rise", severity="warning", message=None):
+        if kind not in KINDS:
+            raise ValueError(f"kind alarm {name} harus salah satu dari {', '.join(KINDS)}")
+        if severity not in SEVERITIES:
+            raise ValueError(f"severity alarm {name} harus salah satu dari {', '.join(SEVERITIES)}")
+        if direction not in ("rise", "fall", "both"):
+            raise ValueError(f"direction alarm {name} harus rise, fall atau both")
+        self.name = name
+        self.field = field
+        self.kind = kind
+        self.limit = float(limit)
+        self.deadband = float(deadband)
+        self.delay = float(delay) * 1000
+        self.clear_delay = float(clear_delay) * 1000
+        self.window = float(window) * 1000
+        self.direction = direction
+        self.severity = severity
+        self.message = message or name
+        self.active = False
+        self.since = None       # ts saat kondisi berubah mulai terpenuhi (menunggu delay)
+        self.newest = None      # ts sampel terbaru yang sudah dievaluasi
+        self.last_value = None
+        self.last_ts = None
+        self.rate = 0.0
+
+    def measure(self, value, ts):
+        #nilai yang dibandingkan dengan limit (laju perubahan untuk kind "rate")
+        if self.kind != "rate":
+            return value
+        if self.last_ts is None:
+            self.last_value, self.last_ts = value, ts
+        else:
+            dt = ts - self.last_ts
+            rate = (value - self.last_value) * 1000 / dt
+            # rata-rata eksponensial: cukup nilai sebelumnya, tidak perlu menyimpan riwayat
+            alpha = 1 - math.exp(-dt / self.window) if self.window else 1.0
+            self.rate += alpha * (rate - self.rate)
+            self.last_value, self.last_ts = value, ts
+        if self.direction == "fall":
+            return -self.rate
+        if self.direction == "both":
+            return abs(self.rate)
+        return self.rate
+
+    def condition(self, measured):
+        #True = kondisi alarm, False = normal, memakai deadband sesuai status sekarang
+        if self.kind == "flag":
+            return bool(measured)
+        if self.kind == "low":
+            return measured <= self.limit if not self.active else measured <= self.limit + self.deadband
+        return measured >= self.limit if not self.active else measured > self.limit - self.deadband
+
+    def update(self, value, ts):
+        #kembalikan "active" / "clear" saat status berubah, None jika tidak
+        if self.newest is not None and ts <= self.newest:
+            #sampel lebih lama (kiriman ulang frame batch) tidak mengubah status alarm sekarang
+            return None
+        self.newest = ts
+        measured = self.measure(value, ts)
+        if self.condition(measured) == self.active:
+            self.since = None
+            return None
+        if self.since is None:
+            self.since = ts
+        if ts - self.since < (self.clear_delay if self.active else self.delay):
+            return None
+        self.active = not self.active
+        self.since = None
+        return "active" if self.active else "clear"
+
+
+class AlarmEngine:
+    def __init__(self, rules=None, plant_id=None):
+        self.rules = [AlarmRule(**rule) for rule in (DEFAULT_RULES if rules is None else rules)]
+        self.plant_id = plant_id
+        self.events = 0
+
+    def evaluate(self, row):
+        #cek semua aturan terhadap satu baris (dict dari build_row), kembalikan list event
+        ts = row.get("ts")
+        events = []
+        for rule in self.rules:
+            value = row.get(rule.field)
+            if value is None:
+                continue
+            state = rule.update(value, ts)
+            if state is None:
+                continue
+            events.append({
+                "ts": ts,
+                "timestamp": row.get("timestamp"),
+                "plant_id": row.get("plant_id", self.plant_id),
+                "rule": rule.name,
+                "field": rule.field,
+                "state": state,
+                "severity": rule.severity,
+                "value": round(rule.rate, 3) if rule.kind == "rate" else value,
+                "limit": rule.limit,
+                "message": rule.message,
+            })
+        self.events += len(events)
+        return events
+
+    def active(self):
+        return [rule.name for rule in self.rules if rule.active]
+
+    def stats(self):
+        return {'alarm_events': self.events, 'alarms_active': len(self.active())}
+
+
+def load_rules(path=ALARMS_FILE):
+    #list aturan dari file JSON ({"rules": [...]}), DEFAULT_RULES jika file tidak ada
+    if not os.path.exists(path):
+        return DEFAULT_RULES
+    with open(path) as f:
+        rules = json.load(f)["rules"]
+    names = [rule["name"] for rule in rules]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Nama alarm ganda di {path}")
+    return rules
+
+
+#========================== TABEL alarm_wtp ==========================
+class AlarmLog:
+    #event alarm ke tabel alarm_wtp, di-commit langsung (hanya terjadi saat status berubah)
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(CREATE_ALARM_TABLE)
+            self.conn.execute(CREATE_ALARM_INDEX)
+
+    def add(self, event):
+        ts = event.get("ts")
+        timestamp = event.get("timestamp")
+        if timestamp is None and ts is not None:
+            timestamp = datetime.datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            self.conn.execute(INSERT_ALARM, (ts, timestamp, event.get("plant_id"), event["rule"], event.get("field"),
+                                             event["state"], event.get("severity"), event.get("value"),
+                                             event.get("limit"), event.get("message")))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,160 @@
+"""
+Decoder massal (NumPy) untuk rekaman byte serial.
+
+decode_buffer(buf) menerima bytes / bytearray / memoryview / np.memmap berisi banyak
+paket 10 byte dan mengembalikan array kolom:
+    level_1 ... pressure_1      -> uint8 (N,)
+    input_flags                 -> uint8 (N, 8) urutan FLAGS_INPUT
+    output_flags                -> uint8 (N, 8) urutan FLAGS_OUTPUT
+    output_flags2               -> uint8 (N, 6) urutan FLAGS_OUTPUT_2
+    offsets                     -> posisi byte awal setiap paket di buffer
+Start byte dan checksum XOR dicek sekaligus untuk seluruh buffer. Jika buffer rapi
+(kelipatan 10 byte, semua paket valid) dipakai jalur cepat reshape; jika tidak,
+semua posisi START_BYTE diperiksa dan paket dipilih dengan aturan yang sama seperti
+FrameDecoder (paket valid pertama diambil, lalu lompat 10 byte).
+
+    python3 bulk_decode.py rekaman.bin    -> ringkasan dan kecepatan decode
+
+rekaman.bin boleh dump byte serial biasa atau file capture.py. Rekaman raw di-decode
+dari aliran byte aslinya, jadi checksum error dan byte dibuang ikut terhitung.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from codec import START_BYTE, PACKET_LENGTH, SENSORS, FLAGS_INPUT, FLAGS_OUTPUT, FLAGS_OUTPUT_2
+
+CHUNK_BYTES = 64_000_000         # decode_file membaca file per 64 MB (kelipatan PACKET_LENGTH)
+
+
+def _as_array(buf):
+    if isinstance(buf, np.ndarray):
+        return buf.reshape(-1).view(np.uint8)
+    return np.frombuffer(buf, dtype=np.uint8)
+
+def _select(valid, length):
+    #pilih paket valid yang tidak tumpang tindih, urut dari depan (sama seperti FrameDecoder)
+    if len(valid) < 2 or np.all(np.diff(valid) >= length):
+        return valid
+    selected = []
+    end = -1
+    for position in valid.tolist():
+        if position >= end:
+            selected.append(position)
+            end = position + length
+    return np.array(selected, dtype=np.int64)
+
+def decode_buffer(buf, start_byte=START_BYTE, packet_length=PACKET_LENGTH):
+    data = _as_array(buf)
+    size = len(data)
+
+    # jalur cepat: buffer berisi paket berurutan tanpa sampah
+    if size and size % packet_length == 0:
+        frames = data.reshape(-1, packet_length)
+        if np.all(frames[:, 0] == start_byte) and not np.bitwise_xor.reduce(frames, axis=1).any():
+            offsets = np.arange(0, size, packet_length, dtype=np.int64)
+            return _columns(frames, offsets, size, checksum_errors=0, remainder=size)
+
+    # jalur scan: semua kandidat start byte, checksum lewat prefix XOR
+    candidates = np.flatnonzero(data == start_byte)
+    complete = candidates[candidates + packet_length <= size]
+    prefix = np.zeros(size + 1, dtype=np.uint8)
+    np.bitwise_xor.accumulate(data, out=prefix[1:])
+    # XOR seluruh paket (termasuk byte checksum) = 0 berarti checksum cocok
+    ok = (prefix[complete + packet_length] ^ prefix[complete]) == 0
+    offsets = _select(complete[ok], packet_length)
+
+    # kandidat rusak yang tidak tertutup paket valid = checksum error di FrameDecoder
+    bad = complete[~ok]
+    if len(offsets) and len(bad):
+        index = np.searchsorted(offsets, bad, side="right") - 1
+        covered = (index >= 0) & (bad < offsets[np.maximum(index, 0)] + packet_length)
+        bad = bad[~covered]
+    checksum_errors = len(bad)
+
+    # sisa di ujung buffer (paket yang belum lengkap) untuk digabung dengan chunk berikutnya
+    end = int(offsets[-1]) + packet_length if len(offsets) else 0
+    tail = candidates[(candidates >= end) & (candidates + packet_length > size)]
+    remainder = int(tail[0]) if len(tail) else size
+
+    frames = data[offsets[:, None] + np.arange(packet_length)]
+    return _columns(frames, offsets, remainder, checksum_errors, remainder)
+
+def _columns(frames, offsets, scanned, checksum_errors, remainder):
+    flags = np.unpackbits(frames[:, 6:9], axis=1, bitorder="little")
+    result = {name: frames[:, i + 1] for i, name in enumerate(SENSORS)}
+    result["input_flags"] = flags[:, 0:8]
+    result["output_flags"] = flags[:, 8:16]
+    result["output_flags2"] = flags[:, 16:22]
+    result["offsets"] = offsets
+    result["frames"] = len(offsets)
+    result["checksum_errors"] = checksum_errors
+    result["discarded_bytes"] = scanned - len(offsets) * frames.shape[1] if len(frames) else scanned
+    result["remainder"] = remainder
+    return result
+
+def named_columns(decoded):
+    #array per kolom monitor_wtp (nama flag seperti build_row di main.py)
+    columns = {name: decoded[name] for name in SENSORS}
+    for names, key in ((FLAGS_INPUT, "input_flags"), (FLAGS_OUTPUT, "output_flags"), (FLAGS_OUTPUT_2, "output_flags2")):
+        for i, name in enumerate(names):
+            columns[name] = decoded[key][:, i]
+    return columns
+
+def iter_file(path, chunk_bytes=CHUNK_BYTES, start_byte=START_BYTE, packet_length=PACKET_LENGTH):
+    #decode file rekaman lewat memory map per chunk, offsets relatif terhadap awal file
+    if os.path.getsize(path) == 0:
+        return
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    position = 0
+    size = len(data)
+    while position < size:
+        end = min(position + chunk_bytes, size)
+        decoded = decode_buffer(data[position:end], start_byte, packet_length)
+        decoded["offsets"] = decoded["offsets"] + position
+        yield decoded
+        if end == size:
+            break
+        # mulai chunk berikutnya dari paket yang terpotong
+        position += decoded["remainder"] if decoded["remainder"] > 0 else end - position
+
+def decode_capture(path):
+    #file capture.py: mode raw dari aliran byte asli, mode paket dari record paket valid
+    import capture
+    version = capture.file_version(path)
+    if version == capture.RAW_VERSION:
+        return decode_buffer(capture.load_stream(path)[0])
+    return decode_buffer(np.ascontiguousarray(capture.load_numpy(path)[1]))
+
+def decode_file(path, chunk_bytes=CHUNK_BYTES):
+    parts = list(iter_file(path, chunk_bytes))
+    if not parts:
+        return decode_buffer(b"")
+    if len(parts) == 1:
+        return parts[0]
+    result = {}
+    for key, value in parts[0].items():
+        if isinstance(value, np.ndarray):
+            result[key] = np.concatenate([part[key] for part in parts])
+    for key in ("frames", "checksum_errors", "discarded_bytes"):
+        result[key] = sum(part[key] for part in parts)
+    result["remainder"] = parts[-1]["remainder"]
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Pemakaian: python3 bulk_decode.py rekaman.bin")
+        sys.exit(1)
+    start = time.perf_counter()
+    import capture
+    path = sys.argv[1]
+    decoded = decode_capture(path) if capture.file_version(path) else decode_file(path)
+    elapsed = time.perf_counter() - start
+    print(f"{decoded['frames']} paket dalam {elapsed:.2f} detik ({decoded['frames'] / max(elapsed, 1e-9):,.0f} paket/detik)")
+    print(f"checksum error: {decoded['checksum_errors']}, byte dibuang: {decoded['discarded_bytes']}")
+    for name in SENSORS:
+        if decoded["frames"]:
+            values = decoded[name]
+            print(f"{name.ljust(12)} min {values.min():3d}  max {values.max():3d}  rata-rata {values.mean():.1f}")
@@ -0,0 +1,357 @@
+"""
+Log rekaman serial mentah (append-only), dua mode:
+
+    raw (default main.py)   setiap chunk hasil ser.read() disimpan utuh bersama waktu
+                            terimanya (record CHUNK 12 byte + isi chunk, versi RAW_VERSION),
+                            termasuk byte yang dibuang FrameDecoder, checksum rusak, frame
+                            batch lengkap dengan sesi dan seq. Replay men-decode ulang
+                            dengan FrameDecoder + SequenceTracker, jadi gangguan di level
+                            link dan pertukaran ACK kumulatif bisa diputar ulang persis.
+    paket                   hanya paket valid, sebagai record tetap 18 byte (versi VERSION).
+
+Mode paket: setiap paket yang lolos FrameDecoder disimpan apa adanya bersama waktu
+terimanya sebagai record tetap 18 byte setelah header 16 byte. Karena ukuran record tetap,
+file bisa di-memory-map dan dibaca tanpa parsing (mmap / numpy), dan record yang
+terpotong di akhir file (listrik mati saat menulis) diabaikan saat dibaca dan
+dipotong saat file dibuka lagi untuk ditambah. Frame batch (codec.py) disimpan per
+sampel sebagai paket 10 byte biasa setelah lewat SequenceTracker (kiriman ulang dan
+duplikat tidak direkam lagi), waktu terimanya dimundurkan sesuai umur sampel (jarak
+seq ke sampel terbaru dan waktu sejak sampel itu tiba), jadi format record tidak berubah.
+
+    python3 capture.py info   capture_wtp.bin                             -> jumlah paket / chunk, rentang waktu
+    python3 capture.py replay capture_wtp.bin --db ulang.db --speed 0     -> bangun ulang database
+    python3 capture.py replay capture_wtp.bin --serial /dev/pts/3         -> kirim ulang ke handler
+    python3 capture.py replay capture_wtp.bin --publish --speed 10        -> putar ulang ke Dashboard
+    python3 capture.py rebuild capture_wtp.bin --db ulang.db              -> bangun ulang dengan numpy
+
+replay memutar paket / chunk sesuai jarak waktu aslinya (--speed 1), dipercepat
+(--speed 10) atau secepat mungkin (--speed 0). Paket diproses lewat process_packet /
+process_batch dan build_row dari main.py, lalu disimpan dengan DatabaseWriter memakai
+waktu terima aslinya. rebuild pada rekaman raw men-decode seluruh aliran byte dengan
+bulk_decode (hanya paket 10 byte, rekaman firmware frame batch pakai replay --db).
+"""
+
+import argparse
+import datetime
+import mmap
+import os
+import struct
+import sys
+import time
+from codec import BATCH_BYTE, decode_batch, encode_frame
+from frame_decoder import FrameDecoder, SequenceTracker
+
+CAPTURE_FILE = 'capture_wtp.bin'
+FLUSH_INTERVAL = 1.0     # detik, file di-flush ke disk paling lambat setiap 1 detik
+PACKET_LENGTH = 10
+
+MAGIC = b"MPCAP1\0\0"
+HEADER = struct.Struct("<8sHH4x")                   # magic, versi, panjang record (0 = panjang berubah)
+RECORD = struct.Struct(f"<q{PACKET_LENGTH}s")       # waktu terima (epoch mikrodetik), paket mentah
+CHUNK = struct.Struct("<qI")                        # waktu terima (epoch mikrodetik), panjang chunk
+VERSION = 1             # mode paket
+RAW_VERSION = 2         # mode raw
+
+
+class CaptureWriter:
+    def __init__(self, path=CAPTURE_FILE, flush_interval=FLUSH_INTERVAL, raw=False):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.raw = raw
+        version = RAW_VERSION if raw else VERSION
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_file:
+            check_header(path, version)
+            # record terakhir terpotong (listrik mati saat menulis) dipotong dulu, supaya record
+            # berikutnya tetap sejajar
+            size = raw_size(path) if raw else HEADER.size + count_records(path) * RECORD.size
+            if os.path.getsize(path) != size:
+                os.truncate(path, size)
+        self.file = open(path, "ab", buffering=64 * 1024)
+        if new_file:
+            self.file.write(HEADER.pack(MAGIC, version, 0 if raw else RECORD.size))
+        self.records = 0
+        self.last_flush = time.monotonic()
+
+    def write_chunk(self, chunk, ts_us=None):
+        #mode raw: byte apa adanya dari ser.read()
+        if ts_us is None:
+            ts_us = time.time_ns() // 1000
+        self.file.write(CHUNK.pack(ts_us, len(chunk)))
+        self.file.write(chunk)
+        self.records += 1
+
+    def write(self, packet, ts_us=None):
+        if ts_us is None:
+            ts_us = time.time_ns() // 1000
+        self.file.write(RECORD.pack(ts_us, packet))
+        self.records += 1
+
+    def write_frames(self, frames, ts_us=None, interval=0, offsets=None):
+        #sampel frame batch yang diterima SequenceTracker sebagai paket 10 byte. offsets = umur sampel
+        #dalam satuan interval (tracker.offsets), waktu terima dimundurkan offset x interval
+        if ts_us is None:
+            ts_us = time.time_ns() // 1000
+        if offsets is None:
+            offsets = range(len(frames) - 1, -1, -1)
+        for frame, offset in zip(frames, offsets):
+            self.write(encode_frame(frame), int(ts_us - offset * interval * 1000))
+
+    def poll(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def file_version(path):
+    #VERSION (mode paket) atau RAW_VERSION (mode raw), None jika bukan file rekaman
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != MAGIC or (version, record_size) not in ((VERSION, RECORD.size), (RAW_VERSION, 0)):
+        return None
+    return version
+
+def check_header(path, version=VERSION):
+    if file_version(path) != version:
+        mode = "raw" if version == RAW_VERSION else "paket"
+        raise ValueError(f"{path} bukan file rekaman mode {mode} (versi {version})")
+
+def count_records(path):
+    return max(os.path.getsize(path) - HEADER.size, 0) // RECORD.size
+
+def _walk_chunks(mapped, size):
+    #(posisi isi, ts_us, panjang) setiap chunk yang lengkap
+    position = HEADER.size
+    while position + CHUNK.size <= size:
+        ts_us, length = CHUNK.unpack_from(mapped, position)
+        if position + CHUNK.size + length > size:
+            break
+        yield position + CHUNK.size, ts_us, length
+        position += CHUNK.size + length
+
+def raw_size(path):
+    #panjang file sampai akhir chunk lengkap terakhir
+    size = os.path.getsize(path)
+    if size <= HEADER.size:
+        return HEADER.size
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        end = HEADER.size
+        for start, _, length in _walk_chunks(mapped, size):
+            end = start + length
+        return end
+
+def iter_chunks(path):
+    #(ts_us, chunk) dari rekaman raw lewat mmap
+    check_header(path, RAW_VERSION)
+    size = os.path.getsize(path)
+    if size <= HEADER.size:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start, ts_us, length in _walk_chunks(mapped, size):
+            yield ts_us, mapped[start:start + length]
+
+def load_stream(path):
+    #rekaman raw -> (aliran byte numpy, posisi awal setiap chunk di aliran, ts_us setiap chunk)
+    import numpy as np
+    stream = bytearray()
+    starts = []
+    times = []
+    for ts_us, chunk in iter_chunks(path):
+        starts.append(len(stream))
+        times.append(ts_us)
+        stream += chunk
+    return (np.frombuffer(bytes(stream), dtype=np.uint8), np.array(starts, dtype=np.int64),
+            np.array(times, dtype=np.int64))
+
+def iter_records(path):
+    #(ts_us, paket) dari file rekaman lewat mmap
+    check_header(path)
+    count = count_records(path)
+    if count == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            yield from RECORD.iter_unpack(view[HEADER.size:HEADER.size + count * RECORD.size])
+        finally:
+            view.release()
+
+def load_numpy(path):
+    #(ts_us, paket (N, 10)) sebagai array numpy yang di-memory-map
+    import numpy as np
+    check_header(path)
+    dtype = np.dtype([("ts", "<i8"), ("packet", "u1", PACKET_LENGTH)])
+    count = count_records(path)
+    if count == 0:
+        return np.zeros(0, dtype="<i8"), np.zeros((0, PACKET_LENGTH), dtype=np.uint8)
+    records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+    return records["ts"], records["packet"]
+
+def pace(ts_us, first_ts, started, speed):
+    #tunggu sampai waktu paket ini tiba (relatif terhadap paket pertama), speed 0 = tanpa tunggu
+    if speed <= 0:
+        return
+    delay = started + (ts_us - first_ts) / 1e6 / speed - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+#========================== REPLAY ==========================
+def rows_at(main, frames, ts_us, interval=0, offsets=None):
+    #baris monitor_wtp dengan waktu terima asli, sampel sebelumnya mundur offset x interval (ms)
+    if offsets is None:
+        offsets = range(len(frames) - 1, -1, -1)
+    return [main.build_row(frame, datetime.datetime.fromtimestamp(ts_us / 1e6 - offset * interval / 1000))
+            for frame, offset in zip(frames, offsets)]
+
+def decode_chunk(main, chunk, ts_us, decoder, tracker):
+    #chunk raw -> baris, lewat FrameDecoder dan SequenceTracker seperti di main.py
+    rows = []
+    for packet in decoder.feed(chunk):
+        if packet[0] == BATCH_BYTE:
+            batch = decode_batch(packet)
+            if batch is None:
+                continue
+            frames, _ = tracker.accept(batch, now=ts_us / 1e6)
+            rows += rows_at(main, frames, ts_us, batch.interval, tracker.offsets)
+        else:
+            frame = main.process_packet(packet)
+            if frame:
+                rows += rows_at(main, [frame], ts_us)
+    return rows
+
+def replay(path, db=None, serial_port=None, publish=False, speed=1.0):
+    import main
+    raw = file_version(path) == RAW_VERSION
+    writer = publisher = ser = None
+    if db:
+        from db_writer import DatabaseWriter
+        writer = DatabaseWriter(db, batch_size=5000)
+    if publish:
+        from publisher import TelemetryPublisher
+        publisher = TelemetryPublisher()
+    if serial_port:
+        ser = main.connect_serial(serial_port)
+        if not ser:
+            return 0
+    decoder = FrameDecoder(batch=True)
+    tracker = SequenceTracker()
+    count = 0
+    first_ts = None
+    started = time.monotonic()
+    try:
+        for ts_us, data in (iter_chunks(path) if raw else iter_records(path)):
+            if first_ts is None:
+                first_ts = ts_us
+            pace(ts_us, first_ts, started, speed)
+            if ser:
+                ser.write(data)
+            if writer or publisher:
+                if raw:
+                    rows = decode_chunk(main, data, ts_us, decoder, tracker)
+                else:
+                    frame = main.process_packet(data)
+                    rows = rows_at(main, [frame], ts_us) if frame else []
+                for row in rows:
+                    if publisher:
+                        publisher.publish(row)
+                    if writer:
+                        writer.add(row, ts=row['ts'])
+            count += 1
+    finally:
+        if writer:
+            writer.close()
+        if publisher:
+            publisher.close()
+        if ser:
+            ser.close()
+    return count
+
+def rebuild(path, db):
+    #bangun ulang database secepat mungkin: decode semua paket dengan bulk_decode (numpy)
+    from bulk_decode import decode_buffer, named_columns
+    from db_writer import DatabaseWriter
+    import numpy as np
+    if file_version(path) == RAW_VERSION:
+        # waktu terima paket = waktu chunk yang memuat byte terakhirnya
+        stream, starts, times = load_stream(path)
+        decoded = decode_buffer(stream)
+        chunk = np.searchsorted(starts, decoded["offsets"] + PACKET_LENGTH - 1, side="right") - 1
+        ts_ms = (times[chunk] // 1000).tolist()
+    else:
+        ts_us, packets = load_numpy(path)
+        decoded = decode_buffer(np.ascontiguousarray(packets))
+        ts_ms = (ts_us[decoded["offsets"] // PACKET_LENGTH] // 1000).tolist()
+    columns = named_columns(decoded)
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    with DatabaseWriter(db, batch_size=5000) as writer:
+        for i, ts in enumerate(ts_ms):
+            row = {name: column[i] for name, column in zip(names, values)}
+            writer.add(row, ts=ts)
+    return len(ts_ms)
+
+def info(path):
+    #ringkasan rekaman, untuk raw juga statistik FrameDecoder (byte dibuang, checksum error)
+    if file_version(path) == RAW_VERSION:
+        decoder = FrameDecoder(batch=True)
+        first = last = None
+        count = size = 0
+        for ts_us, chunk in iter_chunks(path):
+            first = ts_us if first is None else first
+            last = ts_us
+            count += 1
+            size += len(chunk)
+            decoder.feed(chunk)
+        print(f"{path}: raw, {count} chunk, {size} byte, {decoder.stats()}")
+    else:
+        count = count_records(path)
+        print(f"{path}: {count} paket")
+        first = last = None
+        for last, _ in iter_records(path):
+            first = last if first is None else first
+    if first is not None:
+        print(f"{time.ctime(first / 1e6)} - {time.ctime(last / 1e6)} ({(last - first) / 1e6:.1f} detik)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rekaman paket serial mentah")
+    parser.add_argument("command", choices=["info", "replay", "rebuild"])
+    parser.add_argument("path", nargs="?", default=CAPTURE_FILE)
+    parser.add_argument("--db", help="simpan hasil ke database ini")
+    parser.add_argument("--serial", help="kirim paket / chunk mentah ke port serial / pty ini")
+    parser.add_argument("--publish", action="store_true", help="publish ke Dashboard (publisher.py)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = waktu asli, 10 = 10x lebih cepat, 0 = secepat mungkin")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        info(args.path)
+    elif args.command == "replay":
+        if not (args.db or args.serial or args.publish):
+            print("Pilih tujuan replay: --db, --serial dan/atau --publish")
+            sys.exit(1)
+        started = time.perf_counter()
+        count = replay(args.path, args.db, args.serial, args.publish, args.speed)
+        print(f"{count} record diputar ulang dalam {time.perf_counter() - started:.1f} detik")
+    else:
+        if not args.db:
+            print("rebuild membutuhkan --db")
+            sys.exit(1)
+        started = time.perf_counter()
+        count = rebuild(args.path, args.db)
+        print(f"{count} baris ditulis ke {args.db} dalam {time.perf_counter() - started:.1f} detik")
@@ -0,0 +1,229 @@
+"""
+Codec paket serial MiniPlant, dipakai bersama main.py, main_simul.py, main_async.py,
+main_multi.py dan capture.py.
+
+    decode(packet)          -> Frame, atau None jika panjang / start byte / checksum salah
+    frame_error(packet)     -> alasan paket ditolak (hanya dipanggil untuk paket rusak)
+    encode(...)             -> paket 10 byte lengkap dengan checksum (simulator, benchmark)
+    encode_override(coils)  -> balasan 0xBB + 2 byte dari 14 coil aktuator PLC
+
+Frame batch (versi 1) membawa beberapa sampel dalam satu paket dengan satu checksum:
+
+    Byte        | Data
+    0           | BATCH_BYTE (0xAB)
+    1           | versi (1)
+    2           | sesi, nilai baru setiap firmware boot (seq mulai lagi dari awal)
+    3-4         | seq sampel pertama (uint16 little endian, lanjut ke 0 setelah 65535)
+    5           | n, jumlah sampel (1-MAX_SAMPLES)
+    6-7         | interval antar sampel dalam ms (uint16 little endian)
+    8 ...       | n x 8 byte sampel (level_1, level_2, tds_1, flow_1, pressure_1, 3 byte flag)
+    terakhir    | checksum (XOR semua byte sebelumnya)
+
+Sampel ke-i punya seq (seq + i) % 65536. Balasannya ACK kumulatif 0xFE + seq sampel
+terakhir yang sudah diterima berurutan (uint16), diikuti balasan 0xBB + 2 byte jika
+override aktif. Firmware mengirim ulang mulai dari ACK + 1 jika ada sampel yang belum
+dikonfirmasi. Paket lama 10 byte tetap dibalas 0xFF / 0xBB seperti biasa, jadi
+firmware bisa di-upgrade per skid.
+
+    batch_length(n)         -> panjang frame batch dengan n sampel
+    decode_batch(packet)    -> Batch (sesi, seq, interval, list Frame), atau None jika rusak
+    encode_batch(...)       -> frame batch lengkap dengan checksum (simulator, benchmark)
+    encode_batch_ack(seq)   -> ACK kumulatif
+
+Paket dibongkar sekali lewat struct, checksum XOR dihitung dari hasil bongkaran itu,
+dan bit flag diambil dari tabel BITS sehingga decode hanya membuat satu objek Frame
+(__slots__) per paket. Dict baris database / publish baru dibuat oleh as_row() bila
+memang dibutuhkan. Frame tetap bisa dibaca seperti dict lama (frame['level_1']).
+"""
+
+import struct
+
+START_BYTE = 0xAA
+OVERRIDE_BYTE = 0xBB
+ACK_BYTE = 0xFF
+PACKET_LENGTH = 10
+BATCH_BYTE = 0xAB               # frame batch bersekuens (firmware baru)
+BATCH_ACK_BYTE = 0xFE           # ACK kumulatif frame batch
+BATCH_VERSION = 1
+MAX_SAMPLES = 32                # sampel per frame batch
+SAMPLE_LENGTH = 8               # 5 sensor + 3 byte flag
+SEQ_MODULO = 1 << 16
+
+SENSORS = ["level_1", "level_2", "tds_1", "flow_1", "pressure_1"]
+FLAGS_INPUT = [
+    "level_switch", "pb_start", "mode_standby", "mode_filtering", "mode_backwash",
+    "mode_drain", "mode_override", "emergency_stop"
+]
+FLAGS_OUTPUT = [
+    "solenoid_1", "solenoid_2", "solenoid_3", "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2",
+]
+FLAGS_OUTPUT_2 = [
+    "pompa_3", "standby_lamp", "filtering_lamp", "backwash_lamp", "drain_lamp", "stepper"
+]
+
+FRAME = struct.Struct(f"{PACKET_LENGTH}B")      # start, 5 sensor, 3 byte flag, checksum
+REPLY = struct.Struct("3B")                     # 0xBB, flag aktuator 1, flag aktuator 2
+ACK = bytes([ACK_BYTE])
+BATCH_HEADER = struct.Struct("<BBBHBH")         # start, versi, sesi, seq sampel pertama, jumlah sampel, interval sampel (ms)
+BATCH_ACK = struct.Struct("<BH")                # 0xFE, seq sampel terakhir yang diterima
+SAMPLE = struct.Struct(f"{SAMPLE_LENGTH}B")
+
+# tabel 256 entri: byte flag -> tuple 8 bit (bit 0 dulu), dipakai bersama oleh semua frame
+BITS = tuple(tuple((byte >> i) & 1 for i in range(8)) for byte in range(256))
+BITS_6 = tuple(bits[:6] for bits in BITS)
+# kebalikannya: tuple 8 bit (0/1 atau False/True) -> byte
+BYTE = {bits: byte for byte, bits in enumerate(BITS)}
+# byte flag -> dict kolom monitor_wtp, disalin ke baris oleh as_row()
+COLUMNS_INPUT = tuple(dict(zip(FLAGS_INPUT, bits)) for bits in BITS)
+COLUMNS_OUTPUT = tuple(dict(zip(FLAGS_OUTPUT, bits)) for bits in BITS)
+COLUMNS_OUTPUT_2 = tuple(dict(zip(FLAGS_OUTPUT_2, bits)) for bits in BITS)
+
+
+class Frame:
+    __slots__ = ("level_1", "level_2", "tds_1", "flow_1", "pressure_1", "input_byte", "output_byte", "output_byte2")
+
+    def __init__(self, level_1, level_2, tds_1, flow_1, pressure_1, input_byte, output_byte, output_byte2):
+        self.level_1 = level_1
+        self.level_2 = level_2
+        self.tds_1 = tds_1
+        self.flow_1 = flow_1
+        self.pressure_1 = pressure_1
+        self.input_byte = input_byte
+        self.output_byte = output_byte
+        self.output_byte2 = output_byte2
+
+    @property
+    def input_flags(self):
+        return BITS[self.input_byte]
+
+    @property
+    def output_flags(self):
+        return BITS[self.output_byte]
+
+    @property
+    def output_flags2(self):
+        return BITS_6[self.output_byte2]
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __repr__(self):
+        return (f"Frame(level_1={self.level_1}, level_2={self.level_2}, tds_1={self.tds_1}, flow_1={self.flow_1}, "
+                f"pressure_1={self.pressure_1}, flags={self.input_byte:08b} {self.output_byte:08b} {self.output_byte2:08b})")
+
+    def sensors(self):
+        #nilai register 0-4 PLC
+        return [self.level_1, self.level_2, self.tds_1, self.flow_1, self.pressure_1]
+
+    def coils(self):
+        #coil 0-21 PLC: input (0-7), output (8-15), output2 (16-21)
+        return BITS[self.input_byte] + BITS[self.output_byte] + BITS_6[self.output_byte2]
+
+    def as_row(self):
+        #dict dengan key sesuai kolom monitor_wtp (ditambah input_flags/output_flags/output_flags2)
+        row = {
+            'level_1': self.level_1,
+            'level_2': self.level_2,
+            'tds_1': self.tds_1,
+            'flow_1': self.flow_1,
+            'pressure_1': self.pressure_1,
+            'input_flags': BITS[self.input_byte],
+            'output_flags': BITS[self.output_byte],
+            'output_flags2': BITS_6[self.output_byte2],
+        }
+        row.update(COLUMNS_INPUT[self.input_byte])
+        row.update(COLUMNS_OUTPUT[self.output_byte])
+        row.update(COLUMNS_OUTPUT_2[self.output_byte2])
+        return row
+
+
+class Batch:
+    __slots__ = ("session", "seq", "interval", "frames")
+
+    def __init__(self, session, seq, interval, frames):
+        self.session = session
+        self.seq = seq
+        self.interval = interval
+        self.frames = frames
+
+    @property
+    def last_seq(self):
+        return (self.seq + len(self.frames) - 1) % SEQ_MODULO
+
+    def __repr__(self):
+        return f"Batch(session={self.session}, seq={self.seq}, n={len(self.frames)}, interval={self.interval} ms)"
+
+
+#========================== DECODE ==========================
+def decode(packet):
+    if len(packet) != PACKET_LENGTH:
+        return None
+    start, level_1, level_2, tds_1, flow_1, pressure_1, input_byte, output_byte, output_byte2, check = FRAME.unpack(packet)
+    if start != START_BYTE:
+        return None
+    if start ^ level_1 ^ level_2 ^ tds_1 ^ flow_1 ^ pressure_1 ^ input_byte ^ output_byte ^ output_byte2 != check:
+        return None
+    return Frame(level_1, level_2, tds_1, flow_1, pressure_1, input_byte, output_byte, output_byte2)
+
+def checksum(packet):
+    #XOR byte 0-8
+    value = 0
+    for byte in packet[:PACKET_LENGTH - 1]:
+        value ^= byte
+    return value
+
+def frame_error(packet):
+    if len(packet) != PACKET_LENGTH or packet[0] != START_BYTE:
+        return "Paket salah: Panjang atau start byte tidak valid"
+    if checksum(packet) != packet[-1]:
+        return "Checksum tidak cocok!"
+    return None
+
+
+def batch_length(count):
+    return BATCH_HEADER.size + count * SAMPLE_LENGTH + 1
+
+def decode_batch(packet):
+    if len(packet) < BATCH_HEADER.size + SAMPLE_LENGTH + 1:
+        return None
+    start, version, session, seq, count, interval = BATCH_HEADER.unpack_from(packet)
+    if start != BATCH_BYTE or version != BATCH_VERSION or not 1 <= count <= MAX_SAMPLES:
+        return None
+    if len(packet) != batch_length(count):
+        return None
+    check = 0
+    for byte in packet:
+        check ^= byte
+    if check != 0:
+        # XOR semua byte termasuk checksum = 0 jika cocok
+        return None
+    frames = [Frame(*sample) for sample in SAMPLE.iter_unpack(packet[BATCH_HEADER.size:-1])]
+    return Batch(session, seq, interval, frames)
+
+
+#========================== ENCODE ==========================
+def encode(level_1, level_2, tds_1, flow_1, pressure_1, input_byte, output_byte, output_byte2):
+    check = START_BYTE ^ level_1 ^ level_2 ^ tds_1 ^ flow_1 ^ pressure_1 ^ input_byte ^ output_byte ^ output_byte2
+    return FRAME.pack(START_BYTE, level_1, level_2, tds_1, flow_1, pressure_1, input_byte, output_byte, output_byte2, check)
+
+def encode_frame(frame):
+    return encode(frame.level_1, frame.level_2, frame.tds_1, frame.flow_1, frame.pressure_1,
+                  frame.input_byte, frame.output_byte, frame.output_byte2)
+
+def encode_override(coils):
+    #14 coil aktuator (list bool dari PLC) -> b'\xbb' + 2 byte flag
+    return REPLY.pack(OVERRIDE_BYTE, BYTE[tuple(coils[0:8])], BYTE[(*coils[8:14], 0, 0)])
+
+def encode_batch(seq, samples, interval=0, session=0):
+    #samples: list 8 nilai per sampel (5 sensor + 3 byte flag), seq = seq sampel pertama
+    packet = bytearray(BATCH_HEADER.pack(BATCH_BYTE, BATCH_VERSION, session, seq % SEQ_MODULO, len(samples), interval))
+    for sample in samples:
+        packet += SAMPLE.pack(*sample)
+    check = 0
+    for byte in packet:
+        check ^= byte
+    packet.append(check)
+    return bytes(packet)
+
+def encode_batch_ack(seq):
+    return BATCH_ACK.pack(BATCH_ACK_BYTE, seq % SEQ_MODULO)
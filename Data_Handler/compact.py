@@ -0,0 +1,144 @@
+"""
+Mode penyimpanan ringkas untuk monitor_wtp.
+
+Setiap sampel disimpan sebagai (id, ts, packed) di tabel monitor_wtp_compact, dengan
+packed = packet[1:9] (5 byte sensor + 3 byte flag) sebagai satu INTEGER 64-bit.
+Satu baris hanya belasan byte, dibanding 23 kolom INTEGER + timestamp TEXT.
+
+Nama monitor_wtp menjadi VIEW yang men-decode packed saat dibaca, dengan kolom yang
+sama seperti tabel biasa, sehingga Dashboard/app.py, liatdatabase.py dan query
+riwayat tetap jalan tanpa perubahan. INSERT ke view (misalnya dari simulator.py)
+diteruskan oleh trigger INSTEAD OF ke tabel ringkas. Dari Python, decode_packed()
+mengembalikan dict kolom yang sama.
+"""
+
+import datetime
+
+# posisi setiap kolom di dalam 8 byte packet[1:9] -> (byte ke-, bit); bit None = 1 byte penuh
+LAYOUT = {
+    "level_1": (0, None),
+    "level_2": (1, None),
+    "tds_1": (2, None),
+    "flow_1": (3, None),
+    "pressure_1": (4, None),
+    "level_switch": (5, 0),
+    "mode_standby": (5, 2),
+    "mode_filtering": (5, 3),
+    "mode_backwash": (5, 4),
+    "mode_drain": (5, 5),
+    "mode_override": (5, 6),
+    "emergency_stop": (5, 7),
+    "solenoid_1": (6, 0),
+    "solenoid_2": (6, 1),
+    "solenoid_3": (6, 2),
+    "solenoid_4": (6, 3),
+    "solenoid_5": (6, 4),
+    "solenoid_6": (6, 5),
+    "pompa_1": (6, 6),
+    "pompa_2": (6, 7),
+    "pompa_3": (7, 0),
+    "stepper": (7, 5),
+}
+
+
+def _shift(byte, bit=None):
+    return (7 - byte) * 8 + (bit or 0)
+
+def column_expr(column, source=""):
+    #ekspresi SQL untuk mengambil satu kolom dari packed
+    byte, bit = LAYOUT[column]
+    mask = 255 if bit is None else 1
+    return f"(({source}packed >> {_shift(byte, bit)}) & {mask})"
+
+def column_expr_new(column):
+    return column_expr(column, "NEW.")
+
+def pack_expr(source="NEW."):
+    #ekspresi SQL kebalikan column_expr (untuk trigger INSTEAD OF INSERT)
+    parts = []
+    for column, (byte, bit) in LAYOUT.items():
+        mask = 255 if bit is None else 1
+        parts.append(f"((CAST({source}{column} AS INTEGER) & {mask}) << {_shift(byte, bit)})")
+    return " | ".join(parts)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS monitor_wtp_compact (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER,
+    packed INTEGER
+)
+"""
+
+CREATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_monitor_wtp_compact_ts ON monitor_wtp_compact (ts)"
+
+CREATE_VIEW = """
+CREATE VIEW IF NOT EXISTS monitor_wtp AS
+SELECT
+    id,
+    datetime(ts / 1000, 'unixepoch', 'localtime') AS timestamp,
+    {columns},
+    ts
+FROM monitor_wtp_compact
+""".format(columns=",\n    ".join(f"{column_expr(c)} AS {c}" for c in LAYOUT))
+
+CREATE_INSERT_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS monitor_wtp_compact_insert INSTEAD OF INSERT ON monitor_wtp
+BEGIN
+    INSERT INTO monitor_wtp_compact (ts, packed) VALUES (
+        COALESCE(NEW.ts,
+                 CAST(strftime('%s', NEW.timestamp, 'utc') AS INTEGER) * 1000,
+                 CAST(strftime('%s', 'now') AS INTEGER) * 1000),
+        {packed}
+    );
+END
+""".format(packed=pack_expr())
+
+INSERT_ROW = "INSERT INTO monitor_wtp_compact (ts, packed) VALUES (?, ?)"
+
+
+def create_schema(conn):
+    with conn:
+        conn.execute(CREATE_TABLE)
+        conn.execute(CREATE_INDEX)
+        conn.execute(CREATE_VIEW)
+        conn.execute(CREATE_INSERT_TRIGGER)
+
+def bits_to_byte(bits):
+    value = 0
+    for i, bit in enumerate(bits):
+        if bit:
+            value |= 1 << i
+    return value
+
+def pack_row(row):
+    #dict baris (kolom monitor_wtp) -> integer packed; flag byte utuh dipakai jika ada
+    #(input_flags/output_flags/output_flags2 dari process_packet) supaya pb_start dan lampu ikut tersimpan
+    data = [int(row[c]) & 255 for c in ("level_1", "level_2", "tds_1", "flow_1", "pressure_1")]
+    if "input_flags" in row:
+        data += [bits_to_byte(row["input_flags"]), bits_to_byte(row["output_flags"]), bits_to_byte(row["output_flags2"])]
+    else:
+        data += [0, 0, 0]
+    # kolom flag bernama tetap yang menentukan (main_simul.py mengganti flag input dari PLC)
+    for column, (byte, bit) in LAYOUT.items():
+        if bit is None:
+            continue
+        if row[column]:
+            data[byte] |= 1 << bit
+        else:
+            data[byte] &= ~(1 << bit)
+    return int.from_bytes(bytes(data), "big", signed=True)
+
+def decode_packed(packed, ts=None):
+    #integer packed -> dict kolom monitor_wtp
+    raw = (packed & 0xFFFFFFFFFFFFFFFF).to_bytes(8, "big")
+    row = {}
+    for column, (byte, bit) in LAYOUT.items():
+        row[column] = raw[byte] if bit is None else (raw[byte] >> bit) & 1
+    if ts is not None:
+        row["ts"] = ts
+        row["timestamp"] = datetime.datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M:%S")
+    return row
+
+def is_compact(conn):
+    kind = conn.execute("SELECT type FROM sqlite_master WHERE name = 'monitor_wtp'").fetchone()
+    return kind is not None and kind[0] == "view"
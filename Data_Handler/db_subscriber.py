@@ -0,0 +1,89 @@
+"""
+Subscriber penyimpan data: membaca telemetri yang dipublish main.py lewat
+socket lokal lalu menyimpannya ke SQLite dengan DatabaseWriter (atau per partisi
+harian jika PARTITION_DIR di partition.py diisi). Jalankan sebagai
+proses terpisah supaya database tidak pernah menahan loop akuisisi.
+
+Data dari main_multi.py membawa plant_id dan disimpan ke database skid tersebut
+(db_file di plants.json, default data_wtp_<plant_id>.db). Data tanpa plant_id
+tetap masuk ke DB_FILE.
+
+Event alarm (type "alarm", alarms.py) disimpan ke tabel alarm_wtp di file database
+yang sama (DB_FILE saat memakai partisi harian).
+"""
+
+import os
+import sqlite3
+from time import sleep
+from publisher import subscribe, PUBLISH_HOST, PUBLISH_PORT
+from db_writer import DB_FILE
+from partition import open_writer, PARTITION_DIR
+from plants import load_plants, plant_db_file, PLANTS_FILE
+from alarms import AlarmLog
+from metrics import registry
+
+RECONNECT_INTERVAL = 2
+
+
+def handle_message(message, writers, alarm_logs, plants):
+    #simpan satu pesan (data / alarm), None = tidak ada data selama timeout subscribe
+    if message is None:
+        for writer in writers.values():
+            writer.poll()
+        registry.maybe_summary()
+    elif message.get("type") == "data":
+        plant_id = message.get("plant_id")
+        writer = writers.get(plant_id)
+        if writer is None:
+            path = plant_db_file(plant_id, plants)
+            print(f"Data skid {plant_id} disimpan ke {path}")
+            writer = writers[plant_id] = open_writer(path, plant_id=plant_id)
+        writer.add(message)
+    elif message.get("type") == "alarm":
+        plant_id = message.get("plant_id")
+        log = alarm_logs.get(plant_id)
+        if log is None:
+            log = alarm_logs[plant_id] = AlarmLog(plant_db_file(plant_id, plants) if plant_id else DB_FILE)
+        log.add(message)
+
+def flush_all(writers):
+    for writer in writers.values():
+        try:
+            writer.flush()
+        except sqlite3.Error as e:
+            registry.inc("db_errors")
+            print(f"Terjadi Kesalahan dalam Menyimpan Data: {e}")
+
+
+def main():
+    plants = load_plants(PLANTS_FILE) if os.path.exists(PLANTS_FILE) else []
+    writers = {None: open_writer(DB_FILE)}   # plant_id -> writer
+    alarm_logs = {}                          # plant_id -> AlarmLog
+    try:
+        while True:
+            try:
+                print("Menghubungkan ke Data_Handler, data disimpan ke", PARTITION_DIR or DB_FILE)
+                for message in subscribe(PUBLISH_HOST, PUBLISH_PORT):
+                    try:
+                        handle_message(message, writers, alarm_logs, plants)
+                    except sqlite3.Error as e:
+                        #satu pesan gagal disimpan (disk penuh, database terkunci), subscriber tetap jalan
+                        registry.inc("db_errors")
+                        print(f"Terjadi Kesalahan dalam Menyimpan Data: {e}")
+                print("Koneksi ke Data_Handler terputus")
+            except OSError as e:
+                print(f"Gagal terhubung ke Data_Handler: {e}")
+            flush_all(writers)
+            sleep(RECONNECT_INTERVAL)
+    except KeyboardInterrupt:
+        print("Program dihentikan")
+    finally:
+        for writer in writers.values():
+            writer.close()
+        for log in alarm_logs.values():
+            log.close()
+        print("Database ditutup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Penulis database SQLite yang hidup selama program berjalan.
+
+Satu koneksi dibuka sekali dengan mode WAL, baris data ditampung di memori lalu
+di-commit bersamaan (group commit) setiap BATCH_SIZE baris atau FLUSH_INTERVAL
+detik. Dashboard tetap bisa membaca database selama penulis aktif karena WAL.
+Panggil close() saat program berhenti supaya sisa buffer ikut tersimpan.
+"""
+
+import sqlite3
+import datetime
+import time
+import rollup
+import compact
+
+DB_FILE = 'data_wtp.db'
+BATCH_SIZE = 50         # commit setiap 50 baris
+FLUSH_INTERVAL = 1.0    # atau setiap 1 detik, mana yang lebih dulu
+COMPACT_STORAGE = False # True: database baru memakai mode ringkas (lihat compact.py)
+
+COLUMNS = [
+    "timestamp", "ts", "level_1", "level_2", "tds_1", "flow_1", "pressure_1",
+    "level_switch", "mode_standby", "mode_filtering", "mode_backwash", "mode_drain",
+    "mode_override", "emergency_stop", "solenoid_1", "solenoid_2", "solenoid_3",
+    "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2", "pompa_3", "stepper"
+]
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS monitor_wtp (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT,
+    level_1 INTEGER,
+    level_2 INTEGER,
+    tds_1 INTEGER,
+    flow_1 INTEGER,
+    pressure_1 INTEGER,
+    level_switch INTEGER,
+    mode_standby INTEGER,
+    mode_filtering INTEGER,
+    mode_backwash INTEGER,
+    mode_drain INTEGER,
+    mode_override INTEGER,
+    emergency_stop INTEGER,
+    solenoid_1 INTEGER,
+    solenoid_2 INTEGER,
+    solenoid_3 INTEGER,
+    solenoid_4 INTEGER,
+    solenoid_5 INTEGER,
+    solenoid_6 INTEGER,
+    pompa_1 INTEGER,
+    pompa_2 INTEGER,
+    pompa_3 INTEGER,
+    stepper INTEGER,
+    ts INTEGER
+)
+"""
+
+# ts = epoch milidetik (UTC), diisi dari timestamp untuk baris lama / penulis yang tidak mengisinya
+FILL_TS = """
+UPDATE monitor_wtp SET ts = CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000
+WHERE ts IS NULL AND timestamp IS NOT NULL
+"""
+
+CREATE_TS_INDEX = "CREATE INDEX IF NOT EXISTS idx_monitor_wtp_ts ON monitor_wtp (ts)"
+
+CREATE_TS_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS monitor_wtp_fill_ts AFTER INSERT ON monitor_wtp
+WHEN NEW.ts IS NULL AND NEW.timestamp IS NOT NULL
+BEGIN
+    UPDATE monitor_wtp SET ts = CAST(strftime('%s', NEW.timestamp, 'utc') AS INTEGER) * 1000
+    WHERE id = NEW.id;
+END
+"""
+
+INSERT_ROW = "INSERT INTO monitor_wtp ({}) VALUES ({})".format(
+    ", ".join(COLUMNS), ", ".join("?" * len(COLUMNS)))
+
+
+def migrate(conn):
+    #tambahkan kolom ts + index ke database lama (aman dijalankan berulang)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(monitor_wtp)")]
+    with conn:
+        if "ts" not in columns:
+            conn.execute("ALTER TABLE monitor_wtp ADD COLUMN ts INTEGER")
+            conn.execute(FILL_TS)
+        conn.execute(CREATE_TS_INDEX)
+        conn.execute(CREATE_TS_TRIGGER)
+
+def format_timestamp(ts):
+    return datetime.datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class DatabaseWriter:
+    def __init__(self, path=DB_FILE, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, rollups=True,
+                 compact_storage=COMPACT_STORAGE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # mode penyimpanan ditentukan oleh isi database; compact_storage hanya untuk database baru
+        exists = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'monitor_wtp'").fetchone()
+        self.compact = compact.is_compact(self.conn) if exists else compact_storage
+        if exists and self.compact != compact_storage:
+            print(f"Database {path} memakai mode {'ringkas' if self.compact else 'biasa'}, mode itu yang dipakai")
+        if self.compact:
+            compact.create_schema(self.conn)
+        else:
+            self.conn.execute(CREATE_TABLE)
+            self.conn.commit()
+            migrate(self.conn)
+        if rollups:
+            # rollup 1s/1m/1h diperbarui trigger di setiap INSERT (lihat rollup.py)
+            rollup.install(self.conn)
+        self.rows = []
+        self.rows_written = 0
+        self.last_flush = time.monotonic()
+
+    def add(self, row, ts=None):
+        #tambah 1 baris (dict dengan key sesuai COLUMNS) ke buffer
+        #ts (epoch ms) dipakai saat memutar ulang data lama, default: waktu di row atau sekarang
+        if ts is not None:
+            timestamp = format_timestamp(ts)
+        else:
+            ts, timestamp = row.get("ts"), row.get("timestamp")
+            if ts is None or timestamp is None:
+                now = datetime.datetime.now()
+                ts, timestamp = int(now.timestamp() * 1000), now.strftime("%Y-%m-%d %H:%M:%S")
+        if self.compact:
+            self.rows.append((ts, compact.pack_row(row)))
+        else:
+            self.rows.append((timestamp, ts) + tuple(row[col] for col in COLUMNS[2:]))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+        else:
+            self.poll()
+
+    def poll(self):
+        #dipanggil dari loop utama supaya buffer tetap di-commit walau data sepi
+        if self.rows and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.rows:
+            return 0
+        # kalau commit gagal (misal database terkunci), baris tetap di buffer untuk dicoba lagi
+        with self.conn:
+            self.conn.executemany(compact.INSERT_ROW if self.compact else INSERT_ROW, self.rows)
+        count = len(self.rows)
+        self.rows = []
+        self.rows_written += count
+        return count
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,211 @@
+"""
+Decoder paket serial yang bisa sinkron ulang sendiri.
+
+Byte dari serial dibaca per chunk lalu dimasukkan ke FrameDecoder.feed(). Decoder
+mencari START_BYTE, mengecek checksum XOR, dan mengembalikan semua paket valid
+yang ada di buffer. Kalau ada byte yang hilang, byte sampah dibuang sampai
+START_BYTE berikutnya sehingga paket selanjutnya tetap terbaca.
+
+Dengan batch=True decoder juga menerima frame batch (BATCH_BYTE, codec.py) yang
+panjangnya dibaca dari header, campur dengan paket lama 10 byte. SequenceTracker
+mengikuti seq sampel frame batch: ACK kumulatif hanya maju sampai sampel terakhir
+yang diterima berurutan, jadi selama ada gap firmware tetap mengirim ulang dan
+sampel yang hilang diterima begitu datang. Sampel yang sudah pernah diterima
+(duplikat) dibuang. Sesi baru di header (firmware boot ulang) memulai seq dari awal.
+"""
+
+import time
+from codec import BATCH_BYTE, BATCH_HEADER, BATCH_VERSION, MAX_SAMPLES, SEQ_MODULO, batch_length
+
+START_BYTE = 0xAA
+PACKET_LENGTH = 10
+RETRANSMIT_WINDOW = 8 * MAX_SAMPLES     # sampel, gap lebih jauh dari ini di belakang sampel terbaru dianggap hilang
+
+
+class FrameDecoder:
+    def __init__(self, start_byte=START_BYTE, packet_length=PACKET_LENGTH, batch=False):
+        self.start_byte = start_byte
+        self.packet_length = packet_length
+        self.batch = batch
+        self.buffer = bytearray()
+        # counter statistik
+        self.frames = 0
+        self.batches = 0
+        self.discarded_bytes = 0
+        self.checksum_errors = 0
+        self.resyncs = 0
+        self.synced = True      # False sejak byte pertama dibuang sampai paket valid berikutnya
+
+    def feed(self, chunk):
+        #masukkan byte baru, kembalikan list paket valid (bytes)
+        buf = self.buffer
+        buf += chunk
+        frames = []
+        while True:
+            start = buf.find(self.start_byte)
+            if self.batch:
+                # BATCH_BYTE hanya dicari sampai START_BYTE pertama
+                batch_start = buf.find(BATCH_BYTE, 0, start if start >= 0 else len(buf))
+                if batch_start >= 0:
+                    start = batch_start
+            if start < 0:
+                # tidak ada start byte, buang semua
+                if buf:
+                    self._discard(len(buf))
+                break
+            if start > 0:
+                self._discard(start)
+            length = self.packet_length
+            if self.batch and buf[0] == BATCH_BYTE:
+                if len(buf) < BATCH_HEADER.size:
+                    break
+                _, version, _, _, count, _ = BATCH_HEADER.unpack_from(buf)
+                if version != BATCH_VERSION or not 1 <= count <= MAX_SAMPLES:
+                    # header tidak masuk akal, BATCH_BYTE palsu
+                    self.checksum_errors += 1
+                    self._discard(1)
+                    continue
+                length = batch_length(count)
+            if len(buf) < length:
+                break
+
+            checksum = 0
+            for byte in buf[:length - 1]:
+                checksum ^= byte
+            if checksum == buf[length - 1]:
+                frames.append(bytes(buf[:length]))
+                if length != self.packet_length:
+                    self.batches += 1
+                del buf[:length]
+                self.frames += 1
+                self.synced = True
+            else:
+                # start byte palsu / paket rusak, geser 1 byte lalu cari lagi
+                self.checksum_errors += 1
+                self._discard(1)
+        return frames
+
+    def _discard(self, count):
+        del self.buffer[:count]
+        self.discarded_bytes += count
+        # satu resync = satu kali kehilangan sinkron, berapa pun byte yang dibuang sampai paket valid
+        if self.synced:
+            self.resyncs += 1
+            self.synced = False
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'batches': self.batches,
+            'discarded_bytes': self.discarded_bytes,
+            'checksum_errors': self.checksum_errors,
+            'resyncs': self.resyncs,
+        }
+
+
+class SequenceTracker:
+    #seq sampel frame batch per sesi firmware: ACK kumulatif, gap yang menunggu kirim ulang, duplikat
+    def __init__(self, window=RETRANSMIT_WINDOW):
+        self.window = window
+        self.session = None
+        self.expected = None        # seq berikutnya yang ditunggu berurutan (ACK = expected - 1)
+        self.head = None            # seq setelah sampel terbaru yang diterima
+        self.head_time = None       # waktu (monotonic, detik) sampel terbaru diterima
+        self.received = set()       # seq yang sudah diterima di depan gap (antara expected dan head)
+        self.offsets = []           # per frame hasil accept(): umur sampel dalam satuan interval sampel
+        self.samples = 0
+        self.gaps = 0
+        self.lost_samples = 0
+        self.recovered_samples = 0
+        self.duplicate_samples = 0
+        self.restarts = 0
+
+    @property
+    def last_seq(self):
+        #seq sampel terakhir yang diterima berurutan, dikirim sebagai ACK kumulatif
+        return None if self.expected is None else (self.expected - 1) % SEQ_MODULO
+
+    @property
+    def missing(self):
+        #sampel di dalam gap yang masih ditunggu kiriman ulangnya
+        if self.expected is None:
+            return 0
+        return (self.head - self.expected) % SEQ_MODULO - len(self.received)
+
+    def accept(self, batch, now=None):
+        #kembalikan (frame yang belum pernah diterima, jumlah sampel yang hilang tepat sebelum batch ini)
+        now = time.monotonic() if now is None else now
+        if batch.session != self.session:
+            if self.session is not None:
+                # firmware boot ulang: sampel sesi lama yang belum datang tidak akan dikirim lagi
+                self.restarts += 1
+                self.lost_samples += self.missing
+            self.session = batch.session
+            self.expected = self.head = batch.seq
+            self.head_time = now
+            self.received.clear()
+
+        frames = []
+        seqs = []
+        lost = 0
+        for i, frame in enumerate(batch.frames):
+            seq = (batch.seq + i) % SEQ_MODULO
+            if (seq - self.expected) % SEQ_MODULO >= SEQ_MODULO // 2 or seq in self.received:
+                self.duplicate_samples += 1
+                continue
+            ahead = (seq - self.head) % SEQ_MODULO
+            if ahead < SEQ_MODULO // 2:
+                if ahead:
+                    lost += ahead
+                self.head = (seq + 1) % SEQ_MODULO
+                self.head_time = now
+            else:
+                # kiriman ulang sampel di dalam gap
+                self.recovered_samples += 1
+            self.received.add(seq)
+            frames.append(frame)
+            seqs.append(seq)
+        if lost:
+            self.gaps += 1
+
+        self._advance()
+        over = (self.head - self.expected) % SEQ_MODULO - self.window
+        if over > 0:
+            # gap terlalu lama tidak dikirim ulang, lepaskan supaya ACK bisa maju lagi
+            dropped = {seq for seq in self.received if (seq - self.expected) % SEQ_MODULO < over}
+            self.received -= dropped
+            self.lost_samples += over - len(dropped)
+            self.expected = (self.expected + over) % SEQ_MODULO
+            self._advance()
+
+        # umur = jarak seq ke sampel terbaru + waktu sejak sampel terbaru itu tiba, jadi kiriman ulang
+        # tetap mendapat waktu sampling aslinya, bukan waktu kiriman ulang tiba
+        lag = (now - self.head_time) * 1000 / batch.interval if batch.interval else 0
+        self.offsets = [(self.head - 1 - seq) % SEQ_MODULO + lag for seq in seqs]
+        self.samples += len(frames)
+        return frames, lost
+
+    def _advance(self):
+        #majukan ACK selama sampel berikutnya sudah ada
+        while self.expected in self.received:
+            self.received.remove(self.expected)
+            self.expected = (self.expected + 1) % SEQ_MODULO
+
+    def stats(self):
+        return {
+            'batch_samples': self.samples,
+            'seq_gaps': self.gaps,
+            'missing_samples': self.missing,
+            'recovered_samples': self.recovered_samples,
+            'lost_samples': self.lost_samples,
+            'duplicate_samples': self.duplicate_samples,
+            'seq_restarts': self.restarts,
+        }
+
+
+def read_frames(ser, decoder):
+    #baca semua byte yang tersedia sekaligus (minimal 1 byte, menunggu sampai timeout serial)
+    chunk = ser.read(max(ser.in_waiting, 1))
+    if not chunk:
+        return []
+    return decoder.feed(chunk)
@@ -1,30 +1,40 @@
 import serial
 from pymodbus.client import ModbusTcpClient
-from time import sleep
+from time import sleep, perf_counter, time_ns
+import os
 import datetime
+import sys
 import sqlite3
-import os
-import platform
+from pymodbus.exceptions import ModbusException
+from frame_decoder import FrameDecoder, SequenceTracker
+from partition import open_writer
+from publisher import TelemetryPublisher
+from plc_io import PlcCycle, PlcError
+from metrics import registry, METRICS_HOST, METRICS_PORT
+from capture import CaptureWriter
+from status_view import StatusView
+from alarms import AlarmEngine, AlarmLog, load_rules
+from codec import (
+    START_BYTE, PACKET_LENGTH, ACK, BATCH_BYTE, decode, decode_batch, frame_error, encode_override, encode_batch_ack
+)
 
 #Konstan
-START_BYTE = 0xAA
-PACKET_LENGTH = 10
-SERIAL_PORT = '/dev/ttyUSB0'
+# konfigurasi bisa diganti lewat environment MINIPLANT_* (dipakai Benchmark/bench_handler.py)
+SERIAL_PORT = os.environ.get('MINIPLANT_SERIAL_PORT', '/dev/ttyUSB0')
 BAUDRATE = 115200
 #IP_PLC = "10.10.17.210" 
-IP_PLC = "192.168.0.101" 
-LOG = False
-
-FLAGS_INPUT = [
-    "level_switch", "pb_start", "mode_standby", "mode_filtering", "mode_backwash",
-    "mode_drain", "mode_override", "emergency_stop" 
-]
-FLAGS_OUTPUT = [
-    "solenoid_1", "solenoid_2", "solenoid_3", "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2",
-]
-FLAGS_OUTPUT_2= [
-    "pompa_3", "standby_lamp", "filtering_lamp", "backwash_lamp", "drain_lamp", "stepper"
-]
+IP_PLC = os.environ.get('MINIPLANT_PLC_IP', "192.168.0.101")
+PLC_PORT = int(os.environ.get('MINIPLANT_PLC_PORT', 502))
+LOG = False             # True: tanpa tampilan live, blok debug dicetak berurutan (status_view.py)
+PUBLISH = os.environ.get('MINIPLANT_PUBLISH', '1') == '1'              # kirim data ke Dashboard/db_subscriber.py lewat socket lokal
+SAVE_DATABASE = os.environ.get('MINIPLANT_SAVE_DATABASE', '0') == '1'  # simpan langsung dari proses ini (tanpa db_subscriber.py)
+DB_FILE = os.environ.get('MINIPLANT_DB_FILE', 'data_wtp.db')
+ASYNC_MODE = False      # True / argumen --async: pakai main_async.py (asyncio)
+METRICS = True          # endpoint Prometheus + baris ringkasan berkala (metrics.py)
+CAPTURE = os.environ.get('MINIPLANT_CAPTURE', '0') == '1'  # rekam byte serial mentah ke CAPTURE_FILE (capture.py)
+CAPTURE_FILE = os.environ.get('MINIPLANT_CAPTURE_FILE', 'capture_wtp.bin')
+CAPTURE_RAW = os.environ.get('MINIPLANT_CAPTURE_RAW', '1') == '1'  # rekam chunk serial apa adanya, '0' = hanya paket valid
+ALARMS = True           # evaluasi aturan alarm setiap frame (alarms.py, aturan di alarms.json)
 
 """
 ========INPUT========== ()
@@ -57,20 +67,24 @@ bool filtering_lamp;    (8:2)
 bool backwash_lamp;     (8:3)
 bool drain_lamp;        (8:4)
 bool stepper;           (8:5)
+
+Firmware baru boleh mengirim frame batch (0xAB, beberapa sampel + seq, lihat codec.py).
+Semua sampel batch disimpan dan dipublish, PLC hanya menerima sampel terakhir, dan
+balasannya ACK kumulatif 0xFE + seq (ditambah 0xBB + 2 byte saat override).
 """
 
 #================== CONNECTION ==================
 def connect_serial(port=SERIAL_PORT, baud=BAUDRATE):
     try:
-        ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
+        ser = serial.Serial(port, baud, timeout=1)
         print("Berhasil terhubung ke port serial")
         return ser
     except:
         print(f"Gagal terhubung ke serial")
         return False
 
-def connect_PLC(ip=IP_PLC):
-    client = ModbusTcpClient(IP_PLC)
+def connect_PLC(ip=IP_PLC, port=PLC_PORT):
+    client = ModbusTcpClient(ip, port=port)
     if client.connect():
         print("Berhasil terhubung ke PLC")
         return client
@@ -80,199 +94,97 @@ def connect_PLC(ip=IP_PLC):
 
 
 #========================== PARSING AND PACKING ==========================
-def parse_flags(flag_byte):
-    # byte do data flag
-    return [(flag_byte >> i) & 1 for i in range(8)]
-
-def flags_to_bytes(flags):
-    if len(flags) == 16:
-        byte1 = sum((bit << i) for i, bit in enumerate(flags[:8]))
-        byte2 = sum((bit << i) for i, bit in enumerate(flags[8:]))
-        return byte1, byte2
-    else:
-        return False
-
-def calculate_checksum(packet):
-    checksum = 0
-    for byte in packet[:-1]:
-        checksum ^= byte
-    return checksum
+def process_packet(packet):
+    #paket -> Frame (codec.py), None jika rusak. Tampilan ada di status_view.py
+    frame = decode(packet)
+    if frame is None:
+        print(frame_error(packet))
+    return frame
 
-def process_packet(packet, override, debug=False):
-    if len(packet) != PACKET_LENGTH or packet[0] != START_BYTE:
-        print("Paket salah: Panjang atau start byte tidak valid")
-        return None
+def process_batch(packet, tracker):
+    #frame batch -> (list Frame baru, interval ms, offset per frame), (None, 0, None) jika rusak.
+    #Duplikat dibuang, gap dicetak (sampelnya menyusul saat firmware mengirim ulang)
+    batch = decode_batch(packet)
+    if batch is None:
+        print("Frame batch rusak")
+        return None, 0, None
+    frames, lost = tracker.accept(batch)
+    if lost:
+        print(f"Gap seq sebelum {batch.seq}: {lost} sampel belum diterima")
+    return frames, batch.interval, tracker.offsets
 
-    if calculate_checksum(packet) != packet[-1]:
-        print("Checksum tidak cocok!")
-        return None
+def latest_frame(frames, offsets=None):
+    #sampel terbaru untuk PLC dan tampilan, None jika paket hanya berisi kiriman ulang sampel lama
+    if frames and (offsets is None or offsets[-1] == 0):
+        return frames[-1]
+    return None
 
-    #Parsing 
-    level_1 = packet[1]
-    level_2 = packet[2]
-    tds_1 = packet[3]
-    flow_1 = packet[4]
-    pressure_1 = packet[5]
-    input_flags = parse_flags(packet[6])
-    output_flags = parse_flags(packet[7])
-    output_flags2 = (parse_flags(packet[8]))[:6]
-    if not LOG:
-        if platform.system() == "Windows":
-            os.system('cls')
-        else:
-            os.system('clear')
+#========================== UPLOAD DATA ==========================
 
-    if debug == "Simple":
-        print("="*40)
-        print(f"Level 1: {level_1}, Level 2: {level_2}, TDS: {tds_1}, Flow: {flow_1}, Pressure: {pressure_1}")
-        print(f"Input Flags: {input_flags}")
-        print(f"Output Flags: {output_flags}\nOutput Flags2: {output_flags2}")
-        print("="*40)
-    elif debug == "All":
-        print("="*40)
-        print(f"Level 1: {level_1}, Level 2: {level_2}, TDS: {tds_1}, Flow: {flow_1}, Pressure: {pressure_1}")
-        for i, flag in enumerate(FLAGS_INPUT):
-            print(f"{flag.ljust(15)} : {'Nyala' if input_flags[i] == 1 else 'Mati'}")
-        for i, flag in enumerate(FLAGS_OUTPUT):
-            print(f"{flag.ljust(15)} : {'Nyala' if output_flags[i] == 1 else 'Mati'}")
-        for i, flag in enumerate(FLAGS_OUTPUT_2):
-            print(f"{flag.ljust(15)} : {'Nyala' if output_flags2[i] == 1 else 'Mati'}")
-        print("="*40)
-    return {
-        'level_1': level_1,
-        'level_2': level_2,
-        'tds_1': tds_1,
-        'flow_1': flow_1,
-        'pressure_1': pressure_1,
-        'input_flags': input_flags,
-        'output_flags': output_flags,
-        'output_flags2': output_flags2
-    }
+def build_row(frame, now=None):
+    #dict baris dari Frame: flag per kolom dan timestamp (key sesuai kolom monitor_wtp)
+    data = frame.as_row()
+    now = now or datetime.datetime.now()
+    data['timestamp'] = now.strftime("%Y-%m-%d %H:%M:%S")
+    data['ts'] = int(now.timestamp() * 1000)
+    return data
 
-#========================== UPLOAD DATA ==========================
+def build_rows(frames, interval=0, offsets=None):
+    #baris untuk beberapa sampel: sampel terakhir = sekarang, sampel sebelumnya mundur per interval (ms).
+    #offsets = umur per frame dalam satuan interval (tracker.offsets, kiriman ulang), default berurutan
+    now = datetime.datetime.now()
+    if offsets is None:
+        offsets = range(len(frames) - 1, -1, -1)
+    return [build_row(frame, now - datetime.timedelta(milliseconds=offset * interval))
+            for frame, offset in zip(frames, offsets)]
 
-def upload_to_database(data):
-    #upload data ke database
+def upload_to_database(data, writer):
+    #upload data ke database (di-commit bertahap oleh DatabaseWriter)
     try:
-        for i, flag in enumerate(FLAGS_INPUT):
-            data[flag] = data['input_flags'][i]
-        for i, flag in enumerate(FLAGS_OUTPUT):
-            data[flag] = data['output_flags'][i]
-        for i, flag in enumerate(FLAGS_OUTPUT_2):
-            data[flag] = data['output_flags2'][i]
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        conn = sqlite3.connect('data_wtp.db')
-        c = conn.cursor()
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS monitor_wtp (
-            timestamp TEXT,
-            level_1 INTEGER,
-            level_2 INTEGER,
-            tds_1 INTEGER,
-            flow_1 INTEGER,
-            pressure_1 INTEGER,
-            level_switch INTEGER,
-            mode_standby INTEGER,
-            mode_filtering INTEGER,
-            mode_backwash INTEGER,
-            mode_drain INTEGER,
-            mode_override INTEGER,
-            emergency_stop INTEGER,
-            solenoid_1 INTEGER,
-            solenoid_2 INTEGER,
-            solenoid_3 INTEGER,
-            solenoid_4 INTEGER,
-            solenoid_5 INTEGER,
-            solenoid_6 INTEGER,
-            pompa_1 INTEGER,
-            pompa_2 INTEGER,
-            pompa_3 INTEGER,
-            stepper INTEGER
-        )
-        """)
-
-        c.execute("""INSERT INTO monitor_wtp (
-        timestamp,
-        level_1,
-        level_2,
-        tds_1,
-        flow_1,
-        pressure_1,
-        level_switch,
-        mode_standby,
-        mode_filtering,
-        mode_backwash,
-        mode_drain,
-        mode_override,
-        emergency_stop,
-        solenoid_1,
-        solenoid_2,
-        solenoid_3,
-        solenoid_4,
-        solenoid_5,
-        solenoid_6,
-        pompa_1,
-        pompa_2,
-        pompa_3,
-        stepper
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", 
-        (
-            timestamp, 
-            data["level_1"], 
-            data["level_2"], 
-            data["tds_1"], 
-            data["flow_1"], 
-            data["pressure_1"], 
-            data["level_switch"], 
-            data["mode_standby"], 
-            data["mode_filtering"], 
-            data["mode_backwash"], 
-            data["mode_drain"], 
-            data["mode_override"], 
-            data["emergency_stop"], 
-            data["solenoid_1"], 
-            data["solenoid_2"], 
-            data["solenoid_3"], 
-            data["solenoid_4"], 
-            data["solenoid_5"], 
-            data["solenoid_6"], 
-            data["pompa_1"], 
-            data["pompa_2"], 
-            data["pompa_3"],
-            data["stepper"]))
-        conn.commit()
-        conn.close()
-        return print("Data Tersimpan di Database  ", timestamp)
+        writer.add(data)
     except Exception as e:
+        registry.inc("db_errors")
         print(f"Terjadi Kesalahan dalam Menyimpan Data: {e}")
 
-def upload_to_plc(data, client, override):
-    #upload data ke memory PLC
-    client.write_registers(0, list(data.values())[0:5], slave=1)
-    if override:
-        print()
-    else:
-        client.write_coils(0, data['input_flags'], slave=1)
-        client.write_coils(8, data['output_flags'], slave=1)
-        client.write_coils(16, data['output_flags2'], slave=1)
+def publish_data(data, publisher):
+    #kirim data ke Dashboard dan subscriber lain lewat socket lokal (tidak blocking)
+    try:
+        publisher.publish(data)
+    except Exception as e:
+        print(f"Terjadi Kesalahan dalam Publish Data: {e}")
+
+def upload_to_plc(frame, plc, override):
+    #upload data ke memory PLC: 1 write register + 1 write coil (0-21) per frame
+    plc.write_registers(0, frame.sensors(), slave=1)
+    if not override:
+        # input (0-7), output (8-15) dan output2 (16-21) berurutan, cukup satu write_coils
+        plc.write_coils(0, list(frame.coils()), slave=1)
     return None
 
 
+def check_alarms(rows, engine, publisher=None, log=None):
+    #evaluasi aturan alarm per baris, event langsung dipublish (type "alarm") dan disimpan ke alarm_wtp
+    for data in rows:
+        for event in engine.evaluate(data):
+            print(f"ALARM {event['message']}: {event['state']} ({event['field']} = {event['value']})")
+            if publisher:
+                publisher.publish(event, kind="alarm")
+            if log:
+                try:
+                    log.add(event)
+                except sqlite3.Error as e:
+                    registry.inc("db_errors")
+                    print(f"Gagal menyimpan alarm: {e}")
+
+
 #========================== OVERRIDE ==========================
-def override_command(client):
-    #read memory PLC untuk override
-    return (client.read_coils(6, slave=2).bits)[0]
+def override_command(plc):
+    #read memory PLC untuk override (di-cache per siklus oleh PlcCycle)
+    return plc.read_coils(6, 1, slave=2)[0]
 
-def data_plc(client):
+def data_plc(plc):
     #read data aktuator dari PLC untuk override
-    data = (client.read_coils(8,count=14, slave=1).bits)
-    flag_one, flag_two = flags_to_bytes(data)
-    packet = bytearray()
-    packet.append(0xBB)
-    packet.append(flag_one)
-    packet.append(flag_two)
-    # print(list(packet))
-    return packet
+    return encode_override(plc.read_coils(8, 14, slave=1))
 
 
 #========================== MAIN ==========================
@@ -288,36 +200,124 @@ def main(debug):
         ser.close() 
         return 
     
+    decoder = FrameDecoder(START_BYTE, PACKET_LENGTH, batch=True)
+    tracker = SequenceTracker()
+    db_writer = open_writer(DB_FILE) if SAVE_DATABASE else None
+    capture = None
+    if CAPTURE:
+        try:
+            capture = CaptureWriter(CAPTURE_FILE, raw=CAPTURE_RAW)
+        except (OSError, ValueError) as e:
+            print(f"Gagal membuka file rekaman: {e}")
+    publisher = None
+    if PUBLISH:
+        try:
+            publisher = TelemetryPublisher()
+        except OSError as e:
+            print(f"Gagal membuka publisher telemetri: {e}")
+    alarm_engine = AlarmEngine(load_rules()) if ALARMS else None
+    alarm_log = AlarmLog(DB_FILE) if ALARMS and SAVE_DATABASE else None
+    if METRICS:
+        registry.track(decoder.stats)
+        registry.track(tracker.stats)
+        if alarm_engine:
+            registry.track(alarm_engine.stats)
+        for name in ("plc_errors", "db_errors", "loop_errors"):
+            registry.inc(name, 0) # tetap muncul di endpoint walau belum pernah terjadi
+        try:
+            registry.serve()
+            print(f"Metrik tersedia di http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Gagal membuka endpoint metrik: {e}")
+    status = StatusView(debug, live=not LOG and sys.stdout.isatty()).start()
     try:
         while True:
             try:
-                if ser.in_waiting >= PACKET_LENGTH:
-                    packet = ser.read(PACKET_LENGTH)
-                    ser.flush()
-                    data = process_packet(packet, override_command(plc_client), debug)
-                    print(data["output_flags"])
+                if db_writer:
+                    db_writer.poll()
+                if capture:
+                    capture.poll()
+                if METRICS:
+                    registry.maybe_summary()
+                start = perf_counter()
+                chunk = ser.read(max(ser.in_waiting, 1))
+                received = time_ns() // 1000
+                if capture and capture.raw and chunk:
+                    # termasuk byte yang nanti dibuang FrameDecoder
+                    capture.write_chunk(chunk, received)
+                packets = decoder.feed(chunk) if chunk else []
+                if packets:
+                    # waktu tunggu saat serial sepi tidak dihitung, hanya pembacaan yang menghasilkan frame
+                    registry.observe("serial_read", perf_counter() - start)
+                for packet in packets:
+                    start = perf_counter()
+                    plc = PlcCycle(plc_client)
+                    override = registry.timed("override_command", override_command, plc)
+                    batch = packet[0] == BATCH_BYTE
+                    if batch:
+                        frames, interval, offsets = registry.timed("process_packet", process_batch, packet, tracker)
+                        if capture and not capture.raw and frames:
+                            # hanya sampel baru hasil SequenceTracker, kiriman ulang tidak direkam dua kali
+                            capture.write_frames(frames, received, interval, offsets)
+                    else:
+                        if capture and not capture.raw:
+                            capture.write(packet, received)
+                        frame = registry.timed("process_packet", process_packet, packet)
+                        frames, interval, offsets = ([frame] if frame else None), 0, None
 
-                    if data:
-                        upload_to_plc(data, plc_client, override_command(plc_client))
-                        #upload_to_database(data)
+                    if frames is not None:
+                        rows = build_rows(frames, interval, offsets)
+                        if publisher:
+                            for data in rows:
+                                registry.timed("publish_data", publish_data, data, publisher)
+                        if alarm_engine:
+                            registry.timed("check_alarms", check_alarms, rows, alarm_engine, publisher, alarm_log)
+                        frame = latest_frame(frames, offsets)
+                        if frame:
+                            # PLC hanya menyimpan kondisi terkini, cukup sampel terakhir
+                            registry.timed("upload_to_plc", upload_to_plc, frame, plc, override)
+                        if db_writer:
+                            for data in rows:
+                                registry.timed("upload_to_database", upload_to_database, data, db_writer)
 
-                        if override_command(plc_client):
-                            print("================== MODE OVERRIDE AKTIF ==================\n")
-                            ser.write(data_plc(plc_client))
-                            ser.flush()
+                        if batch:
+                            reply = encode_batch_ack(tracker.last_seq)
+                            if override:
+                                reply += registry.timed("data_plc", data_plc, plc)
+                        elif override:
+                            reply = registry.timed("data_plc", data_plc, plc)
                         else:
-                            ser.write(0xFF)
-                            ser.flush()
+                            reply = ACK
+                        ser.write(reply)
+                        ser.flush()
+                        registry.observe("frame", perf_counter() - start)
+                        if frame:
+                            status.update(frame, override, plc.transactions)
                     else:
                         print("Paket rusak")
 
             except Exception as e:
+                if isinstance(e, (PlcError, ModbusException)):
+                    registry.inc("plc_errors")
+                elif isinstance(e, sqlite3.Error):
+                    registry.inc("db_errors")
+                else:
+                    registry.inc("loop_errors")
                 print(f"Error dalam loop: {e}")
                 sleep(1)
 
     except KeyboardInterrupt:
         print("Program dihentikan")
     finally:
+        status.stop()
+        if db_writer:
+            db_writer.close()
+        if capture:
+            capture.close()
+        if alarm_log:
+            alarm_log.close()
+        if publisher:
+            publisher.close()
         ser.close()
         plc_client.close()
         print("Koneksi serial dan PLC ditutup")
@@ -330,4 +330,8 @@ if __name__ == "__main__":
         debug_input = "All"
     else:
         debug_input = False
-    main(debug_input)
+    if ASYNC_MODE or "--async" in sys.argv:
+        from main_async import run
+        run(debug_input)
+    else:
+        main(debug_input)
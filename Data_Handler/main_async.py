@@ -0,0 +1,206 @@
+"""
+Mode asyncio dari Data_Handler (python3 main.py --async).
+
+Alur per frame sama dengan main.py, bedanya:
+    - Serial dibaca non-blocking (pyserial-asyncio) dan PLC lewat AsyncModbusTcpClient.
+    - Balasan ke mikrokontroler (0xFF / 0xBB + 2 byte, ACK kumulatif untuk frame batch) langsung dikirim begitu status
+      override diketahui, sebelum data ditulis ke PLC dan database.
+    - Mirroring ke PLC dan penyimpanan ke database berjalan bersamaan di worker
+      terpisah lewat antrian. Jika antrian penuh, data terlama dibuang supaya loop
+      serial tidak pernah menunggu. Saat program berhenti sisa antrian tetap ditulis
+      dulu (paling lama DRAIN_TIMEOUT detik) sebelum worker dihentikan.
+"""
+
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+import serial_asyncio
+from pymodbus.client import AsyncModbusTcpClient
+from main import (
+    START_BYTE, PACKET_LENGTH, SERIAL_PORT, BAUDRATE, IP_PLC, PLC_PORT, PUBLISH, SAVE_DATABASE, DB_FILE, LOG, ALARMS,
+    process_packet, process_batch, latest_frame, build_rows, publish_data, upload_to_database, check_alarms
+)
+from codec import ACK, BATCH_BYTE, encode_override, encode_batch_ack
+from frame_decoder import FrameDecoder, SequenceTracker
+from partition import open_writer
+from publisher import TelemetryPublisher
+from plc_io import AsyncPlcCycle
+from status_view import StatusView
+from alarms import AlarmEngine, AlarmLog, load_rules
+
+READ_CHUNK = 256
+QUEUE_SIZE = 1000
+DRAIN_TIMEOUT = 5       # detik, saat berhenti sisa antrian PLC / database ditunggu paling lama selama ini
+
+
+#========================== PLC (ASYNC) ==========================
+async def override_command(plc):
+    #read memory PLC untuk override
+    return (await plc.read_coils(6, 1, slave=2))[0]
+
+async def data_plc(plc):
+    #read data aktuator dari PLC untuk override
+    return encode_override(await plc.read_coils(8, 14, slave=1))
+
+async def upload_to_plc(frame, plc, override):
+    #upload data ke memory PLC: 1 write register + 1 write coil (0-21)
+    await plc.write_registers(0, frame.sensors(), slave=1)
+    if not override:
+        await plc.write_coils(0, list(frame.coils()), slave=1)
+
+
+#========================== WORKER ==========================
+def put_latest(queue, item):
+    #masukkan ke antrian tanpa menunggu, buang data terlama jika penuh
+    if queue.full():
+        queue.get_nowait()
+        queue.task_done()
+        print("Antrian penuh, data terlama dibuang")
+    queue.put_nowait(item)
+
+async def plc_worker(queue, client):
+    while True:
+        frame, override = await queue.get()
+        try:
+            await upload_to_plc(frame, AsyncPlcCycle(client), override)
+        except Exception as e:
+            print(f"Gagal upload data ke PLC: {e}")
+        finally:
+            queue.task_done()
+
+async def db_worker(queue, writer, executor):
+    # sqlite dijalankan di satu thread terpisah supaya event loop tidak tertahan
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            rows = await asyncio.wait_for(queue.get(), writer.flush_interval)
+        except asyncio.TimeoutError:
+            await loop.run_in_executor(executor, writer.poll)
+            continue
+        try:
+            await loop.run_in_executor(executor, upload_rows, rows, writer)
+        finally:
+            queue.task_done()
+
+async def drain(queues, timeout=DRAIN_TIMEOUT):
+    #tunggu worker menghabiskan isi antrian sebelum dihentikan, supaya data terakhir tidak hilang
+    queues = [queue for queue in queues if queue is not None]
+    try:
+        await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in queues)), timeout)
+    except asyncio.TimeoutError:
+        print(f"Antrian belum habis setelah {timeout} detik, {sum(q.qsize() for q in queues)} item dibuang")
+
+def upload_rows(rows, writer):
+    #satu item antrian = semua baris dari satu paket (1 sampel, atau n sampel frame batch)
+    for data in rows:
+        upload_to_database(data, writer)
+
+
+#========================== MAIN ==========================
+async def main_async(debug):
+    try:
+        reader, ser = await serial_asyncio.open_serial_connection(url=SERIAL_PORT, baudrate=BAUDRATE)
+        print("Berhasil terhubung ke port serial")
+    except Exception:
+        print("Gagal terhubung ke serial")
+        print("Tidak dapat melanjutkan tanpa koneksi serial.")
+        return
+
+    plc_client = AsyncModbusTcpClient(IP_PLC, port=PLC_PORT)
+    await plc_client.connect()
+    if not plc_client.connected:
+        print("Gagal terhubung ke PLC")
+        print("Tidak dapat melanjutkan tanpa koneksi PLC.")
+        ser.close()
+        return
+    print("Berhasil terhubung ke PLC")
+
+    decoder = FrameDecoder(START_BYTE, PACKET_LENGTH, batch=True)
+    tracker = SequenceTracker()
+    publisher = None
+    if PUBLISH:
+        try:
+            publisher = TelemetryPublisher()
+        except OSError as e:
+            print(f"Gagal membuka publisher telemetri: {e}")
+    alarm_engine = AlarmEngine(load_rules()) if ALARMS else None
+    alarm_log = AlarmLog(DB_FILE) if ALARMS and SAVE_DATABASE else None
+
+    plc_queue = asyncio.Queue(QUEUE_SIZE)
+    workers = [asyncio.create_task(plc_worker(plc_queue, plc_client))]
+    db_queue = None
+    db_writer = None
+    executor = ThreadPoolExecutor(max_workers=1)
+    if SAVE_DATABASE:
+        db_writer = open_writer(DB_FILE)
+        db_queue = asyncio.Queue(QUEUE_SIZE)
+        workers.append(asyncio.create_task(db_worker(db_queue, db_writer, executor)))
+
+    status = StatusView(debug, live=not LOG and sys.stdout.isatty()).start()
+    try:
+        while True:
+            try:
+                chunk = await reader.read(READ_CHUNK)
+                for packet in decoder.feed(chunk):
+                    plc = AsyncPlcCycle(plc_client)
+                    override = await override_command(plc)
+                    batch = packet[0] == BATCH_BYTE
+                    if batch:
+                        frames, interval, offsets = process_batch(packet, tracker)
+                    else:
+                        frame = process_packet(packet)
+                        frames, interval, offsets = ([frame] if frame else None), 0, None
+                    if frames is None:
+                        print("Paket rusak")
+                        continue
+
+                    # balas mikrokontroler dulu, PLC dan database menyusul di worker
+                    if batch:
+                        reply = encode_batch_ack(tracker.last_seq)
+                        if override:
+                            reply += await data_plc(plc)
+                        ser.write(reply)
+                    elif override:
+                        ser.write(await data_plc(plc))
+                    else:
+                        ser.write(ACK)
+                    if not frames:
+                        continue
+
+                    rows = build_rows(frames, interval, offsets)
+                    if publisher:
+                        for data in rows:
+                            publish_data(data, publisher)
+                    if alarm_engine:
+                        check_alarms(rows, alarm_engine, publisher, alarm_log)
+                    frame = latest_frame(frames, offsets)
+                    if frame:
+                        put_latest(plc_queue, (frame, override))
+                    if db_queue:
+                        put_latest(db_queue, rows)
+                    if frame:
+                        status.update(frame, override)
+            except Exception as e:
+                print(f"Error dalam loop: {e}")
+                await asyncio.sleep(1)
+    finally:
+        status.stop()
+        await drain([plc_queue, db_queue])
+        for task in workers:
+            task.cancel()
+        if db_writer:
+            await asyncio.get_running_loop().run_in_executor(executor, db_writer.close)
+        executor.shutdown()
+        if alarm_log:
+            alarm_log.close()
+        if publisher:
+            publisher.close()
+        ser.close()
+        plc_client.close()
+        print("Koneksi serial dan PLC ditutup")
+
+def run(debug):
+    try:
+        asyncio.run(main_async(debug))
+    except KeyboardInterrupt:
+        print("Program dihentikan")
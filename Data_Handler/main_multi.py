@@ -0,0 +1,170 @@
+"""
+Data_Handler untuk beberapa skid sekaligus (python3 main_multi.py [plants.json]).
+
+Setiap pasangan serial + PLC di plants.json dilayani satu thread PlantWorker dengan
+koneksi serial, client Modbus, FrameDecoder dan file database sendiri, sehingga
+skid yang link-nya macet (serial timeout, PLC tidak menjawab) hanya menahan
+thread-nya sendiri. Skid yang terputus dicoba lagi setiap RECONNECT_INTERVAL detik
+tanpa mengganggu skid lain.
+
+Alur per paket sama dengan main.py, termasuk frame batch bersekuens, sehingga
+firmware tiap skid bisa di-upgrade sendiri-sendiri. Setiap data diberi key plant_id sebelum
+dipublish, jadi db_subscriber.py menyimpannya ke database skid tersebut dan
+Dashboard mengirimkannya ke layar yang memilih skid itu (?plant=<plant_id>).
+"""
+
+import sys
+import threading
+from time import sleep, monotonic
+from main import (
+    START_BYTE, PACKET_LENGTH, PUBLISH, SAVE_DATABASE, ACK, ALARMS,
+    connect_serial, connect_PLC, process_packet, process_batch, latest_frame, build_rows, publish_data,
+    upload_to_plc, override_command, data_plc, upload_to_database, check_alarms
+)
+from codec import BATCH_BYTE, encode_batch_ack
+from frame_decoder import FrameDecoder, SequenceTracker, read_frames
+from partition import open_writer
+from publisher import TelemetryPublisher
+from plc_io import PlcCycle
+from plants import load_plants, PLANTS_FILE
+from alarms import AlarmEngine, AlarmLog, load_rules
+
+RECONNECT_INTERVAL = 5   # detik sebelum mencoba ulang serial / PLC skid yang terputus
+STATUS_INTERVAL = 10     # detik antar baris status semua skid
+
+
+class PlantWorker(threading.Thread):
+    def __init__(self, plant, publisher=None, publish_lock=None, alarm_rules=None):
+        super().__init__(name=f"plant-{plant['plant_id']}", daemon=True)
+        self.plant = plant
+        self.plant_id = plant["plant_id"]
+        self.publisher = publisher
+        self.publish_lock = publish_lock or threading.Lock()
+        self.stopping = threading.Event()
+        self.connected = False
+        self.frames = 0
+        self.errors = 0
+        self.tracker = SequenceTracker()   # tetap dipakai setelah reconnect supaya gap tetap terdeteksi
+        self.alarms = AlarmEngine(alarm_rules, self.plant_id) if ALARMS else None
+
+    def log(self, message):
+        print(f"[{self.plant_id}] {message}")
+
+    def run(self):
+        writer = open_writer(self.plant["db_file"], plant_id=self.plant_id) if SAVE_DATABASE else None
+        self.alarm_log = AlarmLog(self.plant["db_file"]) if self.alarms and SAVE_DATABASE else None
+        try:
+            while not self.stopping.is_set():
+                ser = connect_serial(self.plant["serial_port"], self.plant["baudrate"])
+                plc_client = connect_PLC(self.plant["ip_plc"], self.plant["plc_port"]) if ser else None
+                if not ser or not plc_client:
+                    self.log(f"Koneksi gagal, coba lagi dalam {RECONNECT_INTERVAL} detik")
+                    if ser:
+                        ser.close()
+                    self.stopping.wait(RECONNECT_INTERVAL)
+                    continue
+                self.connected = True
+                try:
+                    self.loop(ser, plc_client, writer)
+                except Exception as e:
+                    self.errors += 1
+                    self.log(f"Error dalam loop: {e}")
+                finally:
+                    self.connected = False
+                    ser.close()
+                    plc_client.close()
+                self.stopping.wait(RECONNECT_INTERVAL)
+        finally:
+            if writer:
+                writer.close()
+            if self.alarm_log:
+                self.alarm_log.close()
+
+    def loop(self, ser, plc_client, writer):
+        decoder = FrameDecoder(START_BYTE, PACKET_LENGTH, batch=True)
+        tracker = self.tracker
+        while not self.stopping.is_set():
+            if writer:
+                writer.poll()
+            # read_frames menunggu paling lama timeout serial (1 detik), lalu cek stopping lagi
+            for packet in read_frames(ser, decoder):
+                plc = PlcCycle(plc_client)
+                override = override_command(plc)
+                batch = packet[0] == BATCH_BYTE
+                if batch:
+                    frames, interval, offsets = process_batch(packet, tracker)
+                else:
+                    frame = process_packet(packet)
+                    frames, interval, offsets = ([frame] if frame else None), 0, None
+                if frames is None:
+                    continue
+                rows = build_rows(frames, interval, offsets)
+                for data in rows:
+                    data['plant_id'] = self.plant_id
+                if self.publisher:
+                    with self.publish_lock:
+                        for data in rows:
+                            publish_data(data, self.publisher)
+                if self.alarms:
+                    with self.publish_lock:
+                        check_alarms(rows, self.alarms, self.publisher, self.alarm_log)
+                frame = latest_frame(frames, offsets)
+                if frame:
+                    upload_to_plc(frame, plc, override)
+                if writer:
+                    for data in rows:
+                        upload_to_database(data, writer)
+                if batch:
+                    ser.write(encode_batch_ack(tracker.last_seq) + (data_plc(plc) if override else b""))
+                else:
+                    ser.write(data_plc(plc) if override else ACK)
+                ser.flush()
+                self.frames += len(frames)
+
+
+def print_status(workers, previous, elapsed):
+    parts = []
+    for worker in workers:
+        rate = (worker.frames - previous.get(worker.plant_id, 0)) / elapsed
+        previous[worker.plant_id] = worker.frames
+        state = "OK" if worker.connected else "TERPUTUS"
+        parts.append(f"{worker.plant_id}: {state} {rate:.1f} frame/s error={worker.errors}")
+    print(" | ".join(parts))
+
+def main_multi(path=PLANTS_FILE):
+    plants = load_plants(path)
+    publisher = None
+    if PUBLISH:
+        try:
+            publisher = TelemetryPublisher()
+        except OSError as e:
+            print(f"Gagal membuka publisher telemetri: {e}")
+    publish_lock = threading.Lock()
+    alarm_rules = load_rules()
+    workers = [PlantWorker(plant, publisher, publish_lock, alarm_rules) for plant in plants]
+    for worker in workers:
+        worker.start()
+    print(f"{len(workers)} skid dijalankan: {', '.join(worker.plant_id for worker in workers)}")
+
+    previous = {}
+    last_status = monotonic()
+    try:
+        while True:
+            sleep(STATUS_INTERVAL)
+            now = monotonic()
+            print_status(workers, previous, now - last_status)
+            last_status = now
+    except KeyboardInterrupt:
+        print("Program dihentikan")
+    finally:
+        for worker in workers:
+            worker.stopping.set()
+        for worker in workers:
+            worker.join(RECONNECT_INTERVAL)
+        if publisher:
+            publisher.close()
+        print("Semua koneksi ditutup")
+
+
+if __name__ == "__main__":
+    main_multi(sys.argv[1] if len(sys.argv) > 1 else PLANTS_FILE)
@@ -2,18 +2,30 @@ import serial
 from pymodbus.client import ModbusTcpClient
 from time import sleep
 import os
-import platform
+import sys
+import datetime
+from frame_decoder import FrameDecoder, read_frames
+from partition import open_writer
+from publisher import TelemetryPublisher
+from plc_io import PlcCycle
+from status_view import StatusView
+from codec import (
+    START_BYTE, PACKET_LENGTH, FLAGS_INPUT, ACK, decode, frame_error, encode_override
+)
 
 #Konstan
-START_BYTE = 0xAA
-PACKET_LENGTH = 10
 # SERIAL_PORT = '/dev/ttyUSB0'
-SERIAL_PORT = '/dev/serial0'
+# konfigurasi bisa diganti lewat environment MINIPLANT_* (dipakai Benchmark/bench_handler.py)
+SERIAL_PORT = os.environ.get('MINIPLANT_SERIAL_PORT', '/dev/serial0')
 BAUDRATE = 115200
 # IP_PLC = "10.10.17.210" 
-IP_PLC = "192.168.0.101"
-LOG = False
+IP_PLC = os.environ.get('MINIPLANT_PLC_IP', "192.168.0.101")
+PLC_PORT = int(os.environ.get('MINIPLANT_PLC_PORT', 502))
+LOG = False             # True: tanpa tampilan live, blok debug dicetak berurutan (status_view.py)
 DEBUG = True
+PUBLISH = os.environ.get('MINIPLANT_PUBLISH', '1') == '1'              # kirim data ke Dashboard/db_subscriber.py lewat socket lokal
+SAVE_DATABASE = os.environ.get('MINIPLANT_SAVE_DATABASE', '0') == '1'  # simpan langsung dari proses ini (tanpa db_subscriber.py)
+DB_FILE = os.environ.get('MINIPLANT_DB_FILE', 'data_wtp.db')
 
 """
 ======================================================================================================
@@ -26,8 +38,11 @@ DEBUG = True
     dan kontrol pada sistem Water Treatment Plant (WTP) by KAMALOGIS, dengan Fungsi:
         1) Membaca data sensor & status input dari mikrokontroler (serial).
         2) Menyimpan data ke memory PLC dan ke database SQLite.
-        3) Mendukung mode override, di mana kontrol dilakukan dari PLC dan 
+        3) Mendukung mode override, di mana kontrol dilakukan dari PLC dan
            bukan dari mikrokontroler.
+    Tanpa ModbusPoll, pakai Benchmark/plc_emulator.py (slave 1 dan 2 dengan peta yang sama):
+        python3 ../Benchmark/plc_emulator.py --latency 5
+        MINIPLANT_PLC_IP=127.0.0.1 MINIPLANT_PLC_PORT=5020 python3 main_simul.py
 
 2. STRKTUR DATA DAN KOMUNIKASI 
     Struktur Data dari mikrokontroler ke program:
@@ -81,30 +96,37 @@ DEBUG = True
             Membuka koneksi Modbus TCP ke PLC.
 
     B) Parsing & Packing
-        1) parse_flags(flag_byte)
-            Memecah satu byte menjadi list bit [b0, b1, ..., b7].
-        2) flags_to_bytes(flags)
-            Menggabungkan list 16 flag menjadi 2 byte.
-        3) calculate_checksum(packet)
-            Hitung checksum dengan XOR.
-        4) process_packet(packet, override, debug)
-            Validasi paket, parsing data sensor & flags, menampilkan ke layar 
-            (mode simple/all), lalu mengembalikan dictionary data.
+        Bongkar / bentuk paket ada di codec.py (dipakai bersama main.py):
+        decode(packet) -> Frame, encode_override(coils) -> balasan 0xBB + 2 byte.
+        1) process_packet(packet)
+            Validasi paket lalu mengembalikan Frame. Tampilan ke layar (mode
+            simple/all) digambar status_view.py dari snapshot terakhir, paling
+            sering 4x per detik.
 
     C) Upload Data
-        1) upload_to_database(data, client)
-            Menyimpan data ke database SQLite data_wtp.db.
-        2) upload_to_plc(data, client, override)
-            Menulis data sensor dan flags ke PLC (kecuali override aktif).
+        1) build_row(frame, plc)
+            Membentuk dictionary data dengan flag per kolom (flag input dari PLC) dan timestamp.
+        2) publish_data(data, publisher)
+            Mengirim data ke Dashboard dan subscriber lain lewat socket lokal
+            (publisher.py). Tidak pernah menahan loop walau Dashboard mati.
+        3) upload_to_database(data, writer)
+            Menyimpan data ke database SQLite data_wtp.db lewat DatabaseWriter
+            (satu koneksi WAL, commit per batch, lihat db_writer.py). Secara default
+            penyimpanan dilakukan proses terpisah db_subscriber.py.
+        4) upload_to_plc(frame, plc, override)
+            Menulis data sensor dan flags ke PLC (kecuali override aktif). Flag 0-21
+            ditulis dengan satu write_coils.
 
     D) Override Mode
-        1) override_command(client)
+        1) override_command(plc)
             Membaca status mode override dari PLC.
-        2) data_plc(client)
+        2) data_plc(plc)
             Membaca status output dari PLC dan membentuk paket untuk dikirim kembali ke mikrokontroler.
 
     E) Main Loop
-        1. Membaca paket dari serial.
+        Semua akses PLC dalam satu frame lewat PlcCycle (plc_io.py): coil slave 2
+        dibaca sekali dan di-cache, sehingga satu frame cukup 2-3 transaksi Modbus.
+        1. Membaca paket dari serial (frame_decoder.FrameDecoder).
         2. Parsing dan validasi.
         3. Upload data ke PLC / database.
         4. Jika override aktif → kirim data dari PLC ke mikrokontroler.
@@ -113,12 +135,13 @@ DEBUG = True
 4. ALUR PROGRAM
     Buka koneksi serial dan PLC.
     Loop utama:
-        Cek apakah ada data masuk dari serial (>= 10 byte).
+        Baca semua byte yang tersedia dari serial, FrameDecoder mencari START_BYTE
+        dan checksum yang cocok (sinkron ulang otomatis jika ada byte hilang).
         Parsing paket → process_packet().
         Simpan/Upload data:
             Jika override aktif → mikrokontroler mengikuti PLC.
             Jika override non-aktif → PLC mengikuti mikrokontroler.
-            Simpan data ke SQLite.
+            Publish data ke Dashboard, simpan data ke SQLite (db_subscriber.py).
         Jika ada error, tunggu sebentar lalu lanjutkan loop.
     Tutup koneksi ketika program dihentikan (Ctrl+C).
 
@@ -127,29 +150,18 @@ DEBUG = True
 ======================================================================================================
 """
 
-FLAGS_INPUT = [
-    "level_switch", "pb_start", "mode_standby", "mode_filtering", "mode_backwash",
-    "mode_drain", "mode_override", "emergency_stop" 
-]
-FLAGS_OUTPUT = [
-    "solenoid_1", "solenoid_2", "solenoid_3", "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2",
-]
-FLAGS_OUTPUT_2= [
-    "pompa_3", "standby_lamp", "filtering_lamp", "backwash_lamp", "drain_lamp", "stepper"
-]
-
 #================== CONNECTION ==================
 def connect_serial(port=SERIAL_PORT, baud=BAUDRATE):
     try:
-        ser = serial.Serial(SERIAL_PORT, BAUDRATE, timeout=1)
+        ser = serial.Serial(port, baud, timeout=1)
         print("Berhasil terhubung ke port serial")
         return ser
     except:
         print(f"Gagal terhubung ke serial")
         return False
 
-def connect_PLC(ip=IP_PLC):
-    client = ModbusTcpClient(IP_PLC)
+def connect_PLC(ip=IP_PLC, port=PLC_PORT):
+    client = ModbusTcpClient(ip, port=port)
     if client.connect():
         print("Berhasil terhubung ke PLC")
         return client
@@ -159,201 +171,55 @@ def connect_PLC(ip=IP_PLC):
 
 
 #========================== PARSING AND PACKING ==========================
-def parse_flags(flag_byte):
-    # byte do data flag
-    return [(flag_byte >> i) & 1 for i in range(8)]
-
-def flags_to_bytes(flags):
-    if len(flags) == 16:
-        byte1 = sum((bit << i) for i, bit in enumerate(flags[:8]))
-        byte2 = sum((bit << i) for i, bit in enumerate(flags[8:]))
-        return byte1, byte2
-    else:
-        return False
-
-def calculate_checksum(packet):
-    checksum = 0
-    for byte in packet[:-1]:
-        checksum ^= byte
-    return checksum
-
-def process_packet(packet, override, debug=False):
-    if len(packet) != PACKET_LENGTH or packet[0] != START_BYTE:
-        print("Paket salah: Panjang atau start byte tidak valid")
-        return None
-
-    if calculate_checksum(packet) != packet[-1]:
-        print("Checksum tidak cocok!")
-        return None
-
-    #Parsing 
-    level_1 = packet[1]
-    level_2 = packet[2]
-    tds_1 = packet[3]
-    flow_1 = packet[4]
-    pressure_1 = packet[5]
-    input_flags = parse_flags(packet[6])
-    output_flags = parse_flags(packet[7])
-    output_flags2 = (parse_flags(packet[8]))[:6]
-
-    if not LOG:
-        if platform.system() == "Windows":
-            os.system('cls')
-        else:
-            os.system('clear')
-
-    if debug == "Simple":
-        print("="*40)
-        print(f"Level 1: {level_1}, Level 2: {level_2}, TDS: {tds_1}, Flow: {flow_1}, Pressure: {pressure_1}")
-        print(f"Input Flags: {input_flags}")
-        print(f"Output Flags: {output_flags}\nOutput Flags2: {output_flags2}")
-        print("="*40)
-    elif debug == "All":
-        print("="*40)
-        print(f"Level 1: {level_1}, Level 2: {level_2}, TDS: {tds_1}, Flow: {flow_1}, Pressure: {pressure_1}")
-        for i, flag in enumerate(FLAGS_INPUT):
-            print(f"{flag.ljust(15)} : {'Nyala' if input_flags[i] == 1 else 'Mati'}")
-        for i, flag in enumerate(FLAGS_OUTPUT):
-            print(f"{flag.ljust(15)} : {'Nyala' if output_flags[i] == 1 else 'Mati'}")
-        for i, flag in enumerate(FLAGS_OUTPUT_2):
-            print(f"{flag.ljust(15)} : {'Nyala' if output_flags2[i] == 1 else 'Mati'}")
-        print("="*40)
-    return {
-        'level_1': level_1,
-        'level_2': level_2,
-        'tds_1': tds_1,
-        'flow_1': flow_1,
-        'pressure_1': pressure_1,
-        'input_flags': input_flags,
-        'output_flags': output_flags,
-        'output_flags2': output_flags2
-    }
+def process_packet(packet):
+    #paket -> Frame (codec.py), None jika rusak. Tampilan ada di status_view.py
+    frame = decode(packet)
+    if frame is None:
+        print(frame_error(packet))
+    return frame
 
 #========================== UPLOAD DATA ==========================
-def upload_to_database(data, client):
-    #upload data ke database
-    input_plc = (client.read_coils(0,count=5, slave=2).bits)
+def build_row(frame, plc):
+    #dict baris dari Frame dengan flag per kolom dan timestamp, flag input diambil dari PLC
+    data = frame.as_row()
+    input_plc = plc.read_coils(0, 5, slave=2) + [False] * 3
+    data.update(zip(FLAGS_INPUT, input_plc))
+    now = datetime.datetime.now()
+    data['timestamp'] = now.strftime("%Y-%m-%d %H:%M:%S")
+    data['ts'] = int(now.timestamp() * 1000)
+    return data
+
+def upload_to_database(data, writer):
+    #upload data ke database (di-commit bertahap oleh DatabaseWriter)
     try:
-        for i, flag in enumerate(FLAGS_INPUT):
-            data[flag] = input_plc[i]
-        for i, flag in enumerate(FLAGS_OUTPUT):
-            data[flag] = data['output_flags'][i]
-        for i, flag in enumerate(FLAGS_OUTPUT_2):
-            data[flag] = data['output_flags2'][i]
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        conn = sqlite3.connect('data_wtp.db')
-        c = conn.cursor()
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS monitor_wtp (
-            timestamp TEXT,
-            level_1 INTEGER,
-            level_2 INTEGER,
-            tds_1 INTEGER,
-            flow_1 INTEGER,
-            pressure_1 INTEGER,
-            level_switch INTEGER,
-            mode_standby INTEGER,
-            mode_filtering INTEGER,
-            mode_backwash INTEGER,
-            mode_drain INTEGER,
-            mode_override INTEGER,
-            emergency_stop INTEGER,
-            solenoid_1 INTEGER,
-            solenoid_2 INTEGER,
-            solenoid_3 INTEGER,
-            solenoid_4 INTEGER,
-            solenoid_5 INTEGER,
-            solenoid_6 INTEGER,
-            pompa_1 INTEGER,
-            pompa_2 INTEGER,
-            pompa_3 INTEGER,
-            stepper INTEGER
-        )
-        """)
-
-        c.execute("""INSERT INTO monitor_wtp (
-        timestamp,
-        level_1,
-        level_2,
-        tds_1,
-        flow_1,
-        pressure_1,
-        level_switch,
-        mode_standby,
-        mode_filtering,
-        mode_backwash,
-        mode_drain,
-        mode_override,
-        emergency_stop,
-        solenoid_1,
-        solenoid_2,
-        solenoid_3,
-        solenoid_4,
-        solenoid_5,
-        solenoid_6,
-        pompa_1,
-        pompa_2,
-        pompa_3,
-        stepper
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", 
-        (
-            timestamp, 
-            data["level_1"], 
-            data["level_2"], 
-            data["tds_1"], 
-            data["flow_1"], 
-            data["pressure_1"], 
-            data["level_switch"], 
-            data["mode_standby"], 
-            data["mode_filtering"], 
-            data["mode_backwash"], 
-            data["mode_drain"], 
-            data["mode_override"], 
-            data["emergency_stop"], 
-            data["solenoid_1"], 
-            data["solenoid_2"], 
-            data["solenoid_3"], 
-            data["solenoid_4"], 
-            data["solenoid_5"], 
-            data["solenoid_6"], 
-            data["pompa_1"], 
-            data["pompa_2"], 
-            data["pompa_3"],
-            data["stepper"]))
-        conn.commit()
-        conn.close()
-        return print("Data Tersimpan di Database  ", timestamp)
+        writer.add(data)
     except Exception as e:
         print(f"Terjadi Kesalahan dalam Menyimpan Data: {e}")
-    return None
 
-def upload_to_plc(data, client, override):
-    #upload data ke memory PLC
-    client.write_registers(0, list(data.values())[0:5], slave=1)
-    if override:
-        print()
-    else:
-        client.write_coils(0, data['input_flags'], slave=2)
-        client.write_coils(8, data['output_flags'], slave=2)
-        client.write_coils(16, data['output_flags2'], slave=2)
+def publish_data(data, publisher):
+    #kirim data ke Dashboard dan subscriber lain lewat socket lokal (tidak blocking)
+    try:
+        publisher.publish(data)
+    except Exception as e:
+        print(f"Terjadi Kesalahan dalam Publish Data: {e}")
+
+def upload_to_plc(frame, plc, override):
+    #upload data ke memory PLC: 1 write register + 1 write coil (0-21) per frame
+    plc.write_registers(0, frame.sensors(), slave=1)
+    if not override:
+        # input (0-7), output (8-15) dan output2 (16-21) berurutan, cukup satu write_coils
+        plc.write_coils(0, list(frame.coils()), slave=2)
     return None
 
 
 #========================== OVERRIDE ==========================
-def override_command(client):
-    #read memory PLC untuk override
-    return (client.read_coils(6, slave=2).bits)[0]
+def override_command(plc):
+    #read memory PLC untuk override (di-cache per siklus oleh PlcCycle)
+    return plc.read_coils(6, 1, slave=2)[0]
 
-def data_plc(client):
+def data_plc(plc):
     #read data aktuator dari PLC untuk override
-    data = (client.read_coils(8,count=14, slave=2).bits)
-    flag_one, flag_two = flags_to_bytes(data)
-    packet = bytearray()
-    packet.append(0xBB)
-    packet.append(flag_one)
-    packet.append(flag_two)
-    # print(list(packet))
-    return packet
+    return encode_override(plc.read_coils(8, 14, slave=2))
 
 
 #========================== MAIN ==========================
@@ -369,25 +235,42 @@ def main(debug):
         ser.close() 
         return 
     
+    decoder = FrameDecoder(START_BYTE, PACKET_LENGTH)
+    db_writer = open_writer(DB_FILE) if SAVE_DATABASE else None
+    publisher = None
+    if PUBLISH:
+        try:
+            publisher = TelemetryPublisher()
+        except OSError as e:
+            print(f"Gagal membuka publisher telemetri: {e}")
+    status = StatusView(debug, live=not LOG and sys.stdout.isatty()).start()
     try:
         while True:
             try:
-                if ser.in_waiting >= PACKET_LENGTH:
-                    packet = ser.read(PACKET_LENGTH)
-                    ser.flush()
-                    data = process_packet(packet, override_command(plc_client), debug)
-
-                    if data:
-                        upload_to_plc(data, plc_client, override_command(plc_client))
-                        # upload_to_database(data)
-
-                        if override_command(plc_client):
-                            print("================== MODE OVERRIDE AKTIF ==================\n")
-                            ser.write(data_plc(plc_client))
+                if db_writer:
+                    db_writer.poll()
+                for packet in read_frames(ser, decoder):
+                    # semua coil slave 2 (0-21) dibaca sekali per frame
+                    plc = PlcCycle(plc_client, windows={2: (0, 22)})
+                    override = override_command(plc)
+                    frame = process_packet(packet)
+
+                    if frame:
+                        data = build_row(frame, plc)
+                        if publisher:
+                            publish_data(data, publisher)
+                        upload_to_plc(frame, plc, override)
+                        if db_writer:
+                            upload_to_database(data, db_writer)
+
+                        # coil 6 slave 2 ikut ditulis upload_to_plc, baca ulang dari cache (tanpa transaksi)
+                        if override_command(plc):
+                            ser.write(data_plc(plc))
                             # ser.flush()
                         else:
-                            ser.write(bytes([0xFF]))
+                            ser.write(ACK)
                             ser.flush()
+                        status.update(frame, override_command(plc), plc.transactions)
                     else:
                         print("Paket rusak")
 
@@ -397,8 +280,14 @@ def main(debug):
                 sleep(1)
 
     except KeyboardInterrupt:
+        status.stop()
         print("Program dihentikan")
     finally:
+        status.stop()
+        if db_writer:
+            db_writer.close()
+        if publisher:
+            publisher.close()
         ser.close()
         plc_client.close()
         print("Koneksi serial dan PLC ditutup")
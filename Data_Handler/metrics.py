@@ -0,0 +1,179 @@
+"""
+Metrik ringan untuk loop akuisisi.
+
+    registry.observe("process_packet", detik)   -> histogram durasi per tahap
+    registry.timed("upload_to_plc", fungsi, ...) -> panggil fungsi sambil mencatat durasinya
+    registry.inc("plc_errors")                  -> counter
+    registry.track(decoder.stats)               -> counter dari sumber lain (FrameDecoder)
+
+Nama di GAUGES (jumlah sekarang, bisa turun lagi) diekspor sebagai gauge tanpa
+akhiran _total, selain itu counter.
+
+Satu observe() hanya bisect + 3 penjumlahan (di bawah 1 mikrodetik), jadi aman
+dibiarkan aktif di produksi. serve() membuka endpoint teks Prometheus di
+http://METRICS_HOST:METRICS_PORT/metrics dan summary() menghasilkan satu baris
+ringkasan (frame/detik, error, p50/p99 per tahap) sejak ringkasan sebelumnya.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = '127.0.0.1'
+METRICS_PORT = int(os.environ.get('MINIPLANT_METRICS_PORT', 9108))
+SUMMARY_INTERVAL = 60    # detik antar baris ringkasan
+# batas atas bucket histogram (detik)
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# nilai sekarang dari sumber yang di-track, bukan jumlah kumulatif
+GAUGES = ("missing_samples", "alarms_active")
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # elemen terakhir = di atas bucket terbesar (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def quantile(counts, q):
+    #perkiraan kuantil dari jumlah per bucket (batas atas bucket)
+    total = sum(counts)
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for i, n in enumerate(counts):
+        seen += n
+        if seen >= rank:
+            return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+    return float("inf")
+
+def format_seconds(value):
+    if value is None:
+        return "-"
+    if value == float("inf"):
+        return f">{BUCKETS[-1]}s"
+    return f"{value * 1000:g}ms"
+
+
+class Metrics:
+    def __init__(self, prefix="miniplant"):
+        self.prefix = prefix
+        self.stages = {}     # nama tahap -> Histogram
+        self.counters = {}   # nama -> nilai
+        self.sources = []    # fungsi -> dict counter (mis. FrameDecoder.stats)
+        self.last_summary = time.monotonic()
+        self.last_stages = {}
+        self.last_counters = {}
+
+    def observe(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.observe(seconds)
+
+    def timed(self, stage, function, *args):
+        #panggil function(*args) dan catat durasinya di tahap stage
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def track(self, source):
+        self.sources.append(source)
+
+    def snapshot_counters(self):
+        counters = dict(self.counters)
+        for source in self.sources:
+            counters.update(source())
+        return counters
+
+    def render(self):
+        #teks exposition format Prometheus
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_seconds Durasi tiap tahap loop akuisisi",
+                 f"# TYPE {p}_stage_seconds histogram"]
+        for stage, histogram in list(self.stages.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, histogram.counts):
+                cumulative += n
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        for name, value in sorted(self.snapshot_counters().items()):
+            if name in GAUGES:
+                lines.append(f"# TYPE {p}_{name} gauge")
+                lines.append(f"{p}_{name} {value}")
+            else:
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        #satu baris ringkasan sejak ringkasan sebelumnya
+        now = time.monotonic()
+        elapsed = max(now - self.last_summary, 1e-9)
+        counters = self.snapshot_counters()
+        frames = counters.get("frames", 0) - self.last_counters.get("frames", 0)
+        parts = [f"[metrics] {frames / elapsed:.1f} frame/s"]
+        for name, value in sorted(counters.items()):
+            if name in GAUGES:
+                if value:
+                    parts.append(f"{name}={value}")
+            elif name != "frames" and value:
+                parts.append(f"{name}={value - self.last_counters.get(name, 0)}")
+        for stage, histogram in list(self.stages.items()):
+            previous = self.last_stages.get(stage, [0] * len(histogram.counts))
+            counts = [a - b for a, b in zip(histogram.counts, previous)]
+            if any(counts):
+                parts.append(f"{stage} p50={format_seconds(quantile(counts, 0.5))} "
+                             f"p99={format_seconds(quantile(counts, 0.99))}")
+            self.last_stages[stage] = list(histogram.counts)
+        self.last_counters = counters
+        self.last_summary = now
+        return " | ".join(parts)
+
+    def maybe_summary(self, interval=SUMMARY_INTERVAL):
+        if time.monotonic() - self.last_summary >= interval:
+            print(self.summary())
+
+    def serve(self, host=METRICS_HOST, port=METRICS_PORT):
+        #endpoint /metrics di thread terpisah (daemon)
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass # jangan penuhi layar handler dengan log akses
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+registry = Metrics()
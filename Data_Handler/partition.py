@@ -0,0 +1,260 @@
+"""
+Penyimpanan terpartisi waktu.
+
+Data ditulis ke satu file SQLite per periode, misalnya data_wtp/data_wtp_20250801_00.db
+untuk PARTITION_HOURS = 24. Setiap file punya skema lengkap (monitor_wtp, index ts,
+rollup) dari DatabaseWriter, jadi satu partisi bisa dibuka seperti data_wtp.db biasa.
+
+Retensi tidak memakai DELETE + VACUUM: partisi lama dipindah utuh ke ARCHIVE_DIR atau
+dihapus sebagai file, sehingga partisi yang sedang ditulis tidak pernah terkunci.
+Sebelum dipindah isi WAL di-checkpoint ke file .db (baris yang sudah di-commit tapi
+belum di-checkpoint setelah shutdown tidak bersih ikut terarsip), partisi yang masih
+dibuka proses lain dilewati sampai retensi berikutnya.
+
+Query rentang waktu yang melewati beberapa partisi dijalankan paralel (satu koneksi
+per partisi di ThreadPoolExecutor), lalu baris tiap partisi yang sudah urut dibaca
+bertahap (fetchmany) dan digabung dengan heapq.merge tanpa memuat semuanya ke memori.
+    python3 partition.py list     [folder]  -> daftar partisi
+    python3 partition.py retensi  [folder]  -> jalankan retensi sekarang
+    python3 partition.py split    [data_wtp.db] [folder]  -> pecah database lama per partisi
+"""
+
+import sqlite3
+import datetime
+import glob
+import heapq
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from db_writer import DatabaseWriter, DB_FILE, format_timestamp
+
+PARTITION_DIR = None    # mis. 'data_wtp': satu file SQLite per periode di folder ini, None = satu file DB_FILE
+PARTITION_HOURS = 24    # panjang satu partisi (jam, pembagi 24), dihitung dari tengah malam waktu lokal
+RETENTION_DAYS = 30     # partisi yang lebih tua dari ini diarsipkan / dihapus, None = simpan semua
+ARCHIVE_DIR = 'arsip'   # subfolder arsip di dalam PARTITION_DIR, None = partisi lama dihapus
+QUERY_WORKERS = 4
+FETCH_SIZE = 1000       # baris per fetchmany saat hasil beberapa partisi digabung
+PREFIX = 'data_wtp'
+NAME_FORMAT = '%Y%m%d_%H'
+
+
+def partition_start(ts):
+    #awal partisi (datetime lokal) untuk epoch milidetik ts
+    moment = datetime.datetime.fromtimestamp(ts / 1000)
+    return moment.replace(hour=moment.hour // PARTITION_HOURS * PARTITION_HOURS, minute=0, second=0, microsecond=0)
+
+def partition_path(ts, directory=None):
+    directory = directory or PARTITION_DIR
+    return os.path.join(directory, f"{PREFIX}_{partition_start(ts).strftime(NAME_FORMAT)}.db")
+
+def parse_partition(path):
+    #nama file -> (awal, akhir) partisi dalam epoch milidetik
+    name = os.path.basename(path)[len(PREFIX) + 1:-len(".db")]
+    start = datetime.datetime.strptime(name, NAME_FORMAT)
+    end = start + datetime.timedelta(hours=PARTITION_HOURS)
+    return int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+
+def list_partitions(directory=None):
+    #semua partisi aktif, urut dari yang paling lama
+    directory = directory or PARTITION_DIR
+    partitions = []
+    for path in glob.glob(os.path.join(directory, f"{PREFIX}_*.db")):
+        try:
+            partitions.append((parse_partition(path)[0], path))
+        except ValueError:
+            continue # file lain yang namanya mirip
+    return [path for _, path in sorted(partitions)]
+
+def partitions_between(start, end, directory=None):
+    return [path for path in list_partitions(directory)
+            if parse_partition(path)[0] <= end and parse_partition(path)[1] > start]
+
+def latest_partition(directory=None):
+    paths = list_partitions(directory)
+    return paths[-1] if paths else None
+
+def checkpoint(path):
+    #isi WAL ke file .db lalu WAL dikosongkan, False jika partisi masih dipakai proses lain
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.OperationalError:
+        return False
+    return not busy
+
+def apply_retention(directory=None, retention_days=RETENTION_DAYS, archive_dir=ARCHIVE_DIR, now=None):
+    #pindah / hapus partisi yang seluruh isinya lebih tua dari retention_days
+    if retention_days is None:
+        return []
+    directory = directory or PARTITION_DIR
+    now = now or datetime.datetime.now()
+    limit = int((now - datetime.timedelta(days=retention_days)).timestamp() * 1000)
+    removed = []
+    for path in list_partitions(directory):
+        if parse_partition(path)[1] > limit:
+            break
+        if not checkpoint(path):
+            print(f"Partisi {path} masih dipakai, retensi ditunda")
+            continue
+        # WAL/SHM (jika masih ada) selalu ikut .db-nya, tidak pernah dihapus terpisah
+        files = [path] + [path + suffix for suffix in ("-wal", "-shm") if os.path.exists(path + suffix)]
+        if archive_dir:
+            target = os.path.join(directory, archive_dir)
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                shutil.move(name, os.path.join(target, os.path.basename(name)))
+        else:
+            for name in files:
+                os.remove(name)
+        removed.append(path)
+    return removed
+
+
+class PartitionedWriter:
+    #antarmuka sama dengan DatabaseWriter (add, poll, flush, close), file dipilih dari ts setiap baris
+    def __init__(self, directory=None, retention_days=RETENTION_DAYS, archive_dir=ARCHIVE_DIR, **options):
+        self.directory = directory or PARTITION_DIR
+        self.retention_days = retention_days
+        self.archive_dir = archive_dir
+        self.options = options
+        self.writer = None
+        self.path = None
+        self.closed_rows = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.retention()
+
+    def retention(self):
+        for path in apply_retention(self.directory, self.retention_days, self.archive_dir):
+            print(f"Partisi lama {'diarsipkan' if self.archive_dir else 'dihapus'}: {path}")
+
+    @property
+    def rows_written(self):
+        return self.closed_rows + (self.writer.rows_written if self.writer else 0)
+
+    def _switch(self, path):
+        self.close()
+        self.writer = DatabaseWriter(path, **self.options)
+        self.path = path
+
+    def add(self, row, ts=None):
+        if ts is None:
+            ts = row.get("ts")
+        if ts is None:
+            ts = int(datetime.datetime.now().timestamp() * 1000)
+        path = partition_path(ts, self.directory)
+        if path != self.path:
+            new_partition = self.path is not None
+            self._switch(path)
+            if new_partition:
+                self.retention()
+        self.writer.add(row, ts=ts)
+
+    def poll(self):
+        if self.writer is not None:
+            self.writer.poll()
+
+    def flush(self):
+        return self.writer.flush() if self.writer is not None else 0
+
+    def close(self):
+        if self.writer is None:
+            return
+        try:
+            self.writer.close()
+        finally:
+            self.closed_rows += self.writer.rows_written
+            self.writer = None
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_writer(path=DB_FILE, plant_id=None, **options):
+    #DatabaseWriter biasa, atau PartitionedWriter jika PARTITION_DIR diisi (subfolder per plant_id)
+    if PARTITION_DIR:
+        return PartitionedWriter(os.path.join(PARTITION_DIR, plant_id) if plant_id else PARTITION_DIR, **options)
+    return DatabaseWriter(path, **options)
+
+def _open_query(path, query):
+    #query dijalankan di thread pool, barisnya dibaca belakangan dari thread lain
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        return conn, query(conn)
+    except BaseException:
+        conn.close()
+        raise
+
+def _iter_rows(conn, cursor, size=FETCH_SIZE):
+    #baris cursor per fetchmany, koneksi ditutup setelah habis (atau generator ditutup)
+    try:
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        conn.close()
+
+def fan_out(paths, query, key=lambda row: row[0], workers=QUERY_WORKERS):
+    #jalankan query(conn) -> cursor di setiap partisi secara paralel, baris digabung urut berdasarkan key
+    #sambil dibaca (error query langsung muncul di sini, bukan saat hasil dibaca)
+    if not paths:
+        return iter(())
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = [pool.submit(_open_query, path, query) for path in paths]
+    opened = []
+    error = None
+    for future in futures:
+        try:
+            opened.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error:
+        for conn, _ in opened:
+            conn.close()
+        raise error
+    if len(opened) == 1:
+        return _iter_rows(*opened[0])
+    return heapq.merge(*(_iter_rows(conn, cursor) for conn, cursor in opened), key=key)
+
+def split_database(source, directory=None):
+    #pecah satu database lama menjadi partisi (baris dibaca urut ts, ditulis per partisi)
+    conn = sqlite3.connect(source)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.execute("SELECT * FROM monitor_wtp WHERE ts IS NOT NULL ORDER BY ts")
+    with PartitionedWriter(directory, retention_days=None, batch_size=5000) as writer:
+        while True:
+            rows = cursor.fetchmany(5000)
+            if not rows:
+                break
+            for row in rows:
+                writer.add(dict(row), ts=row["ts"])
+    conn.close()
+    return writer.rows_written
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "list":
+        directory = sys.argv[2] if len(sys.argv) > 2 else PARTITION_DIR or PREFIX
+        for path in list_partitions(directory):
+            start, end = parse_partition(path)
+            print(f"{path}  {format_timestamp(start)} - {format_timestamp(end)}  {os.path.getsize(path) // 1024} KB")
+    elif command == "retensi":
+        directory = sys.argv[2] if len(sys.argv) > 2 else PARTITION_DIR or PREFIX
+        print(f"{len(apply_retention(directory))} partisi dipindah/dihapus")
+    elif command == "split":
+        source = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+        directory = sys.argv[3] if len(sys.argv) > 3 else PARTITION_DIR or PREFIX
+        print(f"{split_database(source, directory)} baris dipindah ke {directory}")
+    else:
+        print("Pemakaian: python3 partition.py list|retensi [folder] | split [data_wtp.db] [folder]")
+        sys.exit(1)
@@ -0,0 +1,47 @@
+"""
+Konfigurasi beberapa skid MiniPlant untuk main_multi.py (lihat plants.example.json).
+
+    {"plants": [
+        {"plant_id": "skid1", "serial_port": "/dev/ttyUSB0", "ip_plc": "192.168.0.101"},
+        {"plant_id": "skid2", "serial_port": "/dev/ttyUSB1", "ip_plc": "192.168.0.102",
+         "plc_port": 502, "baudrate": 115200, "db_file": "skid2.db"}
+    ]}
+
+Setiap skid punya file database sendiri (default data_wtp_<plant_id>.db) supaya
+penulisan satu skid tidak pernah menunggu kunci database skid lain.
+"""
+
+import json
+import os
+
+PLANTS_FILE = os.environ.get('MINIPLANT_PLANTS_FILE', 'plants.json')
+DB_FILE_FORMAT = 'data_wtp_{plant_id}.db'
+
+
+def load_plants(path=PLANTS_FILE):
+    #list dict konfigurasi skid, dengan nilai default yang sudah diisi
+    with open(path) as f:
+        config = json.load(f)
+    plants = []
+    seen = set()
+    for plant in config["plants"]:
+        plant_id = str(plant["plant_id"])
+        if plant_id in seen:
+            raise ValueError(f"plant_id ganda di {path}: {plant_id}")
+        seen.add(plant_id)
+        plants.append({
+            "plant_id": plant_id,
+            "serial_port": plant["serial_port"],
+            "baudrate": int(plant.get("baudrate", 115200)),
+            "ip_plc": plant["ip_plc"],
+            "plc_port": int(plant.get("plc_port", 502)),
+            "db_file": plant.get("db_file") or plant_db_file(plant_id),
+        })
+    return plants
+
+def plant_db_file(plant_id, plants=None):
+    #file database untuk plant_id (db_file dari konfigurasi jika ada)
+    for plant in plants or []:
+        if plant["plant_id"] == plant_id:
+            return plant["db_file"]
+    return DB_FILE_FORMAT.format(plant_id=plant_id)
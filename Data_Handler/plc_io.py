@@ -0,0 +1,99 @@
+"""
+Rencana I/O PLC per frame serial.
+
+Satu PlcCycle dibuat untuk setiap frame. Pembacaan coil di-cache selama siklus itu
+(pembacaan kedua di alamat yang sama tidak ke PLC lagi), penulisan coil ikut
+memperbarui cache, dan setiap transaksi Modbus dihitung supaya biaya per frame
+bisa dilihat. Dengan `windows` satu slave bisa dibaca sekaligus dalam satu blok,
+misalnya coil 0-21 slave 2 pada main_simul.py.
+"""
+
+
+class PlcError(Exception):
+    pass
+
+
+class PlcCycle:
+    def __init__(self, client, windows=None):
+        self.client = client
+        self.windows = windows or {}   # slave -> (address, count) yang dibaca sekaligus
+        self.coils = {}                # slave -> (address, list bit) hasil baca siklus ini
+        self.transactions = 0
+
+    def _cached(self, address, count, slave):
+        cached = self.coils.get(slave)
+        if cached:
+            start, bits = cached
+            if start <= address and address + count <= start + len(bits):
+                return bits[address - start:address - start + count]
+        return None
+
+    def _window(self, address, count, slave):
+        window = self.windows.get(slave)
+        if window and window[0] <= address and address + count <= window[0] + window[1]:
+            return window
+        return address, count
+
+    def _store(self, start, size, slave, result):
+        if result.isError():
+            raise PlcError(f"Gagal membaca coil {start} slave {slave}: {result}")
+        self.coils[slave] = (start, list(result.bits[:size]))
+
+    def _written(self, address, values, slave, result):
+        if result.isError():
+            raise PlcError(f"Gagal menulis coil {address} slave {slave}: {result}")
+        cached = self.coils.get(slave)
+        if cached:
+            start, bits = cached
+            for i, value in enumerate(values):
+                if start <= address + i < start + len(bits):
+                    bits[address + i - start] = value
+
+    def read_coils(self, address, count, slave):
+        bits = self._cached(address, count, slave)
+        if bits is not None:
+            return bits
+        start, size = self._window(address, count, slave)
+        result = self.client.read_coils(start, count=size, slave=slave)
+        self.transactions += 1
+        self._store(start, size, slave, result)
+        return self._cached(address, count, slave)
+
+    def write_coils(self, address, values, slave):
+        result = self.client.write_coils(address, values, slave=slave)
+        self.transactions += 1
+        self._written(address, values, slave, result)
+        return result
+
+    def write_registers(self, address, values, slave):
+        result = self.client.write_registers(address, values, slave=slave)
+        self.transactions += 1
+        if result.isError():
+            raise PlcError(f"Gagal menulis register {address} slave {slave}: {result}")
+        return result
+
+
+class AsyncPlcCycle(PlcCycle):
+    #versi asyncio untuk AsyncModbusTcpClient (main_async.py), cache dan hitungan sama
+    async def read_coils(self, address, count, slave):
+        bits = self._cached(address, count, slave)
+        if bits is not None:
+            return bits
+        start, size = self._window(address, count, slave)
+        result = await self.client.read_coils(start, count=size, slave=slave)
+        self.transactions += 1
+        self._store(start, size, slave, result)
+        return self._cached(address, count, slave)
+
+    async def write_coils(self, address, values, slave):
+        result = await self.client.write_coils(address, values, slave=slave)
+        self.transactions += 1
+        self._written(address, values, slave, result)
+        return result
+
+    async def write_registers(self, address, values, slave):
+        result = await self.client.write_registers(address, values, slave=slave)
+        self.transactions += 1
+        if result.isError():
+            raise PlcError(f"Gagal menulis register {address} slave {slave}: {result}")
+        return result
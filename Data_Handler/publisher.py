@@ -0,0 +1,110 @@
+"""
+Publisher telemetri lokal (TCP loopback).
+
+Data_Handler membuka server di PUBLISH_HOST:PUBLISH_PORT. Subscriber (Dashboard,
+db_subscriber.py, dst) cukup connect lalu membaca satu objek JSON per baris.
+Semua socket non-blocking: publish() tidak pernah menunggu subscriber. Subscriber
+yang lambat dan antriannya melebihi MAX_PENDING akan diputus supaya loop akuisisi
+tidak ikut tertahan.
+"""
+
+import json
+import os
+import socket
+import time
+from metrics import registry
+
+PUBLISH_HOST = '127.0.0.1'
+PUBLISH_PORT = int(os.environ.get('MINIPLANT_PUBLISH_PORT', 5800))
+MAX_PENDING = 256 * 1024   # batas antrian per subscriber sebelum diputus
+
+
+class TelemetryPublisher:
+    def __init__(self, host=PUBLISH_HOST, port=PUBLISH_PORT, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((host, port))
+        self.server.listen()
+        self.server.setblocking(False)
+        self.clients = {}   # socket -> bytearray data yang belum terkirim
+        self.seq = 0
+        self.dropped = 0
+
+    def _accept(self):
+        while True:
+            try:
+                sock, addr = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.clients[sock] = bytearray()
+            print(f"Subscriber baru terhubung: {addr}")
+
+    def _drop(self, sock):
+        self.clients.pop(sock, None)
+        self.dropped += 1
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def publish(self, message, kind="data"):
+        #kirim satu pesan ke semua subscriber tanpa blocking
+        self._accept()
+        self.seq += 1
+        message = dict(message, type=kind, id=self.seq)
+        message.setdefault("ts", int(time.time() * 1000))
+        line = (json.dumps(message, separators=(',', ':')) + '\n').encode()
+        for sock, pending in list(self.clients.items()):
+            if len(pending) + len(line) > self.max_pending:
+                print("Subscriber terlalu lambat, koneksi diputus")
+                self._drop(sock)
+                continue
+            pending += line
+            try:
+                sent = sock.send(pending)
+                del pending[:sent]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self._drop(sock)
+        return self.seq
+
+    def close(self):
+        for sock in list(self.clients):
+            sock.close()
+        self.clients.clear()
+        self.server.close()
+
+
+def subscribe(host=PUBLISH_HOST, port=PUBLISH_PORT, timeout=1.0):
+    #generator untuk subscriber sederhana (blocking), menghasilkan dict per pesan
+    #atau None jika tidak ada data selama timeout
+    sock = socket.create_connection((host, port), timeout=timeout)
+    buffer = b""
+    try:
+        while True:
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                yield None
+                continue
+            if not chunk:
+                return
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    #baris rusak (JSON terpotong / bukan UTF-8) dibuang, baris berikutnya tetap dibaca
+                    registry.inc("dropped_lines")
+                    print(f"Baris rusak dibuang: {line[:80]!r}")
+                    continue
+                yield message
+    finally:
+        sock.close()
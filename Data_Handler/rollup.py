@@ -0,0 +1,167 @@
+"""
+Tabel rollup time-series (rollup_1s, rollup_1m, rollup_1h).
+
+Setiap bucket menyimpan jumlah sampel (n), min/max/avg/last untuk VALUE_FIELDS dan
+fraksi waktu nyala (0-1) untuk setiap flag aktuator di FLAG_FIELDS. Kolom bucket
+adalah awal bucket dalam epoch detik (UTC) sekaligus primary key, jadi query
+rentang panjang cukup membaca bucket yang diminta, sebanyak apapun data mentahnya.
+
+Rollup diperbarui oleh trigger SQLite setiap ada INSERT ke monitor_wtp (atau
+monitor_wtp_compact pada mode ringkas), sehingga data dari Data_Handler maupun
+Dashboard/simulator.py ikut terhitung. Untuk
+database lama jalankan:
+    python3 rollup.py backfill [data_wtp.db]
+"""
+
+import sqlite3
+import sys
+import compact
+
+DB_FILE = 'data_wtp.db'
+
+# nama resolusi -> panjang bucket (detik)
+RESOLUTIONS = {
+    "1s": 1,
+    "1m": 60,
+    "1h": 3600,
+}
+
+VALUE_FIELDS = ["level_1", "level_2", "tds_1", "flow_1", "pressure_1"]
+FLAG_FIELDS = [
+    "level_switch", "mode_standby", "mode_filtering", "mode_backwash", "mode_drain",
+    "mode_override", "emergency_stop", "solenoid_1", "solenoid_2", "solenoid_3",
+    "solenoid_4", "solenoid_5", "solenoid_6", "pompa_1", "pompa_2", "pompa_3", "stepper"
+]
+
+
+def table_name(resolution):
+    return f"rollup_{resolution}"
+
+def epoch_expr(source="NEW."):
+    #epoch detik UTC dari kolom timestamp (TEXT waktu lokal)
+    return f"CAST(strftime('%s', {source}timestamp, 'utc') AS INTEGER)"
+
+def bucket_expr(size, source="NEW.", epoch=None):
+    #awal bucket (epoch detik UTC)
+    return f"{epoch or epoch_expr(source)} / {size} * {size}"
+
+def create_table_sql(resolution):
+    columns = ["bucket INTEGER PRIMARY KEY", "n INTEGER"]
+    for field in VALUE_FIELDS:
+        columns += [f"{field}_min REAL", f"{field}_max REAL", f"{field}_avg REAL", f"{field}_last REAL"]
+    for flag in FLAG_FIELDS:
+        columns.append(f"{flag}_on REAL")
+    return f"CREATE TABLE IF NOT EXISTS {table_name(resolution)} (\n    " + ",\n    ".join(columns) + "\n)"
+
+def trigger_sql(resolution, source_table="monitor_wtp", expr=None, epoch=None):
+    #upsert satu baris baru ke bucket-nya; avg dan fraksi nyala dihitung sebagai rata-rata berjalan
+    #expr(kolom) -> ekspresi SQL nilai kolom dari NEW (default NEW.kolom), epoch -> ekspresi epoch detik
+    size = RESOLUTIONS[resolution]
+    table = table_name(resolution)
+    expr = expr or (lambda column: f"NEW.{column}")
+    epoch = epoch or epoch_expr()
+    columns = ["bucket", "n"]
+    values = [bucket_expr(size, epoch=epoch), "1"]
+    updates = ["n = n + 1"]
+    for field in VALUE_FIELDS:
+        columns += [f"{field}_min", f"{field}_max", f"{field}_avg", f"{field}_last"]
+        values += [expr(field)] * 4
+        updates += [
+            f"{field}_min = MIN({field}_min, excluded.{field}_min)",
+            f"{field}_max = MAX({field}_max, excluded.{field}_max)",
+            f"{field}_avg = {field}_avg + (excluded.{field}_avg - {field}_avg) / (n + 1)",
+            f"{field}_last = excluded.{field}_last",
+        ]
+    for flag in FLAG_FIELDS:
+        columns.append(f"{flag}_on")
+        values.append(expr(flag))
+        updates.append(f"{flag}_on = {flag}_on + (excluded.{flag}_on - {flag}_on) / (n + 1)")
+    columns = ", ".join(columns)
+    values = ", ".join(values)
+    updates = ",\n        ".join(updates)
+    return f"""
+CREATE TRIGGER {table}_insert AFTER INSERT ON {source_table}
+WHEN {epoch} IS NOT NULL
+BEGIN
+    INSERT INTO {table} ({columns})
+    VALUES ({values})
+    ON CONFLICT(bucket) DO UPDATE SET
+        {updates};
+END
+"""
+
+def backfill_sql(resolution):
+    #hitung ulang satu tabel rollup dari seluruh isi monitor_wtp (GROUP BY per bucket)
+    size = RESOLUTIONS[resolution]
+    table = table_name(resolution)
+    columns = ["bucket", "n"]
+    aggregates = [f"{bucket_expr(size, '')} AS bucket", "COUNT(*) AS n"]
+    selects = ["g.bucket", "g.n"]
+    for field in VALUE_FIELDS:
+        columns += [f"{field}_min", f"{field}_max", f"{field}_avg", f"{field}_last"]
+        aggregates += [f"MIN({field}) AS {field}_min", f"MAX({field}) AS {field}_max", f"AVG({field}) AS {field}_avg"]
+        selects += [f"g.{field}_min", f"g.{field}_max", f"g.{field}_avg", f"m.{field}"]
+    for flag in FLAG_FIELDS:
+        columns.append(f"{flag}_on")
+        aggregates.append(f"AVG({flag}) AS {flag}_on")
+        selects.append(f"g.{flag}_on")
+    columns = ", ".join(columns)
+    aggregates = ", ".join(aggregates)
+    selects = ", ".join(selects)
+    return f"""
+INSERT INTO {table} ({columns})
+SELECT {selects}
+FROM (
+    SELECT {aggregates}, MAX(id) AS last_id
+    FROM monitor_wtp
+    WHERE timestamp IS NOT NULL
+    GROUP BY bucket
+) g
+JOIN monitor_wtp m ON m.id = g.last_id
+"""
+
+def install(conn):
+    #buat tabel rollup dan (ulang) trigger-nya pada koneksi yang sudah punya monitor_wtp
+    #pada mode ringkas (compact.py) trigger dipasang di monitor_wtp_compact dan men-decode packed
+    if compact.is_compact(conn):
+        options = dict(source_table="monitor_wtp_compact", expr=compact.column_expr_new, epoch="NEW.ts / 1000")
+    else:
+        options = {}
+    with conn:
+        for resolution in RESOLUTIONS:
+            conn.execute(create_table_sql(resolution))
+            conn.execute(f"DROP TRIGGER IF EXISTS {table_name(resolution)}_insert")
+            conn.execute(trigger_sql(resolution, **options))
+
+def backfill(conn):
+    install(conn)
+    with conn:
+        for resolution in RESOLUTIONS:
+            conn.execute(f"DELETE FROM {table_name(resolution)}")
+            conn.execute(backfill_sql(resolution))
+            count = conn.execute(f"SELECT COUNT(*) FROM {table_name(resolution)}").fetchone()[0]
+            print(f"{table_name(resolution)}: {count} bucket")
+
+def query(conn, resolution, start, end, fields=VALUE_FIELDS):
+    #ambil rollup antara epoch detik start..end, hasil: list (bucket, field_min, field_max, field_avg, field_last, ...)
+    columns = ["bucket"]
+    for field in fields:
+        if field in VALUE_FIELDS:
+            columns += [f"{field}_min", f"{field}_max", f"{field}_avg", f"{field}_last"]
+        elif field in FLAG_FIELDS:
+            columns.append(f"{field}_on")
+        else:
+            raise ValueError(f"Field tidak dikenal: {field}")
+    return conn.execute(
+        f"SELECT {', '.join(columns)} FROM {table_name(resolution)} WHERE bucket BETWEEN ? AND ? ORDER BY bucket",
+        (start, end))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "backfill":
+        print("Pemakaian: python3 rollup.py backfill [data_wtp.db]")
+        sys.exit(1)
+    path = sys.argv[2] if len(sys.argv) > 2 else DB_FILE
+    conn = sqlite3.connect(path)
+    backfill(conn)
+    conn.close()
@@ -0,0 +1,165 @@
+"""
+Tampilan status Data_Handler di terminal.
+
+Loop akuisisi hanya memanggil update(frame, override, transaksi) per paket, yaitu
+menyimpan referensi snapshot terakhir tanpa memformat apa pun. Thread terpisah
+menggambar snapshot itu paling sering setiap REFRESH_INTERVAL detik:
+
+    live  (terminal, LOG = False) -> digambar ulang di tempat dengan kode ANSI (tanpa
+                                     os.system('clear')), print lain dari handler
+                                     ditampung dan ditampilkan sebagai pesan terakhir
+    plain (LOG = True / output ke file atau pipe) -> blok debug dicetak berurutan,
+                                     tanpa debug tidak ada yang dicetak
+
+debug sama seperti input main.py: "Simple" = sensor + list flag, "All" = setiap flag
+Nyala / Mati, selain itu hanya ringkasan satu baris.
+"""
+
+import os
+import platform
+import sys
+import threading
+import time
+from collections import deque
+from codec import FLAGS_INPUT, FLAGS_OUTPUT, FLAGS_OUTPUT_2
+
+REFRESH_INTERVAL = 0.25  # detik, layar digambar ulang paling sering 4x per detik berapa pun frame rate-nya
+MESSAGE_LINES = 8        # jumlah pesan (print) terakhir yang ditampilkan di bawah status
+
+HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+
+
+class StatusView:
+    def __init__(self, debug=False, live=None, interval=REFRESH_INTERVAL, stream=None):
+        self.debug = debug
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty() if live is None else live
+        self.interval = interval
+        # snapshot, ditulis loop akuisisi
+        self.frame = None
+        self.override = False
+        self.transactions = None
+        self.frames = 0
+        # state tampilan, hanya dipakai thread render
+        self.drawn = 0
+        self.last_frames = 0
+        self.last_time = time.monotonic()
+        self.rate = 0.0
+        self.messages = deque(maxlen=MESSAGE_LINES)
+        self.partial = ""
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.stdout = None
+
+    def update(self, frame, override=False, transactions=None):
+        self.frame = frame
+        self.override = override
+        self.transactions = transactions
+        self.frames += 1
+
+    #========================== STDOUT (mode live) ==========================
+    def write(self, text):
+        #pengganti sys.stdout selama mode live: simpan sebagai pesan, tampil saat render
+        with self.lock:
+            lines = (self.partial + text).split("\n")
+            self.partial = lines.pop()
+            for line in lines:
+                if line:
+                    self.messages.append(line)
+            self.dirty = True
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    #========================== RENDER ==========================
+    def lines(self):
+        frame = self.frame
+        override = "MODE OVERRIDE AKTIF" if self.override else "mode normal"
+        lines = [f"MiniPlant Data_Handler  {time.strftime('%H:%M:%S')}  frame {self.frames}  {self.rate:.1f} frame/s  {override}"]
+        if frame is None:
+            lines.append("Menunggu data serial...")
+            return lines
+        lines.append("=" * 40)
+        lines.append(f"Level 1: {frame.level_1}, Level 2: {frame.level_2}, TDS: {frame.tds_1}, Flow: {frame.flow_1}, Pressure: {frame.pressure_1}")
+        if self.debug == "Simple":
+            lines.append(f"Input Flags: {list(frame.input_flags)}")
+            lines.append(f"Output Flags: {list(frame.output_flags)}")
+            lines.append(f"Output Flags2: {list(frame.output_flags2)}")
+        elif self.debug == "All":
+            for names, flags in ((FLAGS_INPUT, frame.input_flags), (FLAGS_OUTPUT, frame.output_flags), (FLAGS_OUTPUT_2, frame.output_flags2)):
+                for flag, bit in zip(names, flags):
+                    lines.append(f"{flag.ljust(15)} : {'Nyala' if bit == 1 else 'Mati'}")
+        if self.debug and self.transactions is not None:
+            lines.append(f"Transaksi Modbus frame ini: {self.transactions}")
+        lines.append("=" * 40)
+        return lines
+
+    def render(self):
+        now = time.monotonic()
+        frames = self.frames
+        if now > self.last_time:
+            self.rate = (frames - self.last_frames) / (now - self.last_time)
+        self.last_frames, self.last_time = frames, now
+        self.drawn = frames
+        lines = self.lines()
+        with self.lock:
+            self.dirty = False
+            if self.live:
+                lines += [""] + list(self.messages)
+                text = HOME + "".join(line + CLEAR_LINE + "\n" for line in lines) + CLEAR_BELOW
+            else:
+                text = "\n".join(lines) + "\n"
+            self.stream.write(text)
+            self.stream.flush()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            if self.frames != self.drawn or self.dirty:
+                self.render()
+            elif self.live and self.rate:
+                self.render() # frame berhenti datang, tampilkan 0 frame/s
+
+    #========================== START / STOP ==========================
+    def start(self):
+        if not self.live and not self.debug:
+            return self
+        if self.live:
+            if platform.system() == "Windows":
+                os.system("") # aktifkan kode ANSI di console Windows (sekali saja)
+            self.stream.write(HIDE_CURSOR + HOME + CLEAR_SCREEN)
+            self.stdout = sys.stdout
+            sys.stdout = self
+        self.thread = threading.Thread(target=self._run, name="status-view", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.thread.join()
+        self.thread = None
+        if self.live:
+            self.render()
+            sys.stdout = self.stdout
+            self.stream.write(SHOW_CURSOR)
+            if self.partial:
+                self.stream.write(self.partial + "\n")
+            self.stream.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
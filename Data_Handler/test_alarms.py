@@ -0,0 +1,22 @@
+from alarms import AlarmEngine
+
+RULES = [
+    {"name": "tds_tinggi", "field": "tds_1", "kind": "high", "limit": 200, "deadband": 10},
+    {"name": "tekanan_naik_cepat", "field": "pressure_1", "kind": "rate", "limit": 40, "window": 0},
+]
+
+
+def states(events):
+    return [(event["rule"], event["state"]) for event in events]
+
+
+def test_older_sample_does_not_flip_state():
+    engine = AlarmEngine(RULES)
+    assert states(engine.evaluate({"ts": 1000, "tds_1": 250, "pressure_1": 100})) == [("tds_tinggi", "active")]
+    # sampel lama dari kiriman ulang batch: nilainya normal tapi tidak mengubah status sekarang
+    assert engine.evaluate({"ts": 500, "tds_1": 100, "pressure_1": 0}) == []
+    assert engine.evaluate({"ts": 1000, "tds_1": 100, "pressure_1": 100}) == []
+    assert engine.active() == ["tds_tinggi"]
+    assert engine.evaluate({"ts": 1100, "tds_1": 250, "pressure_1": 100}) == []
+    assert states(engine.evaluate({"ts": 1200, "tds_1": 100, "pressure_1": 110})) == [
+        ("tds_tinggi", "clear"), ("tekanan_naik_cepat", "active")]
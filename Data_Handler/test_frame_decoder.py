@@ -0,0 +1,107 @@
+from codec import SEQ_MODULO, decode_batch, encode, encode_batch
+from frame_decoder import FrameDecoder, SequenceTracker
+
+
+def sample(i):
+    return [i % 256, 0, 0, 0, 0, 0, 0, 0]
+
+def batch(seq, count, session=1):
+    return decode_batch(encode_batch(seq, [sample(seq + k) for k in range(count)], 10, session))
+
+def levels(frames):
+    return [frame.level_1 for frame in frames]
+
+
+def test_in_order():
+    tracker = SequenceTracker()
+    for seq in range(0, 48, 16):
+        frames, lost = tracker.accept(batch(seq, 16))
+        assert len(frames) == 16 and lost == 0
+    assert tracker.last_seq == 47
+    assert tracker.offsets == list(range(15, -1, -1))
+
+def test_restart_new_session():
+    tracker = SequenceTracker()
+    for seq in range(0, 48, 16):
+        tracker.accept(batch(seq, 16, session=1))
+    # firmware boot ulang, seq mulai lagi dari 0 dengan sesi baru
+    frames, lost = tracker.accept(batch(0, 16, session=2))
+    assert len(frames) == 16 and lost == 0
+    assert tracker.last_seq == 15
+    frames, _ = tracker.accept(batch(16, 16, session=2))
+    assert len(frames) == 16
+    assert tracker.last_seq == 31
+    assert tracker.stats()['seq_restarts'] == 1
+    assert tracker.stats()['duplicate_samples'] == 0
+
+def test_same_session_resend_is_duplicate():
+    tracker = SequenceTracker()
+    tracker.accept(batch(0, 16))
+    tracker.accept(batch(16, 16))
+    frames, _ = tracker.accept(batch(16, 16))
+    assert frames == []
+    assert tracker.stats()['duplicate_samples'] == 16
+    assert tracker.last_seq == 31
+
+def test_gap_holds_ack_until_retransmit():
+    tracker = SequenceTracker()
+    tracker.accept(batch(0, 16), now=0)
+    # batch 16-31 hilang
+    frames, lost = tracker.accept(batch(32, 16), now=0)
+    assert len(frames) == 16 and lost == 16
+    assert tracker.last_seq == 15
+    assert tracker.missing == 16
+    # firmware mengirim ulang mulai dari ACK + 1: sampel gap diterima, 32-47 dibuang
+    frames, lost = tracker.accept(batch(16, 32), now=0)
+    assert levels(frames) == list(range(16, 32)) and lost == 0
+    assert tracker.offsets == list(range(31, 15, -1))
+    assert tracker.last_seq == 47
+    stats = tracker.stats()
+    assert stats['recovered_samples'] == 16
+    assert stats['duplicate_samples'] == 16
+    assert stats['missing_samples'] == 0
+    assert stats['lost_samples'] == 0
+
+def test_resend_offsets_include_delay():
+    tracker = SequenceTracker()
+    tracker.accept(batch(0, 4), now=0)
+    tracker.accept(batch(12, 4), now=0)
+    # kiriman ulang 0,5 detik kemudian (interval 10 ms): umur sampel bertambah 50 interval
+    frames, _ = tracker.accept(batch(4, 8), now=0.5)
+    assert levels(frames) == list(range(4, 12))
+    assert tracker.offsets == [offset + 50 for offset in range(11, 3, -1)]
+
+def test_gap_given_up_after_window():
+    tracker = SequenceTracker(window=64)
+    tracker.accept(batch(0, 16))
+    for seq in range(32, 112, 16):
+        tracker.accept(batch(seq, 16))
+    # gap 16-31 lebih jauh dari window di belakang sampel terbaru
+    assert tracker.last_seq == 111
+    assert tracker.stats()['lost_samples'] == 16
+    assert tracker.missing == 0
+
+def test_wraparound():
+    tracker = SequenceTracker()
+    start = SEQ_MODULO - 20
+    frames, _ = tracker.accept(batch(start, 16))
+    assert tracker.last_seq == SEQ_MODULO - 5
+    frames, lost = tracker.accept(batch(start + 16, 16))
+    assert len(frames) == 16 and lost == 0
+    assert tracker.last_seq == 11
+    # gap yang melewati 65535 -> 0, lalu kirim ulang
+    frames, lost = tracker.accept(batch(28, 8))
+    assert lost == 16 and tracker.last_seq == 11
+    frames, _ = tracker.accept(batch(12, 16))
+    assert len(frames) == 16 and tracker.last_seq == 35
+    frames, _ = tracker.accept(batch(start, 16))
+    assert frames == []
+
+def test_resync_counted_once_per_loss():
+    decoder = FrameDecoder()
+    good = encode(1, 2, 3, 4, 5, 0, 0, 0)
+    # sampah yang berisi START_BYTE palsu: banyak byte digeser, tetap satu resync
+    frames = decoder.feed(good + bytes([0xAA, 1, 2, 0xAA, 9, 9, 0xAA, 3]) + good + good)
+    assert len(frames) == 3
+    assert decoder.stats()['resyncs'] == 1
+    assert decoder.stats()['discarded_bytes'] == 8
@@ -1,58 +1,29 @@
+import os
+import sys
 import serial
 from pymodbus.client import ModbusTcpClient
 from time import sleep
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Data_Handler'))
+from codec import PACKET_LENGTH, OVERRIDE_BYTE, decode, frame_error
 
 # Konstanta
-START_BYTE = 0xAA
-PACKET_LENGTH = 10
 SERIAL_PORT = '/dev/ttyUSB0'
 BAUDRATE = 9600
 IP_PLC = "" 
 
-def parse_flags(flag_byte):
-    # byte do data flag
-    return [(flag_byte >> i) & 1 for i in range(8)]
-
-def calculate_checksum(packet):
-    checksum = 0
-    for byte in packet[:-1]:
-        checksum ^= byte
-    return checksum
-
 def process_packet(packet, debug=False):
-    if len(packet) != PACKET_LENGTH or packet[0] != START_BYTE:
-        print("Paket salah: Panjang atau start byte tidak valid")
-        return None
-
-    if calculate_checksum(packet) != packet[-1]:
-        print("Checksum tidak cocok!")
+    # parsing paket dengan codec Data_Handler (frame['level_1'], frame['input_flags'], ...)
+    frame = decode(packet)
+    if frame is None:
+        print(frame_error(packet))
         return None
 
-    #Parsing 
-    level_1 = packet[1]
-    level_2 = packet[2]
-    tds_1 = packet[3]
-    flow_1 = packet[4]
-    pressure_1 = packet[5]
-    input_flags = parse_flags(packet[6])
-    output_flags = parse_flags(packet[7])
-    output_flags2 = parse_flags(packet[8])
-
     if debug:
-        print(f"Level 1: {level_1}, Level 2: {level_2}, TDS: {tds_1}, Flow: {flow_1}, Pressure: {pressure_1}")
-        print(f"Input Flags: {input_flags}")
-        print(f"Output Flags: {output_flags}, Output Flags2: {output_flags2}")
-
-    return {
-        'level_1': level_1,
-        'level_2': level_2,
-        'tds_1': tds_1,
-        'flow_1': flow_1,
-        'pressure_1': pressure_1,
-        'input_flags': input_flags,
-        'output_flags': output_flags,
-        'output_flags2': output_flags2
-    }
+        print(f"Level 1: {frame.level_1}, Level 2: {frame.level_2}, TDS: {frame.tds_1}, Flow: {frame.flow_1}, Pressure: {frame.pressure_1}")
+        print(f"Input Flags: {frame.input_flags}")
+        print(f"Output Flags: {frame.output_flags}, Output Flags2: {frame.output_flags2}")
+
+    return frame
 
 def upload_to_database(data):
     #upload data ke database
@@ -98,7 +69,7 @@ def main():
                         if override_command(client) and data['input_flags'][2]:
                             print("=== Mode Override Aktif ===")
                             plc_data = data_plc()
-                            ser.write(bytes([0xBB]) + plc_data)
+                            ser.write(bytes([OVERRIDE_BYTE]) + plc_data)
                     else:
                         print("Paket rusak")
 
@@ -23,4 +23,11 @@ byobu split-window -h -t "miniplant":0.0
 byobu send-keys -t "miniplant":0.1 "cd ~/WTP/MiniPlant/Data_Handler" C-m
 byobu send-keys -t "miniplant":0.1 "python3 main.py" C-m
 
+# Split horizontal untuk penyimpan database (subscriber dari Data_Handler)
+byobu split-window -v -t "miniplant":0.1
+
+# Pane ketiga
+byobu send-keys -t "miniplant":0.2 "cd ~/WTP/MiniPlant/Data_Handler" C-m
+byobu send-keys -t "miniplant":0.2 "python3 db_subscriber.py" C-m
+
 exit 0